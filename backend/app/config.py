@@ -3,9 +3,49 @@ import os
 # 이미지 전처리 관련 전역 설정
 RESIZE_LIMIT = 3000            # 너무 큰 이미지는 자동 축소
 DEBUG_MODE = False              # 디버깅 시 얼굴 박스 표시
+FAST_DECODE = True              # JPEG 축소 디코딩 후 검출 (실패 시 기존 전체 디코딩 경로)
+DETECT_MAX_SIZE = 640           # 얼굴 검출용 축소 디코딩 목표 크기 (긴 변 기준)
+MODEL_INPUT_SIZE = 224          # 모델 입력 크기 (224×224)
+FACE_DETECTOR = "mediapipe_full"   # mediapipe_short / mediapipe_full / opencv_haar (app/utils/face_detectors.py)
+CLIENT_BBOX_ENABLED = True          # 앱이 보낸 얼굴 박스(bbox)가 있으면 서버 검출 생략
+MULTI_FACE_MAX_FACES = 6            # /upload multi_face=true 에서 처리할 최대 얼굴 수 (BATCH_MAX_SIZE 이하면 invoke 1번)
+UPLOAD_MAX_BYTES = 15 * 1024 * 1024      # 업로드 이미지 최대 크기, 초과 시 413
+UPLOAD_MAX_PIXELS = 40_000_000          # 헤더 기준 최대 픽셀 수 (압축 폭탄 차단), 초과 시 413
+UPLOAD_ALLOWED_FORMATS = ("JPEG", "PNG")   # magic bytes로 확인하는 허용 형식
+UPLOAD_READ_CHUNK_SIZE = 64 * 1024      # 업로드 파일 읽기 청크 크기
+UPLOAD_MAX_REQUEST_BYTES = UPLOAD_MAX_BYTES + 64 * 1024   # /upload, /lookalike 요청 본문 최대 크기 (Content-Length로 multipart 파싱 전에 거절)
 MEAN = [0.498, 0.498, 0.498]   # 모델 입력 정규화 mean
 STD = [0.25, 0.25, 0.25]       # 모델 입력 정규화 std
 
+# 추론 마이크로 배칭 설정 (동시 요청을 모아 한 번에 invoke)
+BATCH_INFERENCE_ENABLED = True
+BATCH_MAX_SIZE = 16            # 한 배치에 묶을 최대 요청 수
+BATCH_MAX_WAIT_MS = 5          # 배치를 채우기 위해 기다리는 최대 시간 (ms)
+BATCH_UPLOAD_MAX_FILES = 200   # /upload/batch 한 요청의 최대 파일 수
+STREAM_MAX_FILES = 1000        # /upload/stream 한 요청의 최대 파일 수
+STREAM_MAX_IN_FLIGHT = 8       # /upload/stream 동시에 처리하는 최대 이미지 수
+BATCH_UPLOAD_MAX_REQUEST_BYTES = 256 * 1024 * 1024   # /upload/batch 요청 본문 전체 최대 크기 (파일 수 제한과 별개, 본문을 받는 중에 413)
+STREAM_MAX_REQUEST_BYTES = 512 * 1024 * 1024         # /upload/stream 요청 본문 전체 최대 크기 (파일 수 제한과 별개, 본문을 받는 중에 413)
+
+# /upload CPU 파이프라인 실행 백엔드 설정
+EXECUTION_MODE = "thread"      # inline / thread / process
+EXECUTOR_WORKERS = None        # 워커 수 (None이면 CPU 코어 수)
+EXECUTOR_MAX_QUEUE = 64        # 동시에 받을 최대 요청 수, 초과 시 503
+
+# 결과 캐시 설정 (같은 이미지 + 성별 + 모델 버전이면 저장된 응답 재사용)
+MODEL_VERSION = "ttm-v1"       # 사이드카 JSON에 version이 없을 때의 TTM 모델 버전 (실제 버전은 뒤에 +파일 해시, 캐시 키에 포함)
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_MAX_ENTRIES = 10000   # 메모리 LRU 최대 개수
+RESULT_CACHE_TTL_SEC = 24 * 3600   # 캐시 유효 시간 (초)
+RESULT_CACHE_DISK = True           # RESULT_DIR/cache 에 디스크 캐시도 사용
+
+# 공유 카드 인코딩 설정
+CARD_FORMAT = "png"            # png / webp / jpeg (확장자도 함께 바뀜)
+CARD_PNG_COMPRESS_LEVEL = 1    # PNG 압축 레벨 (0~9, optimize=True 대신 빠른 압축)
+CARD_QUALITY = 85              # webp / jpeg 품질
+CARD_RENDER_MODE = "lazy"      # eager: 업로드 시 렌더링 / lazy: 카드 URL 첫 요청 시 렌더링
+CARD_CACHE_MAX_AGE = 3600      # 카드 응답 Cache-Control max-age (초)
+
 # 배포 시 분기 설정
 #IS_LOCAL = os.getenv("IS_LOCAL", "true").lower() == "true"
 #BASE_URL = (
@@ -25,4 +65,65 @@ PROD_IMAGE_URL = "http://3.39.202.184:8000/static/cards"
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 IMAGE_SAVE_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "static", "cards"))
 RESULT_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "..", "results"))
-STATIC_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "static"))
\ No newline at end of file
+STATIC_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "static"))
+
+# 결과 저장소 설정
+RESULT_STORE_BACKEND = "segment"   # file: 결과마다 JSON 파일 / segment: append-only 세그먼트 파일
+RESULT_SEGMENT_DIR = os.path.join(RESULT_DIR, "segments")
+RESULT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024   # 세그먼트 최대 크기
+RESULT_FLUSH_INTERVAL_MS = 20                 # 쓰기 스레드가 레코드를 모으는 최대 시간
+RESULT_FSYNC_INTERVAL_SEC = 1.0               # fsync 주기
+RESULT_COMPACT_INTERVAL_SEC = 600             # 세그먼트 압축 주기
+
+# 카드 / 결과 파일 저장소 (해시 prefix 샤딩 + 백그라운드 GC, 기존 평평한 폴더는 scripts/migrate_storage.py로 이전)
+STORAGE_SHARD_DEPTH = 2                                  # 샤드 폴더 깊이 (root/ab/cd/{파일})
+STORAGE_INDEX_DIR = os.path.join(RESULT_DIR, "index")    # 파일별 크기/생성 시각 인덱스 (sqlite)
+STORAGE_GC_ENABLED = True
+STORAGE_GC_INTERVAL_SEC = 600                            # GC 주기
+CARD_TTL_SEC = 30 * 24 * 3600                            # 카드 파일 보관 시간 (지나면 삭제, 다시 요청되면 결과로 재렌더링)
+CARD_MAX_BYTES = 2 * 1024 ** 3                           # 카드 파일 전체 크기 상한 (None이면 무제한)
+RESULT_TTL_SEC = 180 * 24 * 3600                         # 결과 보관 시간 (세그먼트 / 결과 파일)
+RESULT_MAX_BYTES = 5 * 1024 ** 3                         # 결과 전체 크기 상한 (None이면 무제한)
+RESULT_CACHE_MAX_BYTES = 1024 ** 3                       # 디스크 결과 캐시 전체 크기 상한
+
+# 평균 임베딩 저장소 (읽기 전용 memmap, 모든 워커가 같은 페이지 공유)
+# 파일이 없으면 기존 mean_embeddings.npz / mean_embeddings.npy 순서로 로드
+EMBEDDING_STORE_PATH = os.path.join(BASE_DIR, "models", "mean_embeddings.emb")
+
+# 모델 레지스트리 설정 (모델 파일 옆 같은 이름의 .json 사이드카에 버전/메타데이터)
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+TTM_MODEL_PATH = os.path.join(MODEL_DIR, "model_unquant.tflite")
+EMBEDDING_MODEL_PATH = os.path.join(MODEL_DIR, "efficientnet.tflite")
+TTM_MODEL_PRECISION = "float32"        # float32 / fp16 / int8-dynamic / int8 (scripts/quantize_models.py로 생성)
+EMBEDDING_MODEL_PRECISION = "float32"
+MODEL_WARMUP_RUNS = 2              # 교체 전 더미 invoke 횟수
+MODEL_WATCH_ENABLED = True         # 모델/사이드카 파일이 바뀌면 자동으로 다시 로드
+MODEL_WATCH_INTERVAL_SEC = 5.0     # 파일 변경 확인 주기
+STARTUP_WARMUP_BACKGROUND = True  # True: 서버를 먼저 열고 백그라운드에서 워밍업 (끝나면 /ready 200) / False: 워밍업 후 서버 시작
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")   # /admin 요청에 X-Admin-Token 헤더로 필요 (설정하지 않으면 /admin 전체 403)
+
+# 닮은 얼굴 검색 인덱스 (참조 얼굴 임베딩 top-k, scripts/build_lookalike_index.py로 생성, app/utils/lookalike_index.py)
+LOOKALIKE_INDEX_DIR = os.path.join(MODEL_DIR, "lookalike")
+LOOKALIKE_SEARCH_MODE = "ivfpq"   # exact (블록 행렬곱 전체 검색) / ivfpq (근사, 인덱스에 IVF-PQ가 없으면 exact)
+LOOKALIKE_TOP_K = 5               # 기본 반환 개수
+LOOKALIKE_MAX_K = 100             # 요청 가능한 최대 k
+LOOKALIKE_NPROBE = 16             # ivfpq에서 살펴볼 리스트 수 (클수록 정확, 느림)
+LOOKALIKE_RERANK = 200            # ivfpq 근사 점수 상위 몇 개를 원본 벡터로 다시 계산할지
+LOOKALIKE_BLOCK_ROWS = 8192       # exact 검색 / 인코딩 시 한 번에 float32로 바꿔 계산할 행 수
+
+# 단계별 지연 시간 메트릭 (/metrics, Prometheus 텍스트 형식)
+METRICS_ENABLED = True
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 샘플링 프로파일러 (요청 N개 중 1개를 cProfile / tracemalloc으로 기록, /admin/profiler로 켜고 끄고 내려받음)
+PROFILER_ENABLED = False       # 시작 시 켤지 여부
+PROFILER_SAMPLE_EVERY = 100    # N개 요청마다 1개 샘플링
+PROFILER_MAX_PROFILES = 20     # 최근 K개만 보관 (링 버퍼)
+PROFILER_TRACEMALLOC = False   # 샘플링한 요청 동안 메모리 할당도 추적 (켜져 있는 동안 프로세스 전체가 느려짐)
+PROFILER_TOP_N = 30            # 요약에 보여줄 함수 / 할당 위치 수
+
+# 인터프리터 풀 설정 (모델마다 인터프리터 N개, invoke마다 1개씩 빌려 씀)
+INTERPRETER_NUM_THREADS = 1           # 인터프리터 하나가 invoke에 쓰는 스레드 수
+INTERPRETER_POOL_SIZE = None          # None이면 CPU 코어 수 / INTERPRETER_NUM_THREADS
+INTERPRETER_USE_XNNPACK = True        # XNNPACK delegate 사용 (사이드카 "xnnpack"으로 모델별 지정 가능)
+INTERPRETER_CHECKOUT_TIMEOUT_SEC = 5.0   # 빌릴 인터프리터가 없을 때 기다리는 최대 시간, 초과 시 503
@@ -1,16 +1,69 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import time
 from app.routers.upload import router as upload_router
+from app.routers.cards import router as cards_router
+from app.routers.admin import router as admin_router
+from app.routers.lookalike import router as lookalike_router
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 import os
-from app.config import STATIC_DIR
+from app.config import STATIC_DIR, BATCH_INFERENCE_ENABLED, MODEL_WATCH_ENABLED, STARTUP_WARMUP_BACKGROUND, STORAGE_GC_ENABLED, UPLOAD_MAX_REQUEST_BYTES, BATCH_UPLOAD_MAX_REQUEST_BYTES, STREAM_MAX_REQUEST_BYTES
+from app.utils.inference import batch_engine
+from app.utils.executor import pipeline_executor
+from app.utils.result_store import result_store
+from app.utils.storage import storage_gc
+from app.utils.metrics import REQUEST_HISTOGRAM, metrics
+from app.utils.profiler import current_profile, profiler
+from app.utils.model_registry import model_registry
+from app.utils.upload_reader import RequestSizeLimitMiddleware, RequestTooLargeError
+from app.utils.warmup import WARMUP_STEPS, warmup_state
 
-app = FastAPI()
+# 워밍업 (모델/검출기 로드 + 더미 invoke + 기본 카드) → 배칭 엔진 / 모델 감시 시작 → /ready 200
+async def warm_up():
+    if not await run_in_threadpool(warmup_state.run, WARMUP_STEPS):
+        return
+    if BATCH_INFERENCE_ENABLED:
+        await batch_engine.start()  # 배치 수집 태스크 1개 + 인터프리터 풀 크기(load_model에서 설정)만큼 동시 실행
+    if MODEL_WATCH_ENABLED:
+        model_registry.start_watcher()  # 모델 파일이 바뀌면 무중단 교체
+
+# 서버 시작/종료 (파이프라인 실행기 / 결과 저장소 / 저장소 GC / 워밍업 / 배칭 추론 엔진)
+# 무거운 모듈(TFLite 런타임, mediapipe)은 import 시점이 아니라 여기서 워밍업할 때 로드된다.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    result_store.start()
+    pipeline_executor.start()
+    if STORAGE_GC_ENABLED:
+        storage_gc.start()  # 카드 / 결과 / 결과 캐시 파일 TTL + 용량 상한 정리
+    warmup_task = None
+    if STARTUP_WARMUP_BACKGROUND:
+        warmup_task = asyncio.create_task(warm_up())  # liveness(/)는 바로 응답, /ready는 워밍업 후 200
+    else:
+        await warm_up()
+
+    yield
+
+    if warmup_task is not None and not warmup_task.done():
+        await warmup_task
+    model_registry.stop_watcher()
+    await batch_engine.stop()
+    pipeline_executor.shutdown()
+    storage_gc.stop()
+    result_store.close()  # 남은 결과 기록 후 종료
+
+app = FastAPI(lifespan=lifespan)
 
 # static/cards 폴더 없으면 자동 생성
 os.makedirs(os.path.join(os.path.dirname(__file__), "static/cards"), exist_ok=True)
 
+# 공유 카드 서빙 (파일이 없으면 첫 요청 시 렌더링) - StaticFiles보다 먼저 등록해야 함
+app.include_router(cards_router, prefix="/static/cards")
+
 # 정적 파일 서빙 (FastAPI가 직접 static/cards/*.png 제공)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
@@ -23,8 +76,83 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 업로드 요청 본문 크기 제한: multipart 파싱(임시 파일 저장) 전에 Content-Length로, 파싱 중에는 받은 바이트 수로 413
+# 경로 → 요청 본문 전체 최대 크기
+UPLOAD_REQUEST_LIMITS = {
+    "/upload": UPLOAD_MAX_REQUEST_BYTES,
+    "/upload/batch": BATCH_UPLOAD_MAX_REQUEST_BYTES,
+    "/upload/stream": STREAM_MAX_REQUEST_BYTES,
+    "/lookalike": UPLOAD_MAX_REQUEST_BYTES,
+}
+
+def request_too_large(path: str, limit: int) -> JSONResponse:
+    if path != "/upload":
+        return JSONResponse(status_code=413, content={"detail": f"요청이 너무 큽니다. (최대 {limit // (1 << 20)}MB)"})
+    # /upload는 기존 응답 형식 유지
+    return JSONResponse(status_code=413, content={
+        "main_result": {"animal": "unknown", "score": 0.0},
+        "top_k": [],
+        "message": f"파일이 너무 큽니다. (최대 {limit // (1 << 20)}MB)",
+        "share_card_url": None
+    })
+
+app.add_middleware(RequestSizeLimitMiddleware, limits=UPLOAD_REQUEST_LIMITS, too_large=request_too_large)
+
+@app.exception_handler(RequestTooLargeError)
+async def handle_request_too_large(request: Request, exc: RequestTooLargeError):
+    return request_too_large(exc.path, exc.limit)
+
+# 라우터별 prefix (메트릭 라벨용, include_router한 라우트는 prefix 없는 경로를 가질 수 있음)
+ROUTER_PREFIXES = {"/static/cards": cards_router, "/upload": upload_router, "/admin": admin_router, "/lookalike": lookalike_router}
+ROUTE_PREFIX = {id(route): prefix for prefix, router in ROUTER_PREFIXES.items() for route in router.routes}
+
+# 요청 → 라우트 템플릿 (예: /static/cards/{filename}), 매칭된 라우트가 없으면 unmatched (StaticFiles 등)
+def route_template(request: Request) -> str:
+    route = request.scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    return ROUTE_PREFIX.get(id(route), "") + path
+
+# 요청 지연 시간 메트릭 (라우트 템플릿 + 상태 코드별) + 샘플링 프로파일러 (/upload, /upload/batch 요청 N개 중 1개)
+# /upload/stream은 응답을 보내면서 처리하므로 프로파일 대상에서 제외
+PROFILED_PATHS = ("/upload", "/upload/batch")
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    profile = None
+    if request.method == "POST" and request.url.path.rstrip("/") in PROFILED_PATHS:
+        profile = profiler.start(request.url.path)
+    token = current_profile.set(profile) if profile is not None else None
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe(REQUEST_HISTOGRAM, elapsed, endpoint=route_template(request), status=str(status))
+        if profile is not None:
+            current_profile.reset(token)
+            profiler.finish(profile, elapsed, status)
+
 # 라우터 등록
 app.include_router(upload_router, prefix="/upload")
+app.include_router(admin_router, prefix="/admin")
+app.include_router(lookalike_router, prefix="/lookalike")
 @app.get("/")
 def root():
     return {"message": "Animal Face Classifier API running."}
+
+# Prometheus 메트릭 (단계별 지연 시간 히스토그램 / 카운터, 이 프로세스 기준)
+@app.get("/metrics")
+def prometheus_metrics():
+    gauges = {"pipeline_in_flight": pipeline_executor.in_flight}
+    return Response(content=metrics.render(gauges), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# 준비 상태 (워밍업이 끝나야 200, 그 전이나 워밍업 실패 시 503)
+@app.get("/ready")
+def ready():
+    status = warmup_state.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
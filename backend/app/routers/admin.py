@@ -0,0 +1,121 @@
+from fastapi import APIRouter, Depends, Form, Header, HTTPException
+from fastapi.responses import Response
+from typing import Optional
+from app.config import ADMIN_TOKEN, PROFILER_TOP_N
+from app.utils.face_detectors import detector_stats
+from app.utils.model_registry import model_registry
+from app.utils.response_format import card_store
+from app.utils.profiler import profiler
+from app.utils.storage import storage_gc
+from starlette.concurrency import run_in_threadpool
+import logging
+import os
+import secrets
+
+# 운영용 관리자 API (모델 목록 / 무중단 모델 교체 / 얼굴 검출 백엔드 통계 / 공유 카드 통계 / 저장소 GC / 샘플링 프로파일러)
+# X-Admin-Token 헤더가 ADMIN_TOKEN 환경 변수와 같아야 한다. ADMIN_TOKEN이 없으면 모든 요청을 거부한다.
+logger = logging.getLogger("uvicorn.error")
+
+
+def check_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="관리자 API가 비활성화되어 있습니다. (ADMIN_TOKEN 미설정)")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다.")
+
+
+router = APIRouter(dependencies=[Depends(check_admin_token)])
+
+
+# 등록된 모델과 현재 버전
+@router.get("/models")
+def list_models():
+    return {"models": model_registry.models()}
+
+
+# 모델 다시 로드 (path를 주면 해당 파일로 교체)
+# 새 모델 로드 + 워밍업이 끝난 뒤 교체되므로 처리 중인 요청은 이전 버전으로 끝난다.
+@router.post("/models/{name}/reload")
+async def reload_model(name: str, path: Optional[str] = Form(None)):
+    if name not in {m["name"] for m in model_registry.models()}:
+        raise HTTPException(status_code=404, detail=f"등록되지 않은 모델입니다: {name}")
+    if path is not None and not os.path.exists(path):
+        raise HTTPException(status_code=422, detail=f"모델 파일이 없습니다: {path}")
+
+    try:
+        model = await run_in_threadpool(model_registry.reload, name, path)
+    except Exception as e:
+        logger.exception("모델 교체 실패")
+        raise HTTPException(status_code=500, detail=f"모델 교체 실패 (기존 모델 유지): {str(e)}")
+    return model.info()
+
+
+# 얼굴 검출 백엔드별 호출 수 / 미검출 수 / 지연 시간 (이 프로세스에서 사용된 백엔드만)
+@router.get("/detectors")
+def list_detectors():
+    return {"detectors": detector_stats()}
+
+
+# 공유 카드 재사용(hit) / 새로 렌더링한 수
+@router.get("/cards")
+def card_stats():
+    return card_store.stats()
+
+
+# 카드 / 결과 / 결과 캐시 저장소별 파일 수, 크기, GC로 지운 수
+@router.get("/storage")
+async def storage_stats():
+    return await run_in_threadpool(storage_gc.stats)
+
+
+# GC 즉시 실행 (TTL이 지난 파일 + 용량 상한을 넘는 오래된 파일 삭제)
+@router.post("/storage/gc")
+async def run_storage_gc():
+    return await run_in_threadpool(storage_gc.run_once)
+
+
+# 샘플링 프로파일러 상태 + 보관 중인 프로파일 목록
+@router.get("/profiler")
+def profiler_status():
+    return profiler.status()
+
+
+# 샘플링 프로파일러 켜기 / 끄기 (보내지 않은 값은 유지)
+@router.post("/profiler")
+def configure_profiler(
+    enabled: Optional[bool] = Form(None),
+    sample_every: Optional[int] = Form(None),
+    trace_memory: Optional[bool] = Form(None),
+    max_profiles: Optional[int] = Form(None),
+):
+    profiler.configure(enabled=enabled, sample_every=sample_every, trace_memory=trace_memory, max_profiles=max_profiles)
+    return profiler.status()
+
+
+def get_profile(profile_id: int):
+    profile = profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"프로파일이 없습니다: {profile_id}")
+    return profile
+
+
+# 프로파일 요약 (누적 시간 상위 함수 + 메모리 할당 상위 위치)
+@router.get("/profiler/{profile_id}")
+async def profile_summary(profile_id: int, sort: str = "cumulative", limit: int = PROFILER_TOP_N):
+    profile = get_profile(profile_id)
+    if sort not in ("cumulative", "tottime", "ncalls"):
+        raise HTTPException(status_code=422, detail="sort는 cumulative / tottime / ncalls만 지원합니다.")
+    top = await run_in_threadpool(profile.top, limit, sort)
+    return {**profile.summary(), "top": top}
+
+
+# pstats 파일 내려받기 (python -m pstats / snakeviz로 열기)
+@router.get("/profiler/{profile_id}/pstats")
+async def download_profile(profile_id: int):
+    profile = get_profile(profile_id)
+    data = await run_in_threadpool(profile.dump)
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.pstats"'},
+    )
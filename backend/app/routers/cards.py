@@ -0,0 +1,81 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response
+import hashlib
+import re
+from app.config import CARD_CACHE_MAX_AGE
+from app.utils.executor import pipeline_executor
+from app.utils.response_format import card_files, card_renderer, card_store
+from app.utils.result_store import result_store
+from starlette.concurrency import run_in_threadpool
+
+# 공유 카드 서빙 라우터
+#   /static/cards/{image_id}_app.png : 결과 레코드의 card_key → 공유 카드 파일 (기존에 image_id별로 만든 파일이 있으면 그대로)
+#   /static/cards/{card_key}.png     : 공유 카드 파일 (내용이 바뀌지 않으므로 immutable 캐시)
+# StaticFiles 마운트보다 먼저 등록해서 share_card_url을 그대로 처리한다. (파일은 해시 prefix 샤드 폴더에 있어도 URL은 그대로)
+# 공유 카드 파일이 없으면 저장된 결과 JSON으로 처음 요청될 때 렌더링하고 디스크에 캐시한다.
+router = APIRouter()
+
+CARD_FILENAME_RE = re.compile(r"^(?P<image_id>[0-9a-f]{32})_app\.(?P<ext>png|webp|jpg)$")
+SHARED_CARD_FILENAME_RE = re.compile(r"^(?P<card_key>[0-9a-f]{32})\.(?P<ext>png|webp|jpg)$")
+MEDIA_TYPES = {"png": "image/png", "webp": "image/webp", "jpg": "image/jpeg"}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+# 카드 파일 읽기 (샤드 폴더 → 아직 이전하지 않은 평평한 폴더 순서, 없으면 None)
+def read_card(filename: str):
+    return card_files.read(filename)
+
+
+# 저장된 결과의 공유 카드 (없으면 렌더링 후 저장)
+def load_result_card(result: dict) -> bytes:
+    return card_store.load(result["main_result"]["animal"], result["top_k"])
+
+
+def card_response(data: bytes, etag: str, ext: str, max_age: int, request: Request, immutable: bool = False):
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}" + (", immutable" if immutable else ""),
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=MEDIA_TYPES[ext], headers=headers)
+
+
+@router.get("/{filename}")
+async def get_share_card(filename: str, request: Request):
+    # 1. 공유 카드 파일 직접 요청
+    shared = SHARED_CARD_FILENAME_RE.match(filename)
+    if shared:
+        data = await run_in_threadpool(read_card, filename)
+        if data is None:
+            raise HTTPException(status_code=404, detail="카드를 찾을 수 없습니다.")
+        return card_response(data, f'"{shared.group("card_key")}"', shared.group("ext"), IMMUTABLE_MAX_AGE, request, immutable=True)
+
+    match = CARD_FILENAME_RE.match(filename)
+    if not match:
+        raise HTTPException(status_code=404, detail="카드를 찾을 수 없습니다.")
+    image_id = match.group("image_id")
+    ext = match.group("ext")
+
+    # 2. 이전 방식으로 image_id별로 저장된 카드 파일
+    data = await run_in_threadpool(read_card, filename)
+    if data is not None:
+        etag = f'"{hashlib.blake2b(data, digest_size=16).hexdigest()}"'
+        return card_response(data, etag, ext, CARD_CACHE_MAX_AGE, request)
+
+    # 다른 포맷으로 렌더링하도록 설정된 경우 기존 파일만 서빙
+    if ext != card_renderer.extension:
+        raise HTTPException(status_code=404, detail="카드를 찾을 수 없습니다.")
+
+    # 3. 결과 레코드의 card_key → 공유 카드 (card_key가 없는 이전 레코드는 결과로 계산)
+    result = await run_in_threadpool(result_store.get, image_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="카드를 찾을 수 없습니다.")
+    card_key = result.get("card_key") or card_store.key(result["main_result"]["animal"], result["top_k"])
+    data = await run_in_threadpool(card_store.read, card_key)
+    if data is None:
+        # 렌더링만 실행기에 맡김 (결과 조회는 이 프로세스의 저장소에서)
+        data = await pipeline_executor.run(load_result_card, result)
+
+    # 같은 image_id라도 finalize로 결과가 바뀔 수 있으므로 max-age는 기존 설정 유지, ETag는 card_key
+    return card_response(data, f'"{card_key}"', ext, CARD_CACHE_MAX_AGE, request)
@@ -0,0 +1,90 @@
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from pydantic import BaseModel
+from typing import List
+from starlette.concurrency import run_in_threadpool
+import logging
+from app.config import LOOKALIKE_MAX_K, LOOKALIKE_NPROBE, LOOKALIKE_RERANK, LOOKALIKE_SEARCH_MODE, LOOKALIKE_TOP_K
+from app.routers.upload import parse_face_box
+from app.utils.executor import pipeline_executor, QueueFullError
+from app.utils.image_preprocess_embeding import preprocess_image
+from app.utils.inference_embeding import find_lookalikes
+from app.utils.lookalike_index import SEARCH_MODES, load_lookalike_index
+from app.utils.metrics import count
+from app.utils.upload_reader import UploadTooLargeError, read_image_upload
+
+# 닮은 얼굴 검색 API (참조 얼굴 임베딩 인덱스 top-k)
+#   POST /lookalike/       : 사진 → 얼굴 crop → efficientnet 임베딩 → 가장 비슷한 참조 얼굴 k개 + 단계별 시간
+#   GET  /lookalike/stats  : 인덱스 크기 / 형식 / IVF-PQ 설정
+# 인덱스(LOOKALIKE_INDEX_DIR)가 없으면 503
+router = APIRouter()
+logger = logging.getLogger("uvicorn.error")
+
+
+class Neighbor(BaseModel):
+    rank: int
+    id: int
+    name: str
+    score: float
+
+
+class LookalikeResponse(BaseModel):
+    neighbors: List[Neighbor]
+    mode: str
+    index_size: int
+    latency_ms: dict
+
+
+@router.post("/", response_model=LookalikeResponse)
+async def find_lookalike(
+    file: UploadFile = File(...),
+    bbox: str = Form(None),
+    k: int = Form(LOOKALIKE_TOP_K),
+    mode: str = Form(LOOKALIKE_SEARCH_MODE),
+    nprobe: int = Form(LOOKALIKE_NPROBE)
+):
+    try:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"mode는 {' / '.join(SEARCH_MODES)}만 지원합니다.")
+        if not 1 <= k <= LOOKALIKE_MAX_K:
+            raise ValueError(f"k는 1~{LOOKALIKE_MAX_K} 사이여야 합니다.")
+        if nprobe < 1:
+            raise ValueError("nprobe는 1 이상이어야 합니다.")
+        face_box = parse_face_box(bbox)
+        index = await run_in_threadpool(load_lookalike_index)
+        img_bytes = await read_image_upload(file)
+
+        async with pipeline_executor.slot():
+            preprocessed = await pipeline_executor.run(preprocess_image, img_bytes, face_box)
+            neighbors, report = await pipeline_executor.run(
+                find_lookalikes, preprocessed, k, mode, nprobe, max(LOOKALIKE_RERANK, k)
+            )
+        return LookalikeResponse(
+            neighbors=neighbors[0],
+            mode=report.pop("mode"),
+            index_size=index.count,
+            latency_ms=report,
+        )
+
+    except FileNotFoundError as fe:
+        logger.warning(f"닮은 얼굴 인덱스 없음: {fe}")
+        raise HTTPException(status_code=503, detail="닮은 얼굴 검색을 사용할 수 없습니다. (인덱스 없음)")
+    except QueueFullError as qe:
+        logger.warning(f"대기열 초과: {qe}")
+        count("errors_total", kind="queue_full")
+        raise HTTPException(status_code=503, detail=str(qe), headers={"Retry-After": "1"})
+    except UploadTooLargeError as te:
+        count("errors_total", kind="too_large")
+        raise HTTPException(status_code=413, detail=str(te))
+    except ValueError as ve:
+        logger.warning(f"입력 오류: {ve}")
+        count("errors_total", kind="invalid_input")
+        raise HTTPException(status_code=422, detail=str(ve))
+
+
+@router.get("/stats")
+async def lookalike_stats():
+    try:
+        index = await run_in_threadpool(load_lookalike_index)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="닮은 얼굴 인덱스가 없습니다.")
+    return index.stats()
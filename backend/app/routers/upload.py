@@ -1,18 +1,29 @@
 from fastapi import APIRouter, File, UploadFile, Form
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from app.utils.image_preprocess import preprocess_image
-from app.utils.inference import predict_animal_face
+from app.utils.image_preprocess import preprocess_faces, preprocess_image
+from app.utils.inference import batch_engine, current_model, predict_animal_face, predict_animal_face_async, predict_animal_face_batch
+from app.utils.model_registry import LoadedModel
+from app.utils.executor import pipeline_executor, QueueFullError
+from app.utils.result_cache import result_cache, make_cache_key
+from app.utils.result_store import result_store
+from starlette.concurrency import run_in_threadpool
 import logging
 import uuid
 import os
 from app.utils.response_format import format_response
 router = APIRouter()
 logger = logging.getLogger("uvicorn.error")
-from app.utils.response_format import generate_share_card_for_app
+from app.utils.response_format import card_files, card_key_for, generate_share_card_for_app, share_card_url, card_renderer
 import json
-from app.config import IMAGE_SAVE_DIR, RESULT_DIR
+import re
+import asyncio
+import numpy as np
+from app.config import BATCH_INFERENCE_ENABLED, RESULT_CACHE_ENABLED, CARD_RENDER_MODE, BATCH_UPLOAD_MAX_FILES, STREAM_MAX_IN_FLIGHT, STREAM_MAX_FILES, CLIENT_BBOX_ENABLED, MULTI_FACE_MAX_FACES
+from app.utils.face_detectors import validate_rel_box
+from app.utils.metrics import count
+from app.utils.upload_reader import UploadTooLargeError, read_image_upload
 from fastapi import HTTPException
 
 # 응답 데이터 구조 정의
@@ -20,61 +31,213 @@ class AnimalScore(BaseModel):
     animal: str
     score: float
 
+# 얼굴 박스 (디코딩된 이미지 기준 0~1 상대 좌표)
+class FaceBox(BaseModel):
+    xmin: float
+    ymin: float
+    width: float
+    height: float
+
+# 여러 얼굴 모드의 얼굴 한 개 결과 (index: 사진 왼쪽부터 순서)
+class FaceResult(BaseModel):
+    index: int
+    bbox: FaceBox
+    main_result: AnimalScore
+    top_k: List[AnimalScore]
+    message: str
+    share_card_url: Optional[str] = None
+
 class UploadResponse(BaseModel):
     main_result: AnimalScore
     top_k: List[AnimalScore]
     message: str
     share_card_url: Optional[str] = None
+    model_version: Optional[str] = None
+    faces: Optional[List[FaceResult]] = None  # multi_face=true 일 때만 (위 필드는 가장 큰 얼굴의 결과)
+
+# 결과 JSON 구성 (card_key: 이 결과의 공유 카드 파일, 같은 내용의 카드는 파일 하나를 공유)
+def build_result_data(prediction: list, model_version: Optional[str] = None) -> dict:
+    main_animal = prediction[0]["animal"]
+    return {
+        "main_result": prediction[0],
+        "top_k": prediction[:3],
+        "message": f"{main_animal}상! 당신은 {main_animal}상의 매력을 가지고 있어요!",
+        "model_version": model_version,
+        "card_key": card_key_for(main_animal, prediction),
+    }
+
+# 예측 결과 → 카드 생성 + 결과 저장 + 응답 구성
+# render_card가 False면 lazy 모드에서는 URL만 발급하고, eager 모드에서는 카드 없이 응답
+async def finish_prediction(image_id: str, prediction: list, render_card: bool = True, model_version: Optional[str] = None) -> UploadResponse:
+    # 5. 저장 카드 이미지 생성 (lazy 모드는 URL만 발급, 첫 GET 요청 시 렌더링)
+    main_animal = prediction[0]["animal"]
+    if CARD_RENDER_MODE == "lazy":
+        app_card_url = share_card_url(image_id)
+    elif render_card:
+        app_card_url = await pipeline_executor.run(
+            generate_share_card_for_app, main_animal, image_id=image_id, top_k=prediction
+        )
+    else:
+        app_card_url = None
+
+    # 6. 결과 JSON 저장
+    result_data = build_result_data(prediction, model_version)
+    result_store.put(image_id, result_data)  # 백그라운드 쓰기 스레드가 묶어서 기록
+
+    # 7. 응답 리턴
+    return UploadResponse(
+        main_result=prediction[0],
+        top_k=prediction[:3],
+        message=result_data["message"],
+        share_card_url=app_card_url,
+        model_version=model_version
+    )
+
+# 정상 예측 + 카드 URL이 있는 응답만 캐시 (카드 없이 만든 배치 응답이 /upload로 재사용되지 않도록)
+def is_cacheable(response: UploadResponse) -> bool:
+    return response.main_result.animal != "unknown" and response.share_card_url is not None
+
+# 업로드 한 건 처리 (CPU 작업은 모두 pipeline_executor에서 실행)
+# model: 요청 시작 시점의 모델 (처리 중에 모델이 교체돼도 같은 버전으로 끝까지 처리)
+# face_box: 앱이 보낸 얼굴 박스 (있으면 서버 얼굴 검출 생략)
+async def run_upload_pipeline(img_bytes: bytes, gender: Optional[str], model: LoadedModel, face_box=None) -> UploadResponse:
+    # 1. image_id 한 번만 생성
+    image_id = uuid.uuid4().hex
+    print(f"🔥 image_id: {image_id}")
+
+    # 3. 원본 이미지 저장 (선택적. 현재는 필요 없음)
+    # image_path = os.path.join(STATIC_DIR, f"{image_id}.uploaded.png")
+    # with open(image_path, "wb") as f:
+    #     f.write(await file.read())
+
+    # 4. 전처리 및 예측
+    preprocessed = await pipeline_executor.run(preprocess_image, img_bytes, face_box)
+    if BATCH_INFERENCE_ENABLED and batch_engine.running:  # 워밍업이 끝나기 전에는 배칭 없이 바로 추론
+        prediction = await predict_animal_face_async(preprocessed, gender, model)
+    else:
+        prediction = await pipeline_executor.run(predict_animal_face, preprocessed, gender, model)
+
+    return await finish_prediction(image_id, prediction, model_version=model.version)
+
+# 여러 얼굴 처리: 디코딩 1번 + 검출 1번 → (N, 224, 224, 3) 배치로 invoke 1번 → 얼굴별 결과
+# 얼굴마다 image_id(결과 레코드, 공유 카드)를 따로 발급하고, 카드 렌더링은 render_cards일 때만 (lazy 모드는 URL만)
+async def run_faces_pipeline(img_bytes: bytes, gender: Optional[str], model: LoadedModel, render_cards: bool = False) -> UploadResponse:
+    # 1. 전처리 (얼굴이 없으면 ValueError)
+    batch, rel_boxes = await pipeline_executor.run(preprocess_faces, img_bytes, MULTI_FACE_MAX_FACES)
+
+    # 2. 한 번에 추론 (MULTI_FACE_MAX_FACES ≤ BATCH_MAX_SIZE면 invoke 1번)
+    predictions = await pipeline_executor.run(predict_animal_face_batch, batch, gender, model)
+
+    # 3. 얼굴별 카드(선택) + 결과 저장
+    responses = await asyncio.gather(*[
+        finish_prediction(uuid.uuid4().hex, prediction, render_card=render_cards, model_version=model.version)
+        for prediction in predictions
+    ])
+    faces = [
+        FaceResult(
+            index=i,
+            bbox=FaceBox(xmin=box[0], ymin=box[1], width=box[2], height=box[3]),
+            main_result=response.main_result,
+            top_k=response.top_k,
+            message=response.message,
+            share_card_url=response.share_card_url,
+        )
+        for i, (box, response) in enumerate(zip(rel_boxes, responses))
+    ]
+
+    # 4. 기존 필드는 가장 큰 얼굴의 결과 (여러 얼굴을 모르는 클라이언트도 그대로 동작)
+    largest = max(range(len(faces)), key=lambda i: rel_boxes[i][2] * rel_boxes[i][3])
+    return responses[largest].model_copy(update={"faces": faces})
+
+# 캐시 조회 → (miss면) 파이프라인 실행 → 캐시 저장
+# admit=True면 파이프라인 실행 전에 대기열 자리를 확보 (가득 차면 QueueFullError)
+# multi_face=True면 사진 속 얼굴을 모두 분석 (render_cards: 얼굴별 카드 렌더링 여부)
+async def analyze_image(img_bytes: bytes, gender: Optional[str], admit: bool = True, face_box=None,
+                        multi_face: bool = False, render_cards: bool = False) -> UploadResponse:
+    model = current_model()
+
+    # 같은 이미지 + 성별 + 모델 버전이면 캐시된 응답 그대로 반환 (전처리/추론/카드 생성 생략)
+    if RESULT_CACHE_ENABLED:
+        variant = f"faces{MULTI_FACE_MAX_FACES}" if multi_face else ""
+        cache_key = await run_in_threadpool(make_cache_key, img_bytes, gender, model.version, face_box, variant)
+        cached = await run_in_threadpool(result_cache.get, cache_key)
+        if cached is not None:
+            return UploadResponse(**cached)
+
+    # 대기열이 가득 차면 바로 503 (QueueFullError)
+    if multi_face:
+        pipeline = run_faces_pipeline(img_bytes, gender, model, render_cards)
+    else:
+        pipeline = run_upload_pipeline(img_bytes, gender, model, face_box)
+    if admit:
+        async with pipeline_executor.slot():
+            response = await pipeline
+    else:
+        response = await pipeline
+
+    # 정상 예측 결과만 캐시
+    if RESULT_CACHE_ENABLED and is_cacheable(response):
+        await run_in_threadpool(result_cache.put, cache_key, response.model_dump())
+    return response
+
+# bbox 파싱: JSON 리스트 또는 쉼표 구분 "xmin,ymin,width,height" (디코딩된 이미지 기준 0~1 상대 좌표)
+def parse_face_box(bbox: Optional[str]):
+    if not bbox or not CLIENT_BBOX_ENABLED:
+        return None
+    try:
+        values = json.loads(bbox)
+    except ValueError:
+        values = bbox.split(",")
+    return validate_rel_box(values)
 
 # /upload API
+# multi_face=true: 사진 속 얼굴을 최대 MULTI_FACE_MAX_FACES개까지 분석해서 faces에 얼굴별 결과 + 박스를 담아 응답
+# render_cards: multi_face 모드에서 얼굴별 공유 카드 렌더링 여부 (lazy 모드는 항상 URL 발급)
 @router.post("/", response_model=UploadResponse)
 async def upload_image(
     file: UploadFile = File(...),
-    gender: str = Form(None)
+    gender: str = Form(None),
+    bbox: str = Form(None),
+    multi_face: bool = Form(False),
+    render_cards: bool = Form(False)
 ):
     try:
-        if not file.filename.endswith((".jpg", ".jpeg", ".png")):
-            raise ValueError("지원하지 않는 파일 형식입니다.")
-
-        # 1. image_id 한 번만 생성
-        image_id = uuid.uuid4().hex
-        print(f"🔥 image_id: {image_id}")
-        os.makedirs(RESULT_DIR, exist_ok=True)
-
-        # 3. 원본 이미지 저장 (선택적. 현재는 필요 없음)
-        # image_path = os.path.join(STATIC_DIR, f"{image_id}.uploaded.png")
-        # with open(image_path, "wb") as f:
-        #     f.write(await file.read())
-
-        # 4. 전처리 및 예측
-        img_bytes = await file.read()
-        preprocessed = preprocess_image(img_bytes)
-        prediction = predict_animal_face(preprocessed, gender)
-
-        # 5. 저장 카드 이미지 생성
-        main_animal = prediction[0]["animal"]
-        app_card_url = generate_share_card_for_app(main_animal, image_id=image_id, top_k=prediction, save_dir=IMAGE_SAVE_DIR)
-
-        # 6. 결과 JSON 저장
-        result_data = {
-            "main_result": prediction[0],
-            "top_k": prediction[:3],
-            "message": f"{main_animal}상! 당신은 {main_animal}상의 매력을 가지고 있어요!",
-        }
-
-        with open(os.path.join(RESULT_DIR, f"{image_id}.json"), "w", encoding="utf-8") as f:
-            import json
-            json.dump(result_data, f, ensure_ascii=False, indent=2)
-
-        # 7. 응답 리턴
-        return UploadResponse(
-            main_result=prediction[0],
-            top_k=prediction[:3],
-            message=result_data["message"],
-            share_card_url=app_card_url
+        face_box = parse_face_box(bbox)
+        if multi_face and face_box is not None:
+            raise ValueError("multi_face 모드에서는 bbox를 함께 보낼 수 없습니다.")
+
+        # 크기 제한 + magic bytes 형식 확인 + 헤더 해상도 검사를 읽는 동안 수행 (확장자는 보지 않음)
+        img_bytes = await read_image_upload(file)
+        return await analyze_image(img_bytes, gender, face_box=face_box, multi_face=multi_face, render_cards=render_cards)
+
+    except QueueFullError as qe:
+        logger.warning(f"대기열 초과: {qe}")
+        count("errors_total", kind="queue_full")
+        return JSONResponse(
+            status_code=503,
+            headers={"Retry-After": "1"},
+            content={
+                "main_result": {"animal": "unknown", "score": 0.0},
+                "top_k": [],
+                "message": str(qe),
+                "share_card_url": None
+            }
+        )
+    except UploadTooLargeError as te:
+        logger.warning(f"업로드 크기 초과: {te}")
+        count("errors_total", kind="too_large")
+        return JSONResponse(
+            status_code=413,
+            content={
+                "main_result": {"animal": "unknown", "score": 0.0},
+                "top_k": [],
+                "message": str(te),
+                "share_card_url": None
+            }
         )
     except ValueError as ve:
         logger.warning(f"입력 오류: {ve}")
+        count("errors_total", kind="invalid_input")
         return JSONResponse(
             status_code=422,
             content={
@@ -87,6 +250,7 @@ async def upload_image(
 
     except Exception as e:
         logger.exception("서버 내부 오류 발생")
+        count("errors_total", kind="internal")
         return JSONResponse(
             status_code=500,
             content={
@@ -97,6 +261,217 @@ async def upload_image(
             }
         )
 
+# 배치 업로드 응답 구조
+class BatchItemResult(BaseModel):
+    index: int
+    filename: Optional[str] = None
+    ok: bool
+    result: Optional[UploadResponse] = None
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    results: List[BatchItemResult]
+
+# genders 파싱: JSON 리스트 또는 쉼표 구분 문자열 → 파일별 성별 리스트
+def parse_genders(genders: Optional[str], gender: Optional[str], n: int) -> List[Optional[str]]:
+    if not genders:
+        return [gender] * n
+    try:
+        values = json.loads(genders)
+    except ValueError:
+        values = [g.strip() for g in genders.split(",")]
+    if not isinstance(values, list) or len(values) != n:
+        raise ValueError("genders 개수가 파일 개수와 다릅니다.")
+    return [v or None for v in values]
+
+# /upload/batch API: 여러 장을 한 번에 전처리(병렬) → 배치 추론 → 이미지별 결과
+@router.post("/batch", response_model=BatchUploadResponse)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    gender: str = Form(None),
+    genders: str = Form(None),
+    render_cards: bool = Form(False)
+):
+    try:
+        if len(files) > BATCH_UPLOAD_MAX_FILES:
+            raise ValueError(f"한 번에 최대 {BATCH_UPLOAD_MAX_FILES}장까지 업로드할 수 있습니다.")
+        gender_list = parse_genders(genders, gender, len(files))
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+
+    items = [BatchItemResult(index=i, filename=f.filename, ok=False) for i, f in enumerate(files)]
+    model = current_model()
+
+    try:
+        async with pipeline_executor.slot():
+            # 1. 파일 읽기 + 캐시 조회
+            images = {}
+            cache_keys = {}
+            for i, f in enumerate(files):
+                try:
+                    img_bytes = await read_image_upload(f)
+                except ValueError as ve:  # 크기 초과 / 지원하지 않는 형식 / 해상도 초과
+                    items[i].error = str(ve)
+                    continue
+                finally:
+                    await f.close()
+                if RESULT_CACHE_ENABLED:
+                    cache_keys[i] = await run_in_threadpool(make_cache_key, img_bytes, gender_list[i], model.version)
+                    cached = await run_in_threadpool(result_cache.get, cache_keys[i])
+                    if cached is not None:
+                        items[i].ok = True
+                        items[i].result = UploadResponse(**cached)
+                        continue
+                images[i] = img_bytes
+
+            # 2. 전처리 병렬 실행 (실패한 이미지는 개별 에러)
+            indices = list(images)
+            preprocessed = await asyncio.gather(
+                *[pipeline_executor.run(preprocess_image, images[i]) for i in indices],
+                return_exceptions=True
+            )
+            ok_indices = []
+            tensors = []
+            for i, tensor in zip(indices, preprocessed):
+                if isinstance(tensor, Exception):
+                    items[i].error = str(tensor)
+                else:
+                    ok_indices.append(i)
+                    tensors.append(tensor)
+
+            # 3. (N, 224, 224, 3) 배치 추론
+            if tensors:
+                stacked = np.concatenate(tensors, axis=0)
+                try:
+                    predictions = await pipeline_executor.run(
+                        predict_animal_face_batch, stacked, [gender_list[i] for i in ok_indices], model
+                    )
+                except Exception as e:
+                    logger.exception("배치 추론 실패")
+                    count("errors_total", kind="inference")
+                    predictions = [e] * len(ok_indices)
+
+                # 4. 카드(선택) + 결과 저장
+                responses = await asyncio.gather(
+                    *[
+                        finish_prediction(uuid.uuid4().hex, prediction, render_card=render_cards, model_version=model.version)
+                        if not isinstance(prediction, Exception) else asyncio.sleep(0, prediction)
+                        for prediction in predictions
+                    ],
+                    return_exceptions=True
+                )
+                for i, response in zip(ok_indices, responses):
+                    if isinstance(response, Exception):
+                        items[i].error = str(response)
+                        continue
+                    items[i].ok = True
+                    items[i].result = response
+                    if RESULT_CACHE_ENABLED and is_cacheable(response):
+                        await run_in_threadpool(result_cache.put, cache_keys[i], response.model_dump())
+
+        return BatchUploadResponse(results=items)
+
+    except QueueFullError as qe:
+        logger.warning(f"대기열 초과: {qe}")
+        raise HTTPException(status_code=503, detail=str(qe), headers={"Retry-After": "1"})
+
+# 스트리밍 분석: 한 장 처리 (에러는 항목별로 반환)
+async def analyze_stream_item(index: int, file: UploadFile, gender: Optional[str]) -> BatchItemResult:
+    item = BatchItemResult(index=index, filename=file.filename, ok=False)
+    try:
+        img_bytes = await read_image_upload(file)
+        item.result = await analyze_image(img_bytes, gender, admit=False)
+        item.ok = item.result.main_result.animal != "unknown"
+        if not item.ok:
+            item.error = item.result.message
+    except Exception as e:
+        item.error = str(e)
+    finally:
+        await file.close()  # 처리 끝난 업로드 임시 파일은 바로 정리
+    return item
+
+# 결과 한 건 → NDJSON 줄 / SSE 이벤트
+def format_stream_item(item: BatchItemResult, fmt: str) -> str:
+    data = item.model_dump_json()
+    if fmt == "sse":
+        return f"event: result\nid: {item.index}\ndata: {data}\n\n"
+    return data + "\n"
+
+# 완료되는 순서대로 결과를 내보내는 제너레이터
+# 동시에 처리 중인 이미지는 최대 STREAM_MAX_IN_FLIGHT장이고, 새 이미지는 앞선 결과가 전송된 뒤에만 시작하므로
+# 클라이언트가 느리게 읽으면 서버도 그만큼 천천히 처리한다 (결과를 메모리에 쌓지 않음)
+async def stream_results(files: List[UploadFile], gender_list: List[Optional[str]], fmt: str):
+    pending = set()
+    next_index = 0
+    try:
+        while next_index < len(files) or pending:
+            while next_index < len(files) and len(pending) < STREAM_MAX_IN_FLIGHT:
+                pending.add(asyncio.create_task(
+                    analyze_stream_item(next_index, files[next_index], gender_list[next_index])
+                ))
+                next_index += 1
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield format_stream_item(task.result(), fmt)
+        if fmt == "sse":
+            yield f"event: done\ndata: {{\"count\": {len(files)}}}\n\n"
+    finally:
+        # 클라이언트 연결이 끊기면 남은 작업 취소
+        for task in pending:
+            task.cancel()
+
+# 스트림 응답이 어떻게 끝나든 (정상 종료 / 연결 끊김 / 본문 시작 전 실패) 대기열 자리 1개를 반환하는 응답
+# 제너레이터의 finally는 본문을 한 번도 읽지 않으면 실행되지 않으므로 자리 반환은 응답 쪽에서 한다
+class SlotStreamingResponse(StreamingResponse):
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                await self.body_iterator.aclose()  # 남은 작업 취소 (시작 전 / 이미 끝난 제너레이터는 그대로 종료)
+            finally:
+                pipeline_executor.release()
+
+# /upload/stream API: 여러 장을 분석하면서 끝나는 대로 NDJSON(기본) 또는 SSE로 전송
+@router.post("/stream")
+async def upload_stream(
+    files: List[UploadFile] = File(...),
+    gender: str = Form(None),
+    genders: str = Form(None),
+    format: str = Form("ndjson")
+):
+    try:
+        if format not in ("ndjson", "sse"):
+            raise ValueError("format은 ndjson 또는 sse만 지원합니다.")
+        if len(files) > STREAM_MAX_FILES:
+            raise ValueError(f"한 번에 최대 {STREAM_MAX_FILES}장까지 업로드할 수 있습니다.")
+        gender_list = parse_genders(genders, gender, len(files))
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+
+    # 스트림 전체가 대기열 자리 1개를 사용 (응답 시작 전에 503 판단, 반환은 SlotStreamingResponse)
+    try:
+        pipeline_executor.acquire()
+    except QueueFullError as qe:
+        logger.warning(f"대기열 초과: {qe}")
+        raise HTTPException(status_code=503, detail=str(qe), headers={"Retry-After": "1"})
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return SlotStreamingResponse(
+        stream_results(files, gender_list, format),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 결과 캐시 hit/miss 통계
+@router.get("/cache/stats")
+def cache_stats():
+    return result_cache.stats()
+
+# finalize: image_id별로 렌더링됐던 기존 카드 파일 삭제 (이제 카드는 결과 레코드의 card_key로 공유 파일을 가리킴)
+def remove_card(image_id: str):
+    card_files.delete(card_renderer.filename(image_id))
+
 @router.post("/finalize")
 async def finalize_result(
     results: str = Form(...),
@@ -109,15 +484,28 @@ async def finalize_result(
 
         if not main_result or "animal" not in main_result:
             raise ValueError("main_result가 올바르지 않음")
+        if not re.fullmatch(r"[0-9a-f]{32}", image_id):
+            raise ValueError("image_id가 올바르지 않음")
 
         main_animal = main_result["animal"]
 
-        # 이미지 생성
-        generate_share_card_for_app(animal=main_animal, image_id=image_id, top_k=top_k)
+        # 결과 JSON 갱신 (card_key가 바뀌면 카드 URL도 새 결과의 공유 카드를 가리킴)
+        result_store.put(image_id, {
+            "main_result": main_result,
+            "top_k": top_k,
+            "message": data.get("message", ""),
+            "card_key": card_key_for(main_animal, top_k),
+        })
+        await run_in_threadpool(remove_card, image_id)
+
+        # eager 모드: 공유 카드가 없으면 지금 렌더링 (lazy 모드는 다음 카드 요청 때)
+        if CARD_RENDER_MODE != "lazy":
+            await pipeline_executor.run(generate_share_card_for_app, animal=main_animal, image_id=image_id, top_k=top_k)
 
         return {"message": "Share card created successfully"}
     
     except Exception as e:
         import traceback
         traceback.print_exc()
-        raise HTTPException(status_code=400, detail=f"요청 데이터 오류: {str(e)}")
+        count("errors_total", kind="finalize")
+        raise HTTPException(status_code=400, detail=f"요청 데이터 오류: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,167 @@
+# 동적 마이크로 배칭 엔진
+# 동시에 들어온 요청들을 큐에 모았다가 최대 배치 크기 또는 최대 대기 시간에 도달하면
+# 한 번의 interpreter invoke로 처리하고, 결과를 요청별 future로 돌려준다.
+# 배치를 모으는 태스크는 1개뿐이고 (여러 개가 같은 큐를 기다리면 요청이 흩어져 배치가 1개씩으로 쪼개짐),
+# 모은 배치는 세마포어로 동시 실행 수(인터프리터 수)를 제한해서 별도 태스크로 실행한다.
+# 인터프리터가 모두 사용 중이면 빈자리가 날 때까지 다음 배치를 모으지 않으므로 그동안 들어온 요청은 큐에 쌓여 더 큰 배치가 된다.
+import asyncio
+from typing import Any, Callable, Optional, Set
+
+import numpy as np
+
+
+# 배치 크기를 2의 거듭제곱으로 올림 (입력 텐서 resize 횟수를 제한하기 위함)
+def bucket_size(n: int, max_batch_size: int) -> int:
+    size = 1
+    while size < n:
+        size *= 2
+    return min(size, max_batch_size)
+
+
+# 배치를 버킷 크기까지 0으로 패딩
+def pad_to_bucket(batch: np.ndarray, max_batch_size: int) -> np.ndarray:
+    padded_size = bucket_size(len(batch), max_batch_size)
+    if padded_size <= len(batch):
+        return batch
+    padding = np.zeros((padded_size - len(batch),) + batch.shape[1:], dtype=batch.dtype)
+    return np.concatenate([batch, padding], axis=0)
+
+
+class BatchInferenceEngine:
+    """
+    run_batch: ((N, ...) 입력, context) → (N, ...) raw output 을 반환하는 동기 함수
+    postprocess: (raw output 한 줄, gender, context) → 결과 리스트
+    context: 요청과 함께 넘기는 값 (예: 요청 시작 시점의 모델 버전). 같은 context끼리만 한 배치로 묶는다.
+    max_batch_size: 한 번에 묶을 최대 요청 수
+    max_wait_ms: 첫 요청이 들어온 뒤 배치를 채우기 위해 기다리는 최대 시간
+    num_workers: 동시에 실행할 배치 수 (인터프리터 수만큼, 배치를 모으는 태스크는 항상 1개)
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[np.ndarray, Any], np.ndarray],
+        postprocess: Callable[[np.ndarray, Optional[str], Any], list],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        num_workers: int = 1,
+    ):
+        self.run_batch = run_batch
+        self.postprocess = postprocess
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.num_workers = num_workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._running_batches: Set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._collector is not None
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max(1, self.num_workers))
+        self._collector = asyncio.create_task(self._dispatch())
+
+    async def stop(self):
+        tasks = [*self._running_batches] + ([self._collector] if self._collector else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._collector = None
+        self._running_batches.clear()
+
+        # 처리되지 못한 요청은 에러로 종료
+        while self._queue is not None and not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("배치 추론 엔진이 종료되었습니다."))
+
+    async def submit(self, input_tensor: np.ndarray, gender: Optional[str] = None, context: Any = None):
+        """(1, ...) 입력 하나를 큐에 넣고 결과를 기다린다."""
+        if not self.running:
+            raise RuntimeError("배치 추론 엔진이 시작되지 않았습니다.")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((input_tensor, gender, context, future))
+        return await future
+
+    # 큐에서 요청을 모아 배치 구성
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # 이미 큐에 쌓여 있는 요청은 기다리지 않고 바로 가져감
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    # 배치를 모으는 유일한 태스크: 인터프리터 빈자리 확보 → 배치 구성 → 실행 태스크로 넘김
+    async def _dispatch(self):
+        while True:
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running_batches.add(task)
+            task.add_done_callback(self._running_batches.discard)
+
+    async def _run_batch(self, batch: list):
+        try:
+            # 클라이언트 연결이 끊겨 취소된 요청은 제외
+            batch = [item for item in batch if not item[3].done()]
+
+            # 같은 context(모델 버전)끼리 묶어서 실행 (모델 교체 직후에는 두 그룹이 될 수 있음)
+            groups = {}
+            for item in batch:
+                groups.setdefault(id(item[2]), []).append(item)
+            for group in groups.values():
+                await self._run_group(group)
+        except asyncio.CancelledError:
+            # 엔진 종료로 실행 중이던 배치가 취소되면 남은 요청도 에러로 종료
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("배치 추론 엔진이 종료되었습니다."))
+            raise
+        finally:
+            self._slots.release()
+
+    async def _run_group(self, batch: list):
+        loop = asyncio.get_running_loop()
+        context = batch[0][2]
+        try:
+            stacked = np.concatenate([item[0] for item in batch], axis=0)
+            # 배치 크기를 버킷 단위로 맞춰 0으로 패딩
+            stacked = pad_to_bucket(stacked, self.max_batch_size)
+
+            # invoke는 CPU 작업이므로 이벤트 루프 밖(스레드)에서 실행
+            outputs = await loop.run_in_executor(None, self.run_batch, stacked, context)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # 결과를 요청별 future로 분배
+        for i, (_, gender, _, future) in enumerate(batch):
+            if future.done():
+                continue
+            try:
+                future.set_result(self.postprocess(outputs[i], gender, context))
+            except Exception as e:
+                future.set_exception(e)
@@ -0,0 +1,175 @@
+# 공유 카드 렌더링 엔진
+# 카드는 동물별로 거의 고정이므로 (배경, 제목, 동물 이름, 아이콘, 메시지)
+# 동물별 기본 카드를 미리 그려 두고, 요청마다 점수 막대 2개와 라벨만 복사본 위에 그린다.
+# 카드 내용은 (대표 동물, 상위 2개 동물, 정수 퍼센트)로만 정해지므로 card_key()로 같은 카드를 식별한다.
+import hashlib
+import io
+import os
+import threading
+from typing import Dict
+
+from PIL import Image, ImageDraw, ImageFont
+
+CARD_SIZE = (600, 600)
+
+# 점수 막대 레이아웃
+BAR_COLORS = ["#a5dff9", "#ffb5a7"]
+BAR_BACKGROUND_COLORS = ["#d8f1ff", "#ffe4d9"]
+BAR_Y = 425
+BAR_WIDTH = 320
+BAR_HEIGHT = 20
+BAR_GAP = 50
+BAR_RADIUS = 10
+
+# 인코딩 포맷별 확장자
+CARD_EXTENSIONS = {"png": "png", "webp": "webp", "jpeg": "jpg"}
+
+# 카드 레이아웃 버전 (그리는 방식이 바뀌면 올려서 기존 공유 카드 파일과 키가 겹치지 않게 함)
+CARD_LAYOUT_VERSION = "1"
+
+
+class CardRenderer:
+    """
+    names: {동물: 한글 이름} (예: "cat" → "고양이상")
+    messages: {동물: 카드 하단 메시지}
+    font_path: 카드 폰트 경로 (로드 실패 시 기본 폰트)
+    icon_dir: ic_{animal}.png 아이콘 폴더
+    fmt: png / webp / jpeg
+    png_compress_level: PNG zlib 압축 레벨 (0~9, 낮을수록 빠름)
+    quality: webp / jpeg 품질
+    """
+
+    def __init__(
+        self,
+        names: Dict[str, str],
+        messages: Dict[str, str],
+        font_path: str,
+        icon_dir: str,
+        fmt: str = "png",
+        png_compress_level: int = 1,
+        quality: int = 85,
+    ):
+        if fmt not in CARD_EXTENSIONS:
+            raise ValueError(f"지원하지 않는 카드 포맷입니다: {fmt}")
+        self.names = names
+        self.messages = messages
+        self.font_path = font_path
+        self.icon_dir = icon_dir
+        self.fmt = fmt
+        self.png_compress_level = png_compress_level
+        self.quality = quality
+        self._fonts = None
+        self._base_cards: Dict[str, Image.Image] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def extension(self) -> str:
+        return CARD_EXTENSIONS[self.fmt]
+
+    # 폰트는 한 번만 로드
+    def fonts(self) -> dict:
+        if self._fonts is None:
+            try:
+                self._fonts = {
+                    "title": ImageFont.truetype(self.font_path, 28),
+                    "result": ImageFont.truetype(self.font_path, 36),
+                    "bar": ImageFont.truetype(self.font_path, 18),
+                    "message": ImageFont.truetype(self.font_path, 22),
+                }
+            except Exception:
+                default = ImageFont.load_default()
+                self._fonts = {"title": default, "result": default, "bar": default, "message": default}
+        return self._fonts
+
+    # 모든 동물의 기본 카드 미리 렌더링 (서버 시작 시 호출)
+    def warm_up(self):
+        for animal in self.names:
+            self.base_card(animal)
+
+    def base_card(self, animal: str) -> Image.Image:
+        base = self._base_cards.get(animal)
+        if base is None:
+            with self._lock:
+                base = self._base_cards.get(animal)
+                if base is None:
+                    base = self._render_base(animal)
+                    self._base_cards[animal] = base
+        return base
+
+    # 동물별 고정 레이어: 배경, 제목, 동물 이름, 아이콘, 메시지, 막대 배경
+    def _render_base(self, animal: str) -> Image.Image:
+        width, height = CARD_SIZE
+        fonts = self.fonts()
+        img = Image.new("RGB", (width, height), color=(240, 220, 200))
+        draw = ImageDraw.Draw(img)
+        draw.rounded_rectangle([20, 20, width - 20, height - 20], radius=30, fill=(255, 255, 255), outline=(112, 84, 56), width=4)
+
+        message = self.messages.get(animal, f"{animal}상이에요!")
+
+        draw.text((width // 2, 60), "내 동물상 분석 결과", font=fonts["title"], fill=(112, 84, 56), anchor="mm")
+        draw.text((width // 2, 110), f"{self.names.get(animal, animal + '상')}!!", font=fonts["result"], fill="black", anchor="mm")
+
+        try:
+            animal_img_path = os.path.join(self.icon_dir, f"ic_{animal}.png")
+            with Image.open(animal_img_path) as icon:
+                animal_img = icon.convert("RGBA").resize((200, 200))
+            img.paste(animal_img, (width // 2 - 100, 150), animal_img)
+        except Exception as e:
+            print(f"❌ 동물 이미지 로드 실패: {e}")
+
+        draw.text((width // 2, 370), message, font=fonts["message"], fill=(112, 84, 56), anchor="mm")
+
+        x0 = (width - BAR_WIDTH) // 2
+        for i, color in enumerate(BAR_BACKGROUND_COLORS):
+            y0 = BAR_Y + i * BAR_GAP
+            draw.rounded_rectangle([x0, y0, x0 + BAR_WIDTH, y0 + BAR_HEIGHT], radius=BAR_RADIUS, fill=color)
+        return img
+
+    def render(self, animal: str, top_k: list) -> Image.Image:
+        """기본 카드 복사본 위에 상위 2개 점수 막대와 라벨만 그린다."""
+        img = self.base_card(animal).copy()
+        draw = ImageDraw.Draw(img)
+        bar_font = self.fonts()["bar"]
+        width, _ = CARD_SIZE
+
+        for i, item in enumerate(top_k[:2]):
+            label = self.names.get(item["animal"], f"{item['animal']}상")
+            percent = int(item['score'])
+            percent_text = f"{percent}%"
+            score = percent / 100  # 막대 길이도 표시되는 정수 퍼센트 기준 (같은 키 = 같은 카드)
+
+            x0 = (width - BAR_WIDTH) // 2
+            y0 = BAR_Y + i * BAR_GAP
+            x1 = x0 + BAR_WIDTH
+            y1 = y0 + BAR_HEIGHT
+
+            draw.text((x0, y0 - 25), f"{label}", font=bar_font, fill="black")
+            draw.text((x1, y0 - 25), percent_text, font=bar_font, fill="black", anchor="ra")
+            draw.rounded_rectangle([x0, y0, x0 + int(BAR_WIDTH * score), y1], radius=BAR_RADIUS, fill=BAR_COLORS[i])
+
+        return img
+
+    def encode(self, img: Image.Image) -> bytes:
+        """설정된 포맷으로 인코딩 (PNG는 optimize 대신 낮은 압축 레벨 사용)"""
+        buf = io.BytesIO()
+        if self.fmt == "png":
+            img.save(buf, format="PNG", compress_level=self.png_compress_level)
+        elif self.fmt == "webp":
+            img.save(buf, format="WEBP", quality=self.quality, method=0)
+        else:
+            img.save(buf, format="JPEG", quality=self.quality)
+        return buf.getvalue()
+
+    def render_bytes(self, animal: str, top_k: list) -> bytes:
+        return self.encode(self.render(animal, top_k))
+
+    def filename(self, image_id: str) -> str:
+        return f"{image_id}_app.{self.extension}"
+
+    def card_key(self, animal: str, top_k: list) -> str:
+        """렌더링 입력(대표 동물, 상위 2개 동물 + 정수 퍼센트)과 인코딩 설정으로 만든 카드 내용 키"""
+        quality = self.png_compress_level if self.fmt == "png" else self.quality
+        parts = [CARD_LAYOUT_VERSION, self.fmt, str(quality), animal]
+        parts += [f"{item['animal']}:{int(item['score'])}" for item in top_k[:2]]
+        return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=16).hexdigest()
+
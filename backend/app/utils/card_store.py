@@ -0,0 +1,78 @@
+# 공유 카드 중복 제거 저장소
+# 같은 내용의 카드는 한 번만 렌더링해서 {card_key}.{ext} 파일 하나로 저장하고,
+# 요청별 image_id는 결과 레코드의 card_key로 이 공유 파일을 가리킨다. (image_id마다 파일을 만들지 않음)
+# 카드 종류는 (대표 동물 × 상위 2개 × 정수 퍼센트)로 유한하므로 워밍업 후에는 대부분 렌더링 없이 파일만 읽는다.
+# 파일은 ShardedFileStore(해시 prefix 폴더 + TTL / 용량 GC)에 저장한다.
+import threading
+from typing import Optional
+
+from app.utils.card_renderer import CardRenderer
+from app.utils.metrics import stage_timer
+from app.utils.storage import ShardedFileStore
+
+
+class SharedCardStore:
+    """
+    renderer: 카드 렌더러 (card_key / render_bytes / extension)
+    files: 카드 파일 저장소 (공유 카드 + 이전 방식의 image_id별 카드)
+    """
+
+    def __init__(self, renderer: CardRenderer, files: ShardedFileStore):
+        self.renderer = renderer
+        self.files = files
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def key(self, animal: str, top_k: list) -> str:
+        return self.renderer.card_key(animal, top_k)
+
+    def filename(self, card_key: str) -> str:
+        return f"{card_key}.{self.renderer.extension}"
+
+    def read(self, card_key: str) -> Optional[bytes]:
+        """공유 카드 바이트 (없으면 None, 있으면 재사용 hit로 기록)"""
+        data = self.files.read(self.filename(card_key))
+        if data is None:
+            return None
+        with self._stats_lock:
+            self.hits += 1
+        return data
+
+    def ensure(self, animal: str, top_k: list) -> str:
+        """카드 파일이 없을 때만 렌더링해서 저장하고 card_key 반환"""
+        card_key = self.key(animal, top_k)
+        if self.files.exists(self.filename(card_key)):
+            with self._stats_lock:
+                self.hits += 1
+            return card_key
+
+        # 동시에 같은 카드를 만들어도 내용이 같으므로 저장소의 임시 파일 → 교체로 반쯤 쓰인 파일만 막음
+        with stage_timer("card_render"):
+            data = self.renderer.render_bytes(animal, top_k)
+        self.files.write(self.filename(card_key), data)
+        with self._stats_lock:
+            self.renders += 1
+        return card_key
+
+    def load(self, animal: str, top_k: list) -> bytes:
+        """카드 바이트 (없으면 렌더링 후 저장)"""
+        card_key = self.key(animal, top_k)
+        data = self.read(card_key)
+        if data is not None:
+            return data
+        with stage_timer("card_render"):
+            data = self.renderer.render_bytes(animal, top_k)
+        self.files.write(self.filename(card_key), data)
+        with self._stats_lock:
+            self.renders += 1
+        return data
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            total = self.hits + self.renders
+            return {
+                "hits": self.hits,
+                "renders": self.renders,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,167 @@
+# 임베딩 → 동물상 점수 계산 (벡터화 버전)
+# 클래스별 평균 임베딩을 L2 정규화된 (C, D) 행렬로 한 번만 만들어 두고,
+# 배치 임베딩 (N, D) @ (D, C) 한 번으로 cosine similarity를 계산한다.
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+# 서로 같이 나오면 부자연스러운 동물 조합 (금지 조합)
+forbidden_pairs = {
+    ('cat', 'bear'),
+    ('cat', 'dinosaur'),
+    ('snake', 'bear'),
+    ('rabbit', 'bear'),
+    ('turtle', 'cat')
+}
+
+# 성별에 따라 우선순위에서 제외할 동물 집합
+male_preference = {"bear", "tiger", "wolf"}
+female_preference = {"rabbit", "cat", "deer"}
+
+
+# 금지 조합 필터링 함수
+def filter_forbidden_pairs(top_k_list):
+    """
+    top_k_list: 동물 이름 리스트 (유사도 높은 순)
+    이미 선택된 동물들과 forbidden_pairs에 포함되는 동물은 건너뜀
+    최대 2개까지만 선택
+    """
+    result = []
+    for animal in top_k_list:
+        # 이미 선택된 동물들과 금지 조합인지 체크
+        if all((animal, other) not in forbidden_pairs and (other, animal) not in forbidden_pairs
+               for other in result):
+            result.append(animal)
+        if len(result) >= 2:  # 최대 2개까지만 선택
+            break
+    return result
+
+
+# L2 정규화 (0 벡터는 0으로 유지)
+def l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class EmbeddingScorer:
+    """
+    labels: 클래스 이름 리스트 (행렬의 행 순서)
+    matrix: (C, D) 클래스별 평균 임베딩
+    max_percent: 유사도 최대 허용값 (0~1)
+    boost_delta: top1과 top2의 유사도가 너무 비슷할 경우 top1을 얼마나 더 강조할지
+    top_k: 금지 조합 필터 전에 뽑을 후보 수
+    normalized: matrix가 이미 L2 정규화된 경우 True (memmap을 복사 없이 그대로 사용)
+    """
+
+    def __init__(
+        self,
+        labels: Sequence[str],
+        matrix: np.ndarray,
+        max_percent: float = 0.7,
+        boost_delta: float = 0.05,
+        top_k: int = 5,
+        normalized: bool = False,
+    ):
+        self.labels = list(labels)
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+        if normalized and matrix.dtype == np.float32:
+            self.matrix = matrix  # (C, D) 읽기 전용 memmap 그대로 공유
+        else:
+            self.matrix = l2_normalize(np.asarray(matrix, dtype=np.float32))  # (C, D)
+        self.max_percent = max_percent
+        self.boost_delta = boost_delta
+        self.top_k = top_k
+
+        # 성별별 사용 가능한 클래스 컬럼 마스크
+        labels_arr = np.array(self.labels)
+        self.gender_masks = {
+            "male": ~np.isin(labels_arr, list(female_preference)),
+            "female": ~np.isin(labels_arr, list(male_preference)),
+        }
+        self.all_mask = np.ones(len(self.labels), dtype=bool)
+
+    # 기존 np.save(dict) 형식의 mean_embeddings.npy 로드
+    @classmethod
+    def from_npy(cls, path: str, **kwargs) -> "EmbeddingScorer":
+        mean_embeddings = np.load(path, allow_pickle=True).item()
+        labels = list(mean_embeddings.keys())
+        matrix = np.stack([mean_embeddings[label] for label in labels])
+        return cls(labels, matrix, **kwargs)
+
+    # pickle 없는 npz (labels + embeddings)
+    @classmethod
+    def from_npz(cls, path: str, **kwargs) -> "EmbeddingScorer":
+        with np.load(path, allow_pickle=False) as data:
+            return cls([str(label) for label in data["labels"]], data["embeddings"], **kwargs)
+
+    # EmbeddingStore(.emb memmap)에서 생성 (이미 정규화된 행렬이라 복사하지 않음)
+    @classmethod
+    def from_store(cls, store, **kwargs) -> "EmbeddingScorer":
+        return cls(store.labels, store.matrix, normalized=True, **kwargs)
+
+    # 확장자에 따라 npz / npy 로드
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "EmbeddingScorer":
+        if path.endswith(".npz"):
+            return cls.from_npz(path, **kwargs)
+        return cls.from_npy(path, **kwargs)
+
+    def similarities(self, embeddings: np.ndarray) -> np.ndarray:
+        """(N, D) 임베딩 → (N, C) cosine similarity"""
+        embeddings = l2_normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+        return embeddings @ self.matrix.T
+
+    def column_mask(self, genders: Union[str, None, List[Optional[str]]], n: int) -> np.ndarray:
+        """성별 → (N, C) boolean 컬럼 마스크"""
+        if genders is None or isinstance(genders, str):
+            genders = [genders] * n
+        return np.stack([self.gender_masks.get(g, self.all_mask) for g in genders])
+
+    def score(self, embeddings: np.ndarray, genders: Union[str, None, List[Optional[str]]] = None) -> List[list]:
+        """
+        embeddings: (N, D) 임베딩 배치
+        genders: 전체 공통 성별 또는 이미지별 성별 리스트
+        반환: 이미지별 [{"animal": ..., "score": ...}, ...] (기존 출력 포맷과 동일)
+        """
+        sims = self.similarities(embeddings).astype(np.float64)
+        n = len(sims)
+        mask = self.column_mask(genders, n)
+        rows = np.arange(n)
+
+        # 1. 성별 필터링: 제외된 클래스는 -inf
+        sims = np.where(mask, sims, -np.inf)
+
+        # 2. 유사도 상한 조정 (최대값이 max_percent를 넘으면 전체 스케일 보정)
+        max_values = sims.max(axis=1, keepdims=True)
+        over = max_values > self.max_percent
+        scale = np.where(over, self.max_percent / np.where(over, max_values, 1.0), 1.0)
+        sims = np.where(over & mask, np.round(sims * scale, 4), sims)
+
+        # 3. top1 vs top2 유사도 차이가 작으면 top1 강조
+        valid_counts = mask.sum(axis=1)
+        top2 = self.top_indices(sims, 2)
+        with np.errstate(invalid="ignore"):
+            diff = np.abs(sims[rows, top2[:, 0]] - sims[rows, top2[:, 1]])
+        boost = (valid_counts >= 2) & (diff < 0.03)
+        b = rows[boost]
+        sims[b, top2[boost, 0]] = np.minimum(sims[b, top2[boost, 0]] + self.boost_delta, 1.0)
+        sims[b, top2[boost, 1]] = np.maximum(sims[b, top2[boost, 1]] - self.boost_delta, 0.0)
+
+        # 4. 상위 top_k 추출 후 금지 조합 필터 (최대 2개)
+        candidates = self.top_indices(sims, self.top_k)
+        results = []
+        for i in range(n):
+            top_k = [self.labels[c] for c in candidates[i][:valid_counts[i]]]
+            filtered_animals = filter_forbidden_pairs(top_k)
+            results.append([
+                {"animal": animal, "score": round(float(sims[i, self.label_index[animal]]), 4)}
+                for animal in filtered_animals
+            ])
+        return results
+
+    @staticmethod
+    def top_indices(sims: np.ndarray, k: int) -> np.ndarray:
+        """행별 상위 k개 인덱스 (유사도 내림차순, 동점이면 클래스 순서)"""
+        # 안정 정렬이라 동점은 클래스 순서대로 남음 (기존 sorted()와 같은 동점 처리)
+        # argpartition은 k번째 경계의 동점 중 아무거나 고를 수 있어서 쓰지 않음 (C가 작아 전체 정렬도 충분히 빠름)
+        return np.argsort(-sims, axis=1, kind="stable")[:, :k]
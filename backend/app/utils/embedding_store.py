@@ -0,0 +1,135 @@
+# 평균 임베딩 저장 포맷 (.emb)
+# pickle 없이 읽을 수 있는 작은 JSON 헤더 + L2 정규화된 float32 (C, D) 행렬 원본 바이트.
+# 서버는 행렬 부분을 읽기 전용 memmap으로 열기 때문에 uvicorn 워커/프로세스 풀 워커가
+# 같은 파일의 물리 페이지를 공유하고, 시작할 때 역직렬화 비용이 없다.
+#
+# 파일 구조
+#   [0:8)    매직 b"AEMBSTR1"
+#   [8:12)   헤더 길이 (uint32 little-endian)
+#   [12:..)  UTF-8 JSON 헤더 {"labels", "dim", "dtype", "normalized", "model_hash", "model_version", ...}
+#   (64바이트 정렬 패딩)
+#   [data_offset:)  float32 little-endian (C, D) 행렬 (row-major)
+import hashlib
+import json
+import os
+import struct
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.utils.embedding_scorer import l2_normalize
+
+MAGIC = b"AEMBSTR1"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+DTYPE = "<f4"
+
+
+# 모델 파일 해시 (헤더에 기록해서 어떤 모델로 만든 임베딩인지 확인)
+def model_file_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def write_embedding_store(
+    path: str,
+    labels: Sequence[str],
+    matrix: np.ndarray,
+    model_hash: str = "",
+    model_version: str = "",
+    extra: Optional[dict] = None,
+):
+    """
+    labels: 클래스 이름 리스트 (행 순서)
+    matrix: (C, D) 클래스별 평균 임베딩 (저장 시 L2 정규화)
+    model_hash / model_version: 임베딩을 만든 모델 정보
+    extra: 헤더에 같이 기록할 추가 정보 (예: 클래스별 이미지 수)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] != len(labels):
+        raise ValueError(f"행렬 크기가 라벨 수와 맞지 않습니다: {matrix.shape}, labels={len(labels)}")
+    matrix = np.ascontiguousarray(l2_normalize(matrix), dtype=DTYPE)
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "labels": [str(label) for label in labels],
+        "count": int(matrix.shape[0]),
+        "dim": int(matrix.shape[1]),
+        "dtype": "float32",
+        "normalized": True,
+        "model_hash": model_hash,
+        "model_version": model_version,
+    }
+    if extra:
+        header.update(extra)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix_len = len(MAGIC) + 4 + len(header_bytes)
+    padding = (-prefix_len) % ALIGNMENT
+
+    # 같은 디렉토리의 임시 파일에 쓰고 교체 (읽는 쪽은 항상 완성된 파일만 봄)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * padding)
+        f.write(matrix.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class EmbeddingStore:
+    """
+    .emb 파일을 읽기 전용 memmap으로 연 결과
+    labels: 클래스 이름 리스트
+    matrix: (C, D) float32 memmap (L2 정규화됨, 쓰기 불가)
+    header: JSON 헤더 전체
+    """
+
+    def __init__(self, path: str, labels: list, matrix: np.ndarray, header: dict):
+        self.path = path
+        self.labels = labels
+        self.matrix = matrix
+        self.header = header
+
+    @property
+    def dim(self) -> int:
+        return self.header["dim"]
+
+    @property
+    def model_hash(self) -> str:
+        return self.header.get("model_hash", "")
+
+    @property
+    def model_version(self) -> str:
+        return self.header.get("model_version", "")
+
+    @classmethod
+    def open(cls, path: str) -> "EmbeddingStore":
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"임베딩 저장소 파일이 아닙니다: {path}")
+            (header_len,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+        if header.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 임베딩 저장소 버전입니다: {header.get('format_version')}")
+        prefix_len = len(MAGIC) + 4 + header_len
+        data_offset = prefix_len + (-prefix_len) % ALIGNMENT
+        shape = (header["count"], header["dim"])
+
+        expected_size = data_offset + shape[0] * shape[1] * 4
+        if os.path.getsize(path) != expected_size:
+            raise ValueError(f"임베딩 저장소 크기가 헤더와 다릅니다: {path}")
+
+        # 읽기 전용 memmap → 같은 파일을 연 모든 프로세스가 페이지 캐시를 공유
+        matrix = np.memmap(path, dtype=DTYPE, mode="r", offset=data_offset, shape=shape)
+        return cls(path, list(header["labels"]), matrix, header)
+
+    def as_dict(self) -> dict:
+        """{label: list[float]} (Android mean_embeddings.json 형식)"""
+        return {label: self.matrix[i].tolist() for i, label in enumerate(self.labels)}
@@ -0,0 +1,142 @@
+# /upload CPU 파이프라인 실행 백엔드
+# 전처리(디코딩/얼굴 검출), 추론, 카드 렌더링 같은 CPU 작업을 이벤트 루프 밖에서 실행한다.
+#   - inline  : 기존처럼 이벤트 루프에서 바로 실행 (디버깅용)
+#   - thread  : 스레드 풀에서 실행 (PIL/OpenCV/TFLite는 GIL을 놓기 때문에 병렬 처리 가능)
+#   - process : 프로세스 풀에서 실행, 워커마다 자체 얼굴 디텍터/인터프리터 보유
+# 워커에서 모인 단계별 메트릭은 결과와 함께 부모로 넘겨 합치고, 샘플링된 요청이면 실행기 안에서 cProfile을 켠다.
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+from app.config import EXECUTION_MODE, EXECUTOR_MAX_QUEUE, EXECUTOR_WORKERS
+from app.utils.metrics import count, metrics
+from app.utils.profiler import current_profile, profile_call
+
+EXECUTION_MODES = ("inline", "thread", "process")
+
+
+# 대기열이 가득 찬 경우 (라우터에서 503으로 변환)
+class QueueFullError(Exception):
+    pass
+
+
+# 프로세스 풀 워커 초기화 함수 (워커 시작 시 1번만 실행)
+def init_worker():
+    # 워커마다 자기 얼굴 디텍터와 TFLite 인터프리터를 미리 만들고 워밍업해서 첫 요청 지연을 없앤다.
+    # 프로세스가 곧 병렬 단위이므로 워커 안의 인터프리터 풀은 1개로 제한
+    from app.utils.model_registry import model_registry
+    model_registry.pool_size = 1
+    from app.utils.warmup import WARMUP_STEPS, WarmupState
+    WarmupState().run(WARMUP_STEPS)
+    metrics.drain()  # 워밍업 시간은 요청 메트릭에서 제외
+
+
+# 프로세스 풀 워커에서 실행: (결과, 예외, 메트릭 변화량, cProfile 통계)
+def run_in_worker(fn, profile: bool, args, kwargs):
+    result = error = stats = None
+    try:
+        if profile:
+            result, stats = profile_call(fn, *args, **kwargs)
+        else:
+            result = fn(*args, **kwargs)
+    except Exception as e:
+        error = e
+    return result, error, metrics.drain(), stats
+
+
+class PipelineExecutor:
+    """
+    mode: inline / thread / process
+    max_workers: 워커 수 (None이면 CPU 코어 수)
+    max_queue: 동시에 받아들일 최대 요청 수 (실행 중 + 대기 중), 초과 시 QueueFullError
+    """
+
+    def __init__(self, mode: str = "thread", max_workers: int = None, max_queue: int = 64):
+        if mode not in EXECUTION_MODES:
+            raise ValueError(f"지원하지 않는 실행 모드입니다: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.rejected = 0
+        self._pool = None
+
+    def start(self):
+        if self._pool is not None or self.mode == "inline":
+            return
+        if self.mode == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline")
+        else:
+            # mediapipe/TFLite 객체는 fork 후 공유하면 안전하지 않으므로 spawn 사용
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+            )
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def acquire(self):
+        """대기열 자리 1개 확보. 자리가 없으면 즉시 QueueFullError."""
+        if self.in_flight >= self.max_queue:
+            self.rejected += 1
+            count("pipeline_rejected_total")
+            raise QueueFullError("요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.")
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """요청 하나가 파이프라인을 사용하는 동안 자리를 차지한다. 자리가 없으면 즉시 실패."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(self, fn, *args, **kwargs):
+        """fn(*args, **kwargs)를 실행 모드에 맞게 실행한다. (process 모드에서는 fn과 인자가 pickle 가능해야 함)"""
+        profile = current_profile.get()
+        if self.mode == "inline":
+            return profile.call(fn, *args, **kwargs) if profile is not None else fn(*args, **kwargs)
+        if self._pool is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        if self.mode == "thread":
+            call = partial(profile.call, fn, *args, **kwargs) if profile is not None else partial(fn, *args, **kwargs)
+            return await loop.run_in_executor(self._pool, call)
+
+        result, error, delta, stats = await loop.run_in_executor(
+            self._pool, partial(run_in_worker, fn, profile is not None, args, kwargs)
+        )
+        metrics.merge(delta)
+        if stats is not None:
+            profile.add(stats)
+        if error is not None:
+            raise error
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+
+# 전역 실행기 (app.main 시작 시 start)
+pipeline_executor = PipelineExecutor(
+    mode=EXECUTION_MODE,
+    max_workers=EXECUTOR_WORKERS,
+    max_queue=EXECUTOR_MAX_QUEUE,
+)
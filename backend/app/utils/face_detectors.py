@@ -0,0 +1,200 @@
+# 얼굴 검출 백엔드
+# 모든 백엔드는 RGB 이미지(NumPy)를 받아 첫 얼굴의 상대 좌표 (xmin, ymin, width, height) 또는 None을 반환한다.
+# detect_all은 여러 얼굴(단체 사진)의 상대 좌표 리스트를 신뢰도 / 크기 순으로 최대 max_faces개 반환한다.
+#   - mediapipe_short : mediapipe 근거리 모델 (model_selection=0, 셀카처럼 얼굴이 가까운 사진용)
+#   - mediapipe_full  : mediapipe 원거리 모델 (model_selection=1, 기존 기본값)
+#   - opencv_haar     : OpenCV Haar cascade (mediapipe 없이 동작, 축소 이미지에서 큰 정면 얼굴만 검출)
+#   - client_bbox     : 앱이 보낸 얼굴 박스를 그대로 사용 (검출 생략)
+# 백엔드마다 호출 수 / 미검출 수 / 평균·최대 지연 시간을 기록한다.
+# mediapipe는 tensorflow까지 끌고 와서 import가 무거우므로, mediapipe 백엔드를 처음 사용할 때 import한다.
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+RelBox = Tuple[float, float, float, float]
+DETECTOR_WARMUP_SIZE = 128
+
+
+class FaceDetector:
+    """검출 백엔드 기본 클래스 (_detect 구현 + 지연 시간 기록)"""
+
+    name = "base"
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.misses = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def detect(self, image_np: np.ndarray, hint: Optional[RelBox] = None) -> Optional[RelBox]:
+        started = time.perf_counter()
+        box = self._detect(image_np, hint)
+        self._record(started, box is not None)
+        return box
+
+    def detect_all(self, image_np: np.ndarray, max_faces: int) -> List[RelBox]:
+        started = time.perf_counter()
+        boxes = self._detect_all(image_np, max_faces)
+        self._record(started, bool(boxes))
+        return boxes
+
+    def _record(self, started: float, found: bool):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self.calls += 1
+            self.misses += not found
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def _detect(self, image_np: np.ndarray, hint: Optional[RelBox]) -> Optional[RelBox]:
+        raise NotImplementedError
+
+    def _detect_all(self, image_np: np.ndarray, max_faces: int) -> List[RelBox]:
+        """기본: 한 얼굴만 찾는 백엔드 (여러 얼굴을 지원하는 백엔드는 재정의)"""
+        box = self._detect(image_np, None)
+        return [box] if box is not None else []
+
+    def warm_up(self):
+        """빈 이미지로 한 번 검출해서 모델 로드 / 그래프 초기화를 미리 처리 (통계에는 포함하지 않음)"""
+        self._detect(np.zeros((DETECTOR_WARMUP_SIZE, DETECTOR_WARMUP_SIZE, 3), dtype=np.uint8), None)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "name": self.name,
+                "calls": self.calls,
+                "misses": self.misses,
+                "avg_ms": round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+                "max_ms": round(self.max_ms, 3),
+            }
+
+
+class MediapipeDetector(FaceDetector):
+    """
+    model_selection: 0 근거리(2m 이내) / 1 원거리(5m 이내)
+    min_confidence: 최소 검출 신뢰도
+    mediapipe 그래프는 동시에 process할 수 없으므로 스레드마다 인스턴스를 만든다.
+    """
+
+    def __init__(self, model_selection: int, min_confidence: float = 0.5):
+        super().__init__()
+        self.name = "mediapipe_short" if model_selection == 0 else "mediapipe_full"
+        self.model_selection = model_selection
+        self.min_confidence = min_confidence
+        self._local = threading.local()
+
+    def _detector(self):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            import mediapipe as mp
+            detector = mp.solutions.face_detection.FaceDetection(
+                model_selection=self.model_selection, min_detection_confidence=self.min_confidence
+            )
+            self._local.detector = detector
+        return detector
+
+    def _detect(self, image_np, hint):
+        results = self._detector().process(image_np)  # mediapipe 입력은 RGB (이전 버전은 BGR을 넘겼음, README 변경 사항 참고)
+        if not results.detections:
+            return None
+        bbox = results.detections[0].location_data.relative_bounding_box
+        return bbox.xmin, bbox.ymin, bbox.width, bbox.height
+
+    def _detect_all(self, image_np, max_faces):
+        results = self._detector().process(image_np)
+        detections = sorted(results.detections or [], key=lambda d: d.score[0], reverse=True)[:max_faces]
+        boxes = [d.location_data.relative_bounding_box for d in detections]
+        return [(b.xmin, b.ymin, b.width, b.height) for b in boxes]
+
+
+class OpenCVHaarDetector(FaceDetector):
+    """
+    max_size: 검출 전에 긴 변을 이 크기로 축소 (Haar는 작은 이미지에서도 정면 얼굴을 잘 찾음)
+    min_face_ratio: 이미지 짧은 변 대비 최소 얼굴 크기 (셀카 기준으로 크게 잡아 탐색 스케일 수를 줄임)
+    여러 얼굴이 잡히면 가장 큰 얼굴을 반환한다. (detect_all은 큰 얼굴 순)
+    """
+
+    name = "opencv_haar"
+
+    def __init__(self, max_size: int = 240, min_face_ratio: float = 0.25):
+        super().__init__()
+        self.max_size = max_size
+        self.min_face_ratio = min_face_ratio
+        self.cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        self._local = threading.local()
+
+    def _cascade(self):
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.cascade_path)
+            self._local.cascade = cascade
+        return cascade
+
+    def _detect(self, image_np, hint):
+        boxes = self._detect_all(image_np, 1)
+        return boxes[0] if boxes else None
+
+    # 큰 얼굴부터 최대 max_faces개
+    def _detect_all(self, image_np, max_faces):
+        ih, iw = image_np.shape[:2]
+        scale = min(1.0, self.max_size / max(ih, iw))
+        gray = cv2.cvtColor(image_np, cv2.COLOR_RGB2GRAY)
+        if scale < 1.0:
+            gray = cv2.resize(gray, (max(1, int(iw * scale)), max(1, int(ih * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.equalizeHist(gray)
+
+        gh, gw = gray.shape
+        min_face = max(1, int(min(gh, gw) * self.min_face_ratio))
+        faces = self._cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_face, min_face))
+        faces = sorted(faces, key=lambda f: f[2] * f[3], reverse=True)[:max_faces]
+        return [(x / gw, y / gh, w / gw, h / gh) for x, y, w, h in faces]
+
+
+class ClientBoxDetector(FaceDetector):
+    """앱이 보낸 상대 좌표 박스를 그대로 사용 (검출 생략)"""
+
+    name = "client_bbox"
+
+    def _detect(self, image_np, hint):
+        return hint
+
+
+# 앱이 보낸 박스 검증 (디코딩된 이미지 기준 상대 좌표 0~1)
+def validate_rel_box(box) -> RelBox:
+    try:
+        xmin, ymin, width, height = (float(v) for v in box)
+    except (TypeError, ValueError):
+        raise ValueError("bbox는 xmin, ymin, width, height 4개 숫자여야 합니다.")
+    if not (0.0 <= xmin < 1.0 and 0.0 <= ymin < 1.0 and 0.0 < width <= 1.0 and 0.0 < height <= 1.0):
+        raise ValueError("bbox는 이미지 크기 대비 0~1 사이의 상대 좌표여야 합니다.")
+    return xmin, ymin, width, height
+
+
+# 전역 백엔드 (이름으로 선택, 인스턴스는 처음 사용할 때 생성)
+DETECTOR_FACTORIES = {
+    "mediapipe_short": lambda: MediapipeDetector(model_selection=0),
+    "mediapipe_full": lambda: MediapipeDetector(model_selection=1),
+    "opencv_haar": lambda: OpenCVHaarDetector(),
+    "client_bbox": lambda: ClientBoxDetector(),
+}
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+def get_detector(name: str) -> FaceDetector:
+    if name not in DETECTOR_FACTORIES:
+        raise ValueError(f"지원하지 않는 얼굴 검출 백엔드입니다: {name}")
+    with _detectors_lock:
+        if name not in _detectors:
+            _detectors[name] = DETECTOR_FACTORIES[name]()
+        return _detectors[name]
+
+
+def detector_stats() -> list:
+    with _detectors_lock:
+        detectors = list(_detectors.values())
+    return [detector.stats() for detector in detectors]
@@ -1,16 +1,22 @@
 #TTM을 사용하는 방식(Teachable Machine)에서의 이미지 전처리
-import mediapipe as mp
+# 임베딩 모델(image_preprocess_embeding.py)도 같은 파이프라인을 layout / normalization만 바꿔서 사용한다.
+#   layout        : NHWC (TFLite) / NCHW
+#   normalization : unit (0~1) / mean_std (config의 MEAN, STD) / {"mean": [...], "std": [...]} (모델 사이드카)
+import threading
 import cv2
 from PIL import Image
 import numpy as np
 import io
-import torch
-import torchvision.transforms as transforms
-from app.config import RESIZE_LIMIT, DEBUG_MODE, MEAN, STD
+from app.config import RESIZE_LIMIT, DEBUG_MODE, MEAN, STD, FAST_DECODE, DETECT_MAX_SIZE, MODEL_INPUT_SIZE, FACE_DETECTOR, UPLOAD_MAX_PIXELS, MULTI_FACE_MAX_FACES
+from app.utils.face_detectors import get_detector
+from app.utils.metrics import count, stage_timer
 
-# 전역 얼굴 디텍터 (성능 향상 목적)
-mp_face = mp.solutions.face_detection
-face_detector = mp_face.FaceDetection(model_selection=1, min_detection_confidence=0.5)
+# 디코더 단계의 압축 폭탄 방어 (업로드는 app/utils/upload_reader.py에서 헤더 기준으로 먼저 거절)
+Image.MAX_IMAGE_PIXELS = UPLOAD_MAX_PIXELS
+
+# 전역 얼굴 디텍터 (FACE_DETECTOR 백엔드, 앱이 얼굴 박스를 보내면 client_bbox로 검출 생략)
+face_detector = get_detector(FACE_DETECTOR)
+client_box_detector = get_detector("client_bbox")
 
 # 얼굴 시각화 함수 (디버깅용)
 def debug_show_face_box(image_np, x1, y1, x2, y2):
@@ -22,58 +28,242 @@ def debug_show_face_box(image_np, x1, y1, x2, y2):
     plt.axis("off")
     plt.show()
 
-# 정사각형 패딩 함수 (중앙 정렬 + 검정 배경)
-def pad_to_square(image: Image.Image, fill_color=(0, 0, 0)) -> Image.Image:
-    w, h = image.size
-    size = max(w, h)
-    new_image = Image.new("RGB", (size, size), fill_color)
-    paste_pos = ((size - w) // 2, (size - h) // 2)
-    new_image.paste(image, paste_pos)
-    return new_image
+# 얼굴 검출 → 첫 얼굴의 상대 좌표 (xmin, ymin, width, height), 미검출 시 None
+def detect_face(image_np: np.ndarray):
+    with stage_timer("detect"):
+        return face_detector.detect(image_np)
 
-# ✅ Teachable Machine용 전처리 함수 (이미지 → NumPy 배열)
-def preprocess_image(image_bytes: bytes) -> np.ndarray:
-    try:
-        # 1. 이미지 바이트 → PIL 이미지
-        image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+# 상대 좌표 → 픽셀 좌표 (이미지 경계로 자름)
+def to_pixel_box(rel_box, iw: int, ih: int):
+    xmin, ymin, width, height = rel_box
+    x1 = max(0, int(xmin * iw))
+    y1 = max(0, int(ymin * ih))
+    x2 = min(iw, int((xmin + width) * iw))
+    y2 = min(ih, int((ymin + height) * ih))
+    return x1, y1, x2, y2
+
+# normalization 설정 → x * scale + offset 계수 (채널별, 0~255 입력 기준)
+def normalization_coefficients(normalization="unit"):
+    if normalization == "unit":
+        return np.full(3, 1.0 / 255.0, dtype=np.float32), np.zeros(3, dtype=np.float32)
+    if normalization == "mean_std":
+        mean, std = MEAN, STD
+    elif isinstance(normalization, dict):
+        mean, std = normalization["mean"], normalization["std"]
+    else:
+        raise ValueError(f"지원하지 않는 정규화 방식입니다: {normalization}")
+    mean = np.asarray(mean, dtype=np.float32)
+    std = np.asarray(std, dtype=np.float32)
+    # (x / 255 - mean) / std = x * (1 / (255 * std)) - mean / std
+    return (1.0 / (255.0 * std)).astype(np.float32), (-mean / std).astype(np.float32)
+
+# 스레드별 uint8 패딩 캔버스 (요청마다 새 이미지를 만들지 않고 재사용)
+_canvas_local = threading.local()
+
+def _canvas() -> np.ndarray:
+    canvas = getattr(_canvas_local, "canvas", None)
+    if canvas is None:
+        canvas = np.empty((MODEL_INPUT_SIZE, MODEL_INPUT_SIZE, 3), dtype=np.uint8)
+        _canvas_local.canvas = canvas
+    return canvas
+
+# 얼굴 crop → 정사각형 패딩 + 224×224 리사이즈 → 정규화
+# 패딩된 정사각형을 따로 만들지 않고, crop을 축소해서 캔버스 중앙에 바로 쓴 뒤 float32 출력 버퍼로 한 번에 정규화한다.
+# out: 결과를 쓸 버퍼 (예: 배치 배열의 한 칸 batch[i]), 없으면 (1, 224, 224, 3) 또는 (1, 3, 224, 224) 새로 할당
+def face_to_input(face_crop: np.ndarray, layout: str = "NHWC", normalization="unit", out: np.ndarray = None) -> np.ndarray:
+    if layout not in ("NHWC", "NCHW"):
+        raise ValueError(f"지원하지 않는 입력 레이아웃입니다: {layout}")
+    h, w = face_crop.shape[:2]
+    if h == 0 or w == 0:
+        raise ValueError("얼굴 영역이 비어 있습니다.")
+
+    # 1. 정사각형 패딩 기준으로 축소 비율 계산 후 캔버스 중앙에 바로 리사이즈
+    size = max(h, w)
+    new_w = max(1, round(w * MODEL_INPUT_SIZE / size))
+    new_h = max(1, round(h * MODEL_INPUT_SIZE / size))
+    x0 = (MODEL_INPUT_SIZE - new_w) // 2
+    y0 = (MODEL_INPUT_SIZE - new_h) // 2
+    canvas = _canvas()
+    canvas.fill(0)  # 검정 배경
+    interpolation = cv2.INTER_AREA if size > MODEL_INPUT_SIZE else cv2.INTER_LINEAR
+    cv2.resize(face_crop, (new_w, new_h), dst=canvas[y0:y0 + new_h, x0:x0 + new_w], interpolation=interpolation)
+
+    # 2. 출력 버퍼에 정규화하면서 float32로 기록 (NCHW는 HWC 뷰로 써서 transpose 복사 없음)
+    if out is None:
+        shape = (1, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE, 3) if layout == "NHWC" else (1, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)
+        out = np.empty(shape, dtype=np.float32)
+    target = out.reshape(out.shape[-3:])
+    if layout == "NCHW":
+        target = target.transpose(1, 2, 0)
+    scale, offset = normalization_coefficients(normalization)
+    np.multiply(canvas, scale, out=target, casting="unsafe")
+    target += offset
+    return out
+
+# 빠른 디코딩 경로 (JPEG 전용)
+# 검출은 DCT 스케일링으로 축소 디코딩한 작은 이미지에서 하고,
+# crop은 얼굴이 224px 이상 남는 가장 작은 스케일로 다시 디코딩해서 잘라낸다.
+# JPEG이 아니거나 축소 이미지에서 얼굴을 못 찾으면 None → 기존 경로로 처리
+# face_box(앱이 보낸 상대 좌표)가 있으면 검출용 디코딩과 검출을 모두 생략
+def preprocess_image_fast(image_bytes: bytes, face_box=None, layout="NHWC", normalization="unit", out=None):
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format != "JPEG":
+        return None
+    full_w, full_h = image.size
+
+    if face_box is not None:
+        rel_box = client_box_detector.detect(None, face_box)
+        small_np, small_w = None, 0
+    else:
+        # 1. 검출용 축소 디코딩 (1/2, 1/4, 1/8 중 DETECT_MAX_SIZE 이상인 가장 작은 크기)
+        with stage_timer("decode"):
+            image.draft("RGB", (DETECT_MAX_SIZE, DETECT_MAX_SIZE))
+            small_np = np.array(image.convert("RGB"))
+        small_h, small_w, _ = small_np.shape
+
+        # 2. 축소 이미지에서 얼굴 검출
+        rel_box = detect_face(small_np)
+        if rel_box is None:
+            return None
+
+    # 3. 원본 해상도 기준 얼굴 크기로 crop용 디코딩 스케일 결정
+    x1, y1, x2, y2 = to_pixel_box(rel_box, full_w, full_h)
+    face_size = max(x2 - x1, y2 - y1)
+    if face_size <= 0:
+        return None
+    scale = 1
+    while scale < 8 and face_size / (scale * 2) >= MODEL_INPUT_SIZE:
+        scale *= 2
+
+    # 4. 필요한 해상도로 디코딩 (검출용 이미지로 충분하면 재사용)
+    if small_np is not None and full_w / small_w <= scale:
+        crop_np = small_np
+    else:
+        with stage_timer("decode"):
+            crop_image = Image.open(io.BytesIO(image_bytes))
+            crop_image.draft("RGB", (-(-full_w // scale), -(-full_h // scale)))
+            crop_np = np.array(crop_image.convert("RGB"))
+    ch, cw, _ = crop_np.shape
+
+    # 5. 얼굴 crop
+    cx1, cy1, cx2, cy2 = to_pixel_box(rel_box, cw, ch)
+    face_crop = crop_np[cy1:cy2, cx1:cx2]
+
+    # 6. 디버그 시각화 (선택)
+    if DEBUG_MODE:
+        debug_show_face_box(crop_np, cx1, cy1, cx2, cy2)
+
+    with stage_timer("face_to_input"):
+        return face_to_input(face_crop, layout, normalization, out)
+
+# 전체 해상도 디코딩 (RESIZE_LIMIT로 제한, RGB NumPy 배열 반환)
+def decode_image(image_bytes: bytes) -> np.ndarray:
+    with stage_timer("decode"):
+        # 1. 이미지 바이트 → PIL 이미지 (이미 RGB면 변환 복사 없음)
+        image = Image.open(io.BytesIO(image_bytes))
         w, h = image.size
 
-        # 2. 해상도 제한 (비율 유지)
+        # 2. 해상도 제한 (비율 유지, JPEG는 디코딩 단계에서 1/2~1/8로 먼저 축소)
         if max(w, h) > RESIZE_LIMIT:
             scale = RESIZE_LIMIT / max(w, h)
-            image = image.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
-
-        # 3. PIL → NumPy → BGR (mediapipe용)
-        image_np = np.array(image)
-        image_bgr = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
-
-        # 4. 얼굴 검출 수행
-        results = face_detector.process(image_bgr)
-        if not results.detections:
-            raise ValueError("얼굴이 감지되지 않았습니다. 정면 얼굴 사진을 다시 업로드해주세요.")
-
-        # 5. 첫 얼굴 박스 좌표 계산
-        bbox = results.detections[0].location_data.relative_bounding_box
-        ih, iw, _ = image_np.shape
-        x1 = max(0, int(bbox.xmin * iw))
-        y1 = max(0, int(bbox.ymin * ih))
-        x2 = min(iw, int((bbox.xmin + bbox.width) * iw))
-        y2 = min(ih, int((bbox.ymin + bbox.height) * ih))
-
-        # 6. 얼굴 crop 및 정사각형 패딩
-        face_crop = image_np[y1:y2, x1:x2]
-        face_pil = Image.fromarray(face_crop)
-        face_pil = pad_to_square(face_pil)
-
-        # 7. 디버그 시각화 (선택)
-        if DEBUG_MODE:
-            debug_show_face_box(image_np, x1, y1, x2, y2)
-
-        # 8.TFLite 입력용 전처리 (정규화 범위: [0, 1], torch 제거)
-        face_pil = face_pil.resize((224, 224))
-        face_np = np.array(face_pil).astype(np.float32) / 255.0  # Normalize(mean, std) 제거
-
-        return np.expand_dims(face_np, axis=0)  # (1, 224, 224, 3)
+            target = (int(w * scale), int(h * scale))
+            image.draft("RGB", target)
+            if image.mode != "RGB":
+                image = image.convert("RGB")
+            if max(image.size) > RESIZE_LIMIT:
+                image = image.resize(target, Image.LANCZOS)
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        # 3. PIL → NumPy
+        return np.array(image)
+
+# 기존 경로: 전체 해상도 디코딩 후 검출 (face_box가 있으면 검출 생략)
+def preprocess_image_full(image_bytes: bytes, face_box=None, layout="NHWC", normalization="unit", out=None) -> np.ndarray:
+    # 1. 디코딩
+    image_np = decode_image(image_bytes)
+
+    # 2. 얼굴 검출 수행
+    rel_box = client_box_detector.detect(image_np, face_box) if face_box is not None else detect_face(image_np)
+    if rel_box is None:
+        count("faces_not_found_total")
+        raise ValueError("얼굴이 감지되지 않았습니다. 정면 얼굴 사진을 다시 업로드해주세요.")
+
+    # 3. 첫 얼굴 박스 좌표 계산
+    ih, iw, _ = image_np.shape
+    x1, y1, x2, y2 = to_pixel_box(rel_box, iw, ih)
+
+    # 4. 얼굴 crop (복사 없는 뷰)
+    face_crop = image_np[y1:y2, x1:x2]
+
+    # 5. 디버그 시각화 (선택)
+    if DEBUG_MODE:
+        debug_show_face_box(image_np, x1, y1, x2, y2)
+
+    # 6. 정사각형 패딩 및 TFLite 입력 변환
+    with stage_timer("face_to_input"):
+        return face_to_input(face_crop, layout, normalization, out)
+
+# 여러 얼굴 전처리 (단체 사진): 디코딩 1번 → 검출 1번 → 얼굴마다 crop / 패딩해서 (N, 224, 224, 3) 배치 하나로 쌓음
+# 검출은 긴 변 DETECT_MAX_SIZE로 줄인 사본에서 하고, crop은 디코딩한 원본에서 잘라낸다.
+# max_faces: 최대 얼굴 수 (신뢰도 / 크기 순으로 자른 뒤 왼쪽 → 오른쪽 순서로 정렬)
+# 반환: (배치 배열, 얼굴별 상대 좌표 리스트), 얼굴이 없으면 ValueError
+def preprocess_faces(image_bytes: bytes, max_faces: int = MULTI_FACE_MAX_FACES, layout: str = "NHWC", normalization="unit"):
+    try:
+        with stage_timer("preprocess"):
+            # 1. 디코딩 (1번)
+            image_np = decode_image(image_bytes)
+            ih, iw, _ = image_np.shape
+
+            # 2. 축소 사본에서 모든 얼굴 검출
+            with stage_timer("detect"):
+                scale = DETECT_MAX_SIZE / max(ih, iw)
+                if scale < 1.0:
+                    small_np = cv2.resize(image_np, (max(1, int(iw * scale)), max(1, int(ih * scale))), interpolation=cv2.INTER_AREA)
+                else:
+                    small_np = image_np
+                rel_boxes = face_detector.detect_all(small_np, max_faces)
+
+            # 3. 이미지 밖으로 나간 박스 제외 + 왼쪽부터 정렬 (응답의 얼굴 순서 = 사진 속 순서)
+            faces = []
+            for rel_box in rel_boxes:
+                x1, y1, x2, y2 = to_pixel_box(rel_box, iw, ih)
+                if x2 > x1 and y2 > y1:
+                    faces.append((rel_box, (x1, y1, x2, y2)))
+            if not faces:
+                count("faces_not_found_total")
+                raise ValueError("얼굴이 감지되지 않았습니다. 정면 얼굴 사진을 다시 업로드해주세요.")
+            faces.sort(key=lambda face: face[1][0])
+
+            # 4. 얼굴마다 패딩 + 정규화해서 배치 배열의 한 칸에 바로 기록
+            shape = (MODEL_INPUT_SIZE, MODEL_INPUT_SIZE, 3) if layout == "NHWC" else (3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)
+            batch = np.empty((len(faces),) + shape, dtype=np.float32)
+            with stage_timer("face_to_input"):
+                for i, (_, (x1, y1, x2, y2)) in enumerate(faces):
+                    face_to_input(image_np[y1:y2, x1:x2], layout, normalization, batch[i])
+
+            # 5. 디버그 시각화 (선택)
+            if DEBUG_MODE:
+                for _, (x1, y1, x2, y2) in faces:
+                    debug_show_face_box(image_np, x1, y1, x2, y2)
+
+            return batch, [tuple(float(v) for v in rel_box) for rel_box, _ in faces]
+
+    except Exception as e:
+        raise ValueError(f"{str(e)}")
+
+# ✅ Teachable Machine용 전처리 함수 (이미지 → NumPy 배열)
+# face_box: 앱이 보낸 얼굴 박스 (디코딩된 이미지 기준 상대 좌표 xmin, ymin, width, height)
+# layout / normalization: 모델 입력 형식 (기본값은 TTM: NHWC, 0~1)
+# out: 결과를 쓸 float32 버퍼 (배치 배열의 한 칸 등), 없으면 새로 할당해서 반환
+def preprocess_image(image_bytes: bytes, face_box=None, layout: str = "NHWC", normalization="unit", out: np.ndarray = None) -> np.ndarray:
+    try:
+        with stage_timer("preprocess"):  # decode / detect / face_to_input 합계 + 빠른 경로 실패 후 재시도 포함
+            if FAST_DECODE:
+                result = preprocess_image_fast(image_bytes, face_box, layout, normalization, out)
+                if result is not None:
+                    return result
+            return preprocess_image_full(image_bytes, face_box, layout, normalization, out)
 
     except Exception as e:
         raise ValueError(f"{str(e)}")
@@ -1,19 +1,40 @@
 #TTM을 사용하는 방식(Teachable Machine)
 import numpy as np 
-import tensorflow as tf
+from app.config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS, MODEL_VERSION, TTM_MODEL_PATH, TTM_MODEL_PRECISION
+from app.utils.batch_inference import BatchInferenceEngine, pad_to_bucket
+from app.utils.interpreter_pool import InterpreterCheckoutTimeout
+from app.utils.metrics import count, stage_timer
+from app.utils.model_registry import LoadedModel, model_registry, model_variant_path
 # from sklearn.metrics.pairwise import cosine_similarity
 
 # TTM은 임베딩이 아니라 softmax score 반환함
+# (사이드카 JSON에 class_names가 없을 때 사용하는 기본 클래스 순서)
 class_names = [
     "bear", "snake", "cat", "dog", "wolf", "dinosaur",
     "squirrel", "rabbit", "tiger", "turtle", "deer"
 ]
 
-# 모델 경로 및 출력 인덱스도 수정
-interpreter = tf.lite.Interpreter(model_path="app/models/model_unquant.tflite")
-interpreter.allocate_tensors()
-input_index = interpreter.get_input_details()[0]['index']
-output_index = interpreter.get_output_details()[0]['index']
+# 모델 레지스트리에 TTM 모델 등록 (app/models/model_unquant.tflite + model_unquant.json)
+# 관리자 API 또는 파일 변경 시 무중단으로 교체되므로, 요청은 current_model()로 받은 모델을 끝까지 사용
+# TTM_MODEL_PRECISION이 float32가 아니면 scripts/quantize_models.py로 만든 model_unquant.{precision}.tflite 사용
+# import 시점에는 로드하지 않고, 서버 시작(app.main lifespan) 또는 첫 사용 시 load_model()로 로드 + 워밍업
+TTM_MODEL_NAME = "ttm"
+TTM_DEFAULT_VERSION = MODEL_VERSION if TTM_MODEL_PRECISION == "float32" else f"{MODEL_VERSION}-{TTM_MODEL_PRECISION}"
+
+def load_model() -> LoadedModel:
+    model = model_registry.register(
+        TTM_MODEL_NAME,
+        model_variant_path(TTM_MODEL_PATH, TTM_MODEL_PRECISION),
+        defaults={"version": TTM_DEFAULT_VERSION, "class_names": class_names},
+    )
+    batch_engine.num_workers = model.pool.size  # 동시에 실행할 배치 수 = 인터프리터 풀 크기
+    return model
+
+def current_model() -> LoadedModel:
+    try:
+        return model_registry.get(TTM_MODEL_NAME)
+    except KeyError:
+        return load_model()
 
 # 기존에 작성했던 inference.py의 필터 유지
 forbidden_pairs = {
@@ -40,29 +61,31 @@ def gender_filter(score_dict, gender):
         return {k: v for k, v in score_dict.items() if k not in male_preference}
     return score_dict
 
-# 메인 추론 함수 (출력 포맷은 기존과 동일한 형식으로 유지)
-def predict_animal_face(img_data, gender: str = None):
-    try:
-        # 1. 입력 텐서 변환
-        if isinstance(img_data, np.ndarray):
-            input_tensor = img_data
-        else:
-            input_tensor = img_data.numpy()
+# 입력 텐서 변환 (NCHW/0~255 입력도 NHWC 0~1 float32로 맞춤)
+def to_input_tensor(img_data) -> np.ndarray:
+    input_tensor = np.asarray(img_data)
 
-        if input_tensor.shape[1] == 3:
-            input_tensor = np.transpose(input_tensor, (0, 2, 3, 1))  # NCHW → NHWC
+    if input_tensor.shape[1] == 3:
+        input_tensor = np.transpose(input_tensor, (0, 2, 3, 1))  # NCHW → NHWC
 
-        input_tensor = input_tensor.astype(np.float32)
-        if input_tensor.max() > 1.0:
-            input_tensor /= 255.0  # ✅ TTM은 0~1 범위
+    input_tensor = input_tensor.astype(np.float32, copy=False)  # 전처리 결과(float32)는 복사하지 않음
+    if input_tensor.max() > 1.0:
+        input_tensor = input_tensor / 255.0  # ✅ TTM은 0~1 범위
+    return input_tensor
 
-        # 2. 추론
-        interpreter.set_tensor(input_index, input_tensor)
-        interpreter.invoke()
-        output = interpreter.get_tensor(output_index).squeeze()  # (11,)
-        print("TTM 모델 raw output:", output)
+# 배치 추론: (N, 224, 224, 3) → (N, 11) softmax score
+def run_batch(input_tensor: np.ndarray, model: LoadedModel = None) -> np.ndarray:
+    model = model or current_model()
+    with stage_timer("invoke_ttm"):
+        return model.run_batch(input_tensor)
+
+# 한 장의 raw output (11,) → 결과 포맷
+def postprocess_scores(output: np.ndarray, gender: str = None, model: LoadedModel = None):
+    model = model or current_model()
+
+    with stage_timer("postprocess"):
         # 3. 점수 딕셔너리 구성
-        score_dict = {cls: float(score) for cls, score in zip(class_names, output)}
+        score_dict = {cls: float(score) for cls, score in zip(model.class_names, output)}
 
         # 4. 성별 필터링 적용
         score_dict = gender_filter(score_dict, gender)
@@ -86,6 +109,64 @@ def predict_animal_face(img_data, gender: str = None):
 
         return results
 
+# 마이크로 배칭 엔진 (app.main 시작 시 start, 동시 요청을 한 번의 invoke로 묶음)
+# 요청마다 넘긴 모델(context)별로 배치를 나눠서 모델 교체 중에도 버전이 섞이지 않음
+# 배치는 1개 태스크가 모으고, 인터프리터 풀 크기만큼 동시에 실행 (num_workers는 load_model()에서 설정)
+batch_engine = BatchInferenceEngine(
+    run_batch=run_batch,
+    postprocess=postprocess_scores,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+)
+
+# 메인 추론 함수 (출력 포맷은 기존과 동일한 형식으로 유지)
+# model을 넘기지 않으면 현재 버전 모델 사용
+def predict_animal_face(img_data, gender: str = None, model: LoadedModel = None):
+    try:
+        # 1. 입력 텐서 변환
+        input_tensor = to_input_tensor(img_data)
+
+        # 2. 추론
+        model = model or current_model()
+        output = run_batch(input_tensor, model)[0]  # (11,)
+        print("TTM 모델 raw output:", output)
+
+        return postprocess_scores(output, gender, model)
+
+    except InterpreterCheckoutTimeout:
+        raise  # 라우터에서 503으로 응답
+    except Exception as e:
+        print(f"추론 실패: {e}")
+        count("errors_total", kind="inference")
+        return [{"animal": "unknown", "score": 0.0}]
+
+# 여러 장 배치 추론 함수 (N, 224, 224, 3) → 이미지별 결과 리스트
+# genders: 공통 성별 또는 이미지별 성별 리스트
+# 배칭 엔진과 같은 버킷 크기로 나눠 invoke해서 입력 텐서 재할당을 피함
+def predict_animal_face_batch(img_data, genders=None, model: LoadedModel = None):
+    model = model or current_model()
+    input_tensor = to_input_tensor(img_data)
+    n = len(input_tensor)
+    if genders is None or isinstance(genders, str):
+        genders = [genders] * n
+
+    outputs = []
+    for start in range(0, n, BATCH_MAX_SIZE):
+        chunk = input_tensor[start:start + BATCH_MAX_SIZE]
+        outputs.append(run_batch(pad_to_bucket(chunk, BATCH_MAX_SIZE), model)[:len(chunk)])
+    output = np.concatenate(outputs, axis=0)
+
+    return [postprocess_scores(o, g, model) for o, g in zip(output, genders)]
+
+# 비동기 추론 함수 (배칭 엔진 경유, 이벤트 루프를 막지 않음)
+async def predict_animal_face_async(img_data, gender: str = None, model: LoadedModel = None):
+    try:
+        input_tensor = to_input_tensor(img_data)
+        return await batch_engine.submit(input_tensor, gender, model or current_model())
+
+    except InterpreterCheckoutTimeout:
+        raise  # 라우터에서 503으로 응답
     except Exception as e:
         print(f"추론 실패: {e}")
+        count("errors_total", kind="inference")
         return [{"animal": "unknown", "score": 0.0}]
\ No newline at end of file
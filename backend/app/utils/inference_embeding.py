@@ -1,147 +1,144 @@
 #멀티라벨로 학습한 모델을 임베딩 벡터 추출하여 Cosine 유사도를 기반으로 추론
+import os
+import time
 import numpy as np 
-import tensorflow as tf
-from sklearn.metrics.pairwise import cosine_similarity
-
-# 평균 임베딩 로드 (딱 1번만 로드해서 계속 재사용)
-mean_embeddings = np.load("app/models/mean_embeddings.npy", allow_pickle=True).item()
-
-# TFLite 모델 초기화
-interpreter = tf.lite.Interpreter(model_path="app/models/efficientnet.tflite")
-interpreter.allocate_tensors()
-input_index = interpreter.get_input_details()[0]['index']
-embedding_index = 173  # 임베딩 텐서 인덱스 (모델에 맞게 확인 필요)
-
-# === 후처리용 상수 및 함수들 ===
-
-# 서로 같이 나오면 부자연스러운 동물 조합 (금지 조합)
-forbidden_pairs = {
-    ('cat', 'bear'),
-    ('cat', 'dinosaur'),
-    ('snake', 'bear'),
-    ('rabbit', 'bear'),
-    ('turtle', 'cat')
-}
-
-# 성별에 따라 우선순위에서 제외할 동물 집합
-male_preference = {"bear", "tiger", "wolf"}
-female_preference = {"rabbit", "cat", "deer"}
-
-# 금지 조합 필터링 함수
-def filter_forbidden_pairs(top_k_list):
-    """
-    top_k_list: 동물 이름 리스트 (유사도 높은 순)
-    이미 선택된 동물들과 forbidden_pairs에 포함되는 동물은 건너뜀
-    최대 2개까지만 선택
-    """
-    result = []
-    for animal in top_k_list:
-        # 이미 선택된 동물들과 금지 조합인지 체크
-        if all((animal, other) not in forbidden_pairs and (other, animal) not in forbidden_pairs
-               for other in result):
-            result.append(animal)
-        if len(result) >= 2:  # 최대 2개까지만 선택
-            break
-    return result
-
-# 성별에 따라 특정 동물 제외하는 필터 함수
-def gender_filter(sim_dict, gender):
-    """
-    sim_dict: {동물: 유사도} 딕셔너리
-    gender: 'male' 또는 'female' 또는 None
-    성별에 따라 해당 성별과 덜 어울리는 동물 제거
-    """
-    if gender == "male":
-        sim_dict = {k: v for k, v in sim_dict.items() if k not in female_preference}
-    elif gender == "female":
-        sim_dict = {k: v for k, v in sim_dict.items() if k not in male_preference}
-    return sim_dict
-
-# 유사도 최대값을 max_percent로 제한하고 비율에 맞춰 전체 조정
-# 새로운 커스터마이징 함수
-def adjust_similarity(similarity_dict, max_percent=0.7, boost_delta=0.05):
-    """
-    similarity_dict: {동물: 유사도} 딕셔너리
-    max_percent: 유사도 최대 허용값 (0~1)
-    boost_delta: top1과 top2의 유사도가 너무 비슷할 경우 top1을 얼마나 더 강조할지
-    """
-    if not similarity_dict:
-        return similarity_dict
-
-    # 1. 전체 스케일 보정
-    max_value = max(similarity_dict.values())
-    if max_value > max_percent:
-        scale = max_percent / max_value
-        similarity_dict = {k: round(v * scale, 4) for k, v in similarity_dict.items()}
-
-    # 2. top1 vs top2 유사도 차이 강조
-    sorted_items = sorted(similarity_dict.items(), key=lambda x: x[1], reverse=True)
-    if len(sorted_items) >= 2:
-        top1_key, top1_val = sorted_items[0]
-        top2_key, top2_val = sorted_items[1]
-        diff = abs(top1_val - top2_val)
-
-        if diff < 0.03:  # 너무 비슷한 경우
-            similarity_dict[top1_key] = min(top1_val + boost_delta, 1.0)
-            similarity_dict[top2_key] = max(top2_val - boost_delta, 0.0)
-
-    return similarity_dict
-
-
-# ===============================
-
-# 메인 추론 함수
-def predict_animal_face(img_data, gender: str = None):
+from app.config import EMBEDDING_MODEL_PATH, EMBEDDING_MODEL_PRECISION, EMBEDDING_STORE_PATH
+from app.config import LOOKALIKE_NPROBE, LOOKALIKE_RERANK, LOOKALIKE_SEARCH_MODE, LOOKALIKE_TOP_K
+from app.utils.embedding_scorer import EmbeddingScorer
+from app.utils.embedding_store import EmbeddingStore
+from app.utils.interpreter_pool import InterpreterCheckoutTimeout
+from app.utils.lookalike_index import load_lookalike_index
+from app.utils.metrics import count, stage_timer
+from app.utils.model_registry import LoadedModel, model_registry, model_variant_path
+
+# 평균 임베딩 로드 (딱 1번만 로드해서 L2 정규화된 (C, D) 행렬로 계속 재사용)
+# .emb 저장소가 있으면 읽기 전용 memmap으로 열어 워커 간 페이지 공유 (pickle 없음)
+# 없으면 기존 npz / pickle npy 순서로 로드
+# import 시점에는 로드하지 않고, 서버 시작 또는 첫 사용 시 load_model()에서 평균 임베딩과 모델을 함께 로드
+embedding_store = None
+scorer = None
+
+def load_scorer() -> EmbeddingScorer:
+    global embedding_store, scorer
+    if scorer is not None:
+        return scorer
+    if os.path.exists(EMBEDDING_STORE_PATH):
+        embedding_store = EmbeddingStore.open(EMBEDDING_STORE_PATH)
+        scorer = EmbeddingScorer.from_store(embedding_store, max_percent=0.7)
+    else:
+        mean_embeddings_path = "app/models/mean_embeddings.npz"
+        if not os.path.exists(mean_embeddings_path):
+            mean_embeddings_path = "app/models/mean_embeddings.npy"
+        scorer = EmbeddingScorer.from_file(mean_embeddings_path, max_percent=0.7)
+    return scorer
+
+# TFLite 모델을 레지스트리에 등록 (app/models/efficientnet.tflite + efficientnet.json)
+# 임베딩 텐서 인덱스는 사이드카 JSON의 embedding_index (없으면 기존 값 173)
+EMBEDDING_MODEL_NAME = "embedding"
+
+# EMBEDDING_MODEL_PRECISION이 float32가 아니면 efficientnet.{precision}.tflite 사용 (임베딩 텐서 인덱스는 해당 사이드카)
+def load_model() -> LoadedModel:
+    load_scorer()
+    model = model_registry.register(
+        EMBEDDING_MODEL_NAME,
+        model_variant_path(EMBEDDING_MODEL_PATH, EMBEDDING_MODEL_PRECISION),
+        defaults={"embedding_index": 173},
+    )
+    # 평균 임베딩을 만든 모델과 현재 모델이 다르면 경고 (유사도가 의미 없어짐)
+    if embedding_store is not None and embedding_store.model_hash and embedding_store.model_hash != model.file_hash:
+        print(f"⚠️ 평균 임베딩({EMBEDDING_STORE_PATH})이 현재 임베딩 모델과 다른 모델로 생성되었습니다.")
+    return model
+
+def current_model() -> LoadedModel:
     try:
-        # 1. 입력 텐서 형식 변환 (NCHW -> NHWC)
-        if isinstance(img_data, np.ndarray):
-            input_tensor = img_data
-        else:
-            input_tensor = img_data.numpy()  # torch.Tensor인 경우 변환
+        return model_registry.get(EMBEDDING_MODEL_NAME)
+    except KeyError:
+        return load_model()
 
-        # 채널 위치가 두 번째인 경우 (N, C, H, W)
-        if input_tensor.shape[1] == 3:
-            # NHWC로 변환 (N, H, W, C)
-            input_tensor = np.transpose(input_tensor, (0, 2, 3, 1))
+# 후처리(성별 필터, 유사도 상한 조정, 금지 조합 필터)는 EmbeddingScorer에서 벡터 연산으로 처리
 
-        input_tensor = input_tensor.astype(np.float32)
+# 입력 텐서 형식 변환 (NCHW -> NHWC)
+def to_input_tensor(img_data) -> np.ndarray:
+    input_tensor = np.asarray(img_data)
 
-        # 2. TFLite 모델에 입력 텐서 세팅 및 추론 실행
-        interpreter.set_tensor(input_index, input_tensor)
-        interpreter.invoke()
+    # 채널 위치가 두 번째인 경우 (N, C, H, W)
+    if input_tensor.shape[1] == 3:
+        # NHWC로 변환 (N, H, W, C)
+        input_tensor = np.transpose(input_tensor, (0, 2, 3, 1))
 
-        # 3. 임베딩 벡터 추출
-        embedding = interpreter.get_tensor(embedding_index).reshape(-1)
+    return input_tensor.astype(np.float32, copy=False)
 
-        # 4. 각 클래스 평균 임베딩과 cosine similarity 계산
-        sims = {
-            cls: cosine_similarity(
-                embedding.reshape(1, -1), mean_vec.reshape(1, -1)
-            )[0][0]
-            for cls, mean_vec in mean_embeddings.items()
-        }
+# (N, 224, 224, 3) 입력 → (N, D) 임베딩
+def extract_embeddings(input_tensor: np.ndarray, model: LoadedModel = None) -> np.ndarray:
+    model = model or current_model()
+    with stage_timer("invoke_embedding"):
+        return model.run_batch(input_tensor, model.embedding_index)
 
-        # 4-1. 성별 기반 필터링 적용 (성별이 지정된 경우)
-        sims = gender_filter(sims, gender)
+# 배치 추론 함수 (이미지별 성별 리스트 또는 공통 성별)
+def predict_animal_face_batch(img_data, genders=None):
+    try:
+        embeddings = extract_embeddings(to_input_tensor(img_data))
+        with stage_timer("postprocess_embedding"):
+            return load_scorer().score(embeddings, genders)
 
-        # 4-2. 유사도 상한 조정 (최대 0.7)
-        sims = adjust_similarity(sims, max_percent=0.7)
+    except InterpreterCheckoutTimeout:
+        raise  # 라우터에서 503으로 응답
+    except Exception as e:
+        print(f"추론 실패: {e}")
+        count("errors_total", kind="inference")
+        return [[{"animal": "unknown", "score": 0.0}] for _ in range(len(img_data))]
 
-        # 5. 유사도 높은 상위 5개 추출 후 forbidden pairs 필터 및 최대 2개 제한
-        top_k = sorted(sims.items(), key=lambda x: x[1], reverse=True)[:5]
-        filtered_animals = filter_forbidden_pairs([x[0] for x in top_k])
+# 메인 추론 함수
+def predict_animal_face(img_data, gender: str = None):
+    try:
+        # 1. 입력 텐서 형식 변환 (NCHW -> NHWC)
+        input_tensor = to_input_tensor(img_data)
 
-        # 6. 최종 결과 리스트 생성 (유사도 * 100하여 점수화)
-        results = []
-        for animal in filtered_animals:
-            score = round(sims.get(animal, 0), 4)
-            results.append({"animal": animal, "score": score})
+        # 2. TFLite 모델에 입력 텐서 세팅 및 추론 실행 → 임베딩 벡터 추출
+        embeddings = extract_embeddings(input_tensor)
 
-        return results
+        # 3. 평균 임베딩 행렬과 cosine similarity (행렬곱 1번) + 성별 필터 + 상한 조정 + 금지 조합 필터
+        with stage_timer("postprocess_embedding"):
+            return load_scorer().score(embeddings[:1], gender)[0]
 
+    except InterpreterCheckoutTimeout:
+        raise  # 라우터에서 503으로 응답
     except Exception as e:
         print(f"추론 실패: {e}")
+        count("errors_total", kind="inference")
         # 실패 시 unknown 반환
         return [
             {"animal": "unknown", "score": 0.0}
         ]
+
+# 닮은 얼굴 검색: 입력 이미지 → 임베딩 → 참조 임베딩 인덱스 top-k (app/utils/lookalike_index.py)
+# 인덱스가 없으면 FileNotFoundError (라우터에서 503)
+# 반환: (이미지별 [{"rank", "id", "name", "score"}, ...], {"mode": 실제 검색 방식, 단계별 시간 ms})
+_lookalike_hash_checked = set()
+
+def find_lookalikes(img_data, k: int = LOOKALIKE_TOP_K, mode: str = LOOKALIKE_SEARCH_MODE,
+                    nprobe: int = LOOKALIKE_NPROBE, rerank: int = LOOKALIKE_RERANK):
+    index = load_lookalike_index()
+    model = current_model()
+
+    # 인덱스를 만든 모델과 현재 모델이 다르면 경고 (모델 버전마다 1번)
+    if index.model_hash and index.model_hash != model.file_hash and model.file_hash not in _lookalike_hash_checked:
+        _lookalike_hash_checked.add(model.file_hash)
+        print(f"⚠️ 닮은 얼굴 인덱스({index.path})가 현재 임베딩 모델과 다른 모델로 생성되었습니다.")
+
+    # 1. 임베딩 추출
+    started = time.perf_counter()
+    embeddings = extract_embeddings(to_input_tensor(img_data), model)
+    embedded = time.perf_counter()
+
+    # 2. 인덱스 검색 (exact: 블록 행렬곱 / ivfpq: 근사 + rerank)
+    with stage_timer("lookalike_search"):
+        scores, ids = index.search(embeddings, k, mode, nprobe, rerank)
+    searched = time.perf_counter()
+
+    report = {
+        "mode": "ivfpq" if mode == "ivfpq" and index.ivf is not None else "exact",
+        "embedding_ms": round((embedded - started) * 1000, 3),
+        "search_ms": round((searched - embedded) * 1000, 3),
+    }
+    return index.neighbors(scores, ids), report
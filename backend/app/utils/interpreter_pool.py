@@ -0,0 +1,212 @@
+# TFLite 인터프리터 풀
+# 인터프리터 하나는 동시에 invoke할 수 없으므로, 같은 모델로 N개를 미리 만들어 두고
+# 추론할 때마다 1개를 빌려 쓰고 돌려준다. (모델 파일은 mmap으로 열리므로 가중치는 공유되고
+# 인터프리터마다 늘어나는 메모리는 중간 텐서 arena 정도)
+#   - 빌릴 인터프리터가 없으면 checkout_timeout 동안만 기다리고 InterpreterCheckoutTimeout
+#   - 인터프리터별 invoke 수 / 사용 시간(utilization), 대기 시간 통계 제공
+#   - TFLite 런타임은 첫 인터프리터를 만들 때 import (ai_edge_litert / tflite_runtime이 있으면 tensorflow 대신 사용)
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+
+from app.utils.executor import QueueFullError
+from app.utils.metrics import STAGE_HISTOGRAM, metrics
+
+# TFLite 런타임 후보 (Interpreter / OpResolverType 경로, 가벼운 순서)
+TFLITE_RUNTIMES = (
+    ("ai_edge_litert.interpreter", "Interpreter", "OpResolverType"),
+    ("tflite_runtime.interpreter", "Interpreter", "OpResolverType"),
+    ("tensorflow", "lite.Interpreter", "lite.experimental.OpResolverType"),
+)
+_runtime = None
+
+
+# 정해진 시간 안에 인터프리터를 못 빌린 경우 (라우터에서 QueueFullError처럼 503 처리)
+class InterpreterCheckoutTimeout(QueueFullError):
+    pass
+
+
+def _resolve(module, attr_path: str):
+    for attr in attr_path.split("."):
+        module = getattr(module, attr)
+    return module
+
+
+# 설치된 TFLite 런타임 중 첫 번째 → (이름, Interpreter 클래스, OpResolverType)
+# tensorflow 전체 import는 수 초 + 수백 MB가 들기 때문에 서버 import 시점이 아니라 모델 로드 시점에 한 번만 실행
+def tflite_runtime():
+    global _runtime
+    if _runtime is None:
+        import importlib
+        for module_name, interpreter_attr, resolver_attr in TFLITE_RUNTIMES:
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            _runtime = (module_name, _resolve(module, interpreter_attr), _resolve(module, resolver_attr))
+            break
+        else:
+            raise ImportError("TFLite 런타임(ai_edge_litert / tflite_runtime / tensorflow)이 설치되어 있지 않습니다.")
+    return _runtime
+
+
+# 인터프리터 생성 (use_xnnpack=False면 기본 delegate(XNNPACK) 없이 내장 커널만 사용)
+def create_interpreter(model_path: str, num_threads: int = 1, use_xnnpack: bool = True):
+    _, interpreter_cls, resolver_type = tflite_runtime()
+    resolver = resolver_type.AUTO if use_xnnpack else resolver_type.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+    return interpreter_cls(model_path=model_path, num_threads=num_threads, experimental_op_resolver_type=resolver)
+
+
+# 풀 크기 기본값: CPU 코어 수 / 인터프리터당 스레드 수
+def default_pool_size(num_threads: int = 1) -> int:
+    return max(1, (os.cpu_count() or 1) // max(1, num_threads))
+
+
+class PooledInterpreter:
+    """풀 안의 인터프리터 1개 + 자기 입력 배치 크기 / 사용 통계"""
+
+    def __init__(self, slot: int, model_path: str, num_threads: int, use_xnnpack: bool = True):
+        self.slot = slot
+        self.interpreter = create_interpreter(model_path, num_threads, use_xnnpack)
+        self.interpreter.allocate_tensors()
+        input_detail = self.interpreter.get_input_details()[0]
+        self.input_index = input_detail["index"]
+        # 정수 입력 모델(int8 full-integer)이면 float 입력을 양자화해서 넣음
+        self.input_dtype = input_detail["dtype"]
+        self.input_quantization = input_detail["quantization"]
+        self.tensor_quantization = {d["index"]: d["quantization"] for d in self.interpreter.get_tensor_details()}
+        self.allocated_batch_size = 1
+        self.invokes = 0
+        self.busy_sec = 0.0
+
+    def run(self, input_tensor: np.ndarray, tensor_index: int) -> np.ndarray:
+        batch_size = input_tensor.shape[0]
+        # 배치 크기가 바뀐 경우에만 입력 텐서 재할당
+        if batch_size != self.allocated_batch_size:
+            self.interpreter.resize_tensor_input(self.input_index, list(input_tensor.shape))
+            self.interpreter.allocate_tensors()
+            self.allocated_batch_size = batch_size
+        self.interpreter.set_tensor(self.input_index, self.quantize_input(input_tensor))
+        self.interpreter.invoke()
+        # get_tensor는 내부 버퍼를 복사해서 반환하므로 반납 후에 써도 안전
+        return self.dequantize_output(tensor_index).reshape(batch_size, -1)
+
+    def quantize_input(self, input_tensor: np.ndarray) -> np.ndarray:
+        if self.input_dtype == np.float32:
+            return input_tensor
+        scale, zero_point = self.input_quantization
+        info = np.iinfo(self.input_dtype)
+        return np.clip(np.round(input_tensor / scale + zero_point), info.min, info.max).astype(self.input_dtype)
+
+    def dequantize_output(self, tensor_index: int) -> np.ndarray:
+        output = self.interpreter.get_tensor(tensor_index)
+        if output.dtype == np.float32:
+            return output
+        scale, zero_point = self.tensor_quantization[tensor_index]
+        return (output.astype(np.float32) - zero_point) * scale
+
+
+class InterpreterPool:
+    """
+    model_path: .tflite 파일 경로
+    size: 인터프리터 수 (None이면 CPU 코어 수 / num_threads)
+    num_threads: 인터프리터 하나가 invoke에 쓰는 스레드 수
+    checkout_timeout: 인터프리터를 빌리기 위해 기다리는 최대 시간 (초)
+    use_xnnpack: XNNPACK delegate 사용 여부
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        size: Optional[int] = None,
+        num_threads: int = 1,
+        checkout_timeout: float = 5.0,
+        use_xnnpack: bool = True,
+    ):
+        self.model_path = model_path
+        self.num_threads = num_threads
+        self.use_xnnpack = use_xnnpack
+        self.size = size or default_pool_size(num_threads)
+        self.checkout_timeout = checkout_timeout
+        self.created_at = time.monotonic()
+
+        self.interpreters = [PooledInterpreter(i, model_path, num_threads, use_xnnpack) for i in range(self.size)]
+        self._free = queue.Queue()
+        for item in self.interpreters:
+            self._free.put(item)
+
+        # 대기 시간 통계
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_sec_total = 0.0
+        self.wait_sec_max = 0.0
+
+    @property
+    def interpreter(self):
+        """텐서 정보 조회용 (invoke는 checkout으로)"""
+        return self.interpreters[0].interpreter
+
+    @contextmanager
+    def checkout(self):
+        started = time.monotonic()
+        try:
+            item = self._free.get(timeout=self.checkout_timeout)
+        except queue.Empty:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise InterpreterCheckoutTimeout("추론 요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.")
+
+        acquired = time.monotonic()
+        waited = acquired - started
+        metrics.observe(STAGE_HISTOGRAM, waited, stage="interpreter_wait")  # invoke_* 시간 중 인터프리터를 기다린 시간
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_sec_total += waited
+            self.wait_sec_max = max(self.wait_sec_max, waited)
+        try:
+            yield item
+        finally:
+            item.invokes += 1
+            item.busy_sec += time.monotonic() - acquired
+            self._free.put(item)
+
+    def run(self, input_tensor: np.ndarray, tensor_index: int) -> np.ndarray:
+        with self.checkout() as item:
+            return item.run(input_tensor, tensor_index)
+
+    def warm_up(self, input_tensor: np.ndarray, tensor_index: int, runs: int = 2):
+        """풀 안의 모든 인터프리터를 한 번씩 워밍업 (교체 전, 아직 공유되지 않은 상태에서 호출)"""
+        for item in self.interpreters:
+            for _ in range(runs):
+                item.run(input_tensor, tensor_index)
+
+    def stats(self) -> dict:
+        elapsed = max(time.monotonic() - self.created_at, 1e-9)
+        with self._stats_lock:
+            checkouts = self.checkouts
+            return {
+                "size": self.size,
+                "num_threads": self.num_threads,
+                "xnnpack": self.use_xnnpack,
+                "runtime": tflite_runtime()[0],
+                "available": self._free.qsize(),
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms_avg": round(self.wait_sec_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "wait_ms_max": round(self.wait_sec_max * 1000, 3),
+                "interpreters": [
+                    {
+                        "slot": item.slot,
+                        "invokes": item.invokes,
+                        "busy_sec": round(item.busy_sec, 3),
+                        "utilization": round(item.busy_sec / elapsed, 4),
+                    }
+                    for item in self.interpreters
+                ],
+            }
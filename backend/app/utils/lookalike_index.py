@@ -0,0 +1,535 @@
+# 닮은 얼굴 검색 인덱스 (참조 얼굴 임베딩 10만~100만 개 중 가장 비슷한 얼굴 top-k)
+# 평균 임베딩(embedding_store.py)과 같은 efficientnet 임베딩을 L2 정규화해서 저장하고 cosine similarity(내적)로 찾는다.
+#   - 벡터 저장소 : float16 (N, D) 또는 int8 (N, D) + 행별 scale (N,)
+#                   .npy 파일을 읽기 전용 memmap으로 열어 uvicorn 워커 / 프로세스 풀 워커가 페이지 캐시를 공유
+#                   (exact 검색 시간은 대부분 float16 → float32 변환이라 int8 저장소가 훨씬 빠름, 대신 약간의 정밀도 손실)
+#   - exact       : LOOKALIKE_BLOCK_ROWS행씩 float32로 바꿔 (Q, D) @ (D, B) 행렬곱 → 블록별 top-k만 남기며 합침
+#   - ivfpq       : IVF (k-means 코스 클러스터 nlist개) + PQ (클러스터 중심과의 잔차를 M개 부분 공간 × 256 코드로 1바이트씩 인코딩)
+#                   질의와 가까운 nprobe개 리스트의 코드만 LUT 합산으로 근사 점수를 매기고, 상위 rerank개는 원본 벡터로 다시 계산
+#                   내적 기준이라 q·x ≈ q·c + Σ LUT[m][code_m] 이고 LUT는 리스트와 무관하게 질의당 1번만 만든다.
+#
+# 인덱스 폴더 구조 (scripts/build_lookalike_index.py로 생성)
+#   index.json                    : {"count", "dim", "dtype", "model_hash", "model_version", "ivf": {...}, ...}
+#   vectors.npy                   : (capacity, D) float16 / int8 (앞의 count행만 사용)
+#   scales.npy                    : (capacity,) float32 (int8일 때만, 행별 역양자화 계수)
+#   names.bin / name_offsets.npy  : 참조 이름 (UTF-8 이어붙임 + (count+1,) int64 오프셋, 이름 목록을 메모리에 올리지 않음)
+#   ivf_centroids.npy             : (nlist, D) float32 (L2 정규화)
+#   ivf_offsets.npy               : (nlist+1,) int64, 리스트 l의 항목 = ivf_ids[offsets[l]:offsets[l+1]]
+#   ivf_ids.npy                   : (count,) int32, 리스트 순서로 정렬한 벡터 번호
+#   pq_codebooks.npy              : (M, 256, D/M) float32
+#   pq_codes.npy                  : (count, M) uint8 (ivf_ids 순서)
+import json
+import os
+import shutil
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import LOOKALIKE_BLOCK_ROWS, LOOKALIKE_INDEX_DIR
+from app.utils.embedding_scorer import l2_normalize
+
+FORMAT_VERSION = 1
+DTYPES = ("float16", "int8")
+SEARCH_MODES = ("exact", "ivfpq")
+PQ_CODES = 256
+
+HEADER_FILE = "index.json"
+PROGRESS_FILE = "progress.json"
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+NAMES_FILE = "names.bin"
+NAME_OFFSETS_FILE = "name_offsets.npy"
+IVF_FILES = ("ivf_centroids.npy", "ivf_offsets.npy", "ivf_ids.npy", "pq_codebooks.npy", "pq_codes.npy")
+
+
+# JSON 파일을 임시 파일에 쓰고 교체 (읽는 쪽은 항상 완성된 파일만 봄)
+def write_json(path: str, data: dict):
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# 정규화된 float32 (B, D) → int8 (B, D) + 행별 scale (B,)  (x ≈ codes * scale)
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+# 행별 상위 k개만 남김 (정렬하지 않음, 블록 결과를 합칠 때 사용)
+def select_top_k(scores: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if scores.shape[1] <= k:
+        return scores, ids
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(scores, part, axis=1), np.take_along_axis(ids, part, axis=1)
+
+
+# 점수 내림차순 정렬 (동점이면 번호 순서)
+def sort_top_k(scores: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    order = np.lexsort((ids, -scores), axis=1)
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+# ===== k-means (IVF 코스 클러스터 / PQ 코드북 학습) =====
+
+# 가장 가까운 중심 번호 (블록 단위 행렬곱)
+# spherical: 정규화된 벡터의 내적 최대 / 아니면 유클리드 거리 최소 (argmax 2x·c - |c|²)
+def assign_clusters(x: np.ndarray, centroids: np.ndarray, spherical: bool = False, block_rows: int = LOOKALIKE_BLOCK_ROWS) -> np.ndarray:
+    bias = None if spherical else -0.5 * np.einsum("kd,kd->k", centroids, centroids)
+    assign = np.empty(len(x), dtype=np.int32)
+    for start in range(0, len(x), block_rows):
+        sims = np.asarray(x[start:start + block_rows], dtype=np.float32) @ centroids.T
+        if bias is not None:
+            sims += bias
+        assign[start:start + block_rows] = sims.argmax(axis=1)
+    return assign
+
+
+def kmeans(x: np.ndarray, k: int, iters: int = 20, spherical: bool = False, seed: int = 0,
+           block_rows: int = LOOKALIKE_BLOCK_ROWS) -> np.ndarray:
+    """
+    x: (n, d) float32 학습 벡터
+    k: 클러스터 수 (n 이상이면 안 됨)
+    spherical: True면 중심을 L2 정규화 (cosine k-means)
+    반환: (k, d) float32 중심
+    """
+    n = len(x)
+    if n < k:
+        raise ValueError(f"학습 벡터 수({n})가 클러스터 수({k})보다 적습니다.")
+    rng = np.random.default_rng(seed)
+    centroids = np.array(x[rng.choice(n, k, replace=False)], dtype=np.float32)
+
+    for _ in range(iters):
+        assign = assign_clusters(x, centroids, spherical, block_rows)
+        # 클러스터별 합: 블록마다 번호 순으로 정렬 후 reduceat (n × d 임시 배열 없음)
+        sums = np.zeros_like(centroids)
+        for start in range(0, n, block_rows):
+            block_assign = assign[start:start + block_rows]
+            order = np.argsort(block_assign, kind="stable")
+            labels, starts = np.unique(block_assign[order], return_index=True)
+            sums[labels] += np.add.reduceat(np.asarray(x[start:start + block_rows], dtype=np.float32)[order], starts, axis=0)
+        counts = np.bincount(assign, minlength=k)
+
+        # 빈 클러스터는 임의의 학습 벡터로 다시 시작
+        empty = np.flatnonzero(counts == 0)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        if len(empty):
+            centroids[empty] = x[rng.choice(n, len(empty), replace=False)]
+        if spherical:
+            centroids = l2_normalize(centroids).astype(np.float32)
+    return centroids
+
+
+# ===== 인덱스 쓰기 =====
+
+class LookalikeIndexWriter:
+    """
+    인덱스 폴더에 참조 임베딩을 순서대로 기록 (IVF-PQ는 finish 후 build_ivfpq로 추가)
+    path: 빌드 중 폴더 (완성 후 publish_index로 서비스 폴더와 교체)
+    capacity: 최대 벡터 수 (입력 개수, 읽지 못한 입력은 건너뛰므로 실제 수는 count)
+    dim: 임베딩 차원
+    dtype: float16 / int8
+    """
+
+    def __init__(self, path: str, capacity: int, dim: int, dtype: str = "float16", _resume: Optional[dict] = None):
+        if dtype not in DTYPES:
+            raise ValueError(f"지원하지 않는 저장 형식입니다: {dtype}")
+        self.path = path
+        self.capacity = capacity
+        self.dim = dim
+        self.dtype = dtype
+        os.makedirs(path, exist_ok=True)
+
+        mode = "r+" if _resume else "w+"
+        self.vectors = np.lib.format.open_memmap(os.path.join(path, VECTORS_FILE), mode=mode, dtype=dtype, shape=(capacity, dim))
+        self.scales = None
+        if dtype == "int8":
+            self.scales = np.lib.format.open_memmap(os.path.join(path, SCALES_FILE), mode=mode, dtype=np.float32, shape=(capacity,))
+
+        names_path = os.path.join(path, NAMES_FILE)
+        if _resume:
+            self.count = _resume["count"]
+            self.next_row = _resume["next_row"]
+            self.offsets = np.load(os.path.join(path, NAME_OFFSETS_FILE)).tolist()
+            # 마지막 체크포인트 이후에 쓴 이름은 버림 (벡터도 count 이후는 덮어씀)
+            with open(names_path, "r+b") as f:
+                f.truncate(self.offsets[-1])
+            self._names = open(names_path, "ab")
+        else:
+            self.count = 0
+            self.next_row = 0
+            self.offsets = [0]
+            self._names = open(names_path, "wb")
+
+    @classmethod
+    def resume(cls, path: str) -> Optional["LookalikeIndexWriter"]:
+        """이어쓰기 (progress.json이 없으면 None)"""
+        progress_path = os.path.join(path, PROGRESS_FILE)
+        if not os.path.exists(progress_path):
+            return None
+        progress = read_json(progress_path)
+        return cls(path, progress["capacity"], progress["dim"], progress["dtype"], _resume=progress)
+
+    def add(self, names: Sequence[str], embeddings: np.ndarray):
+        """names: 참조 이름 (예: 이미지 경로), embeddings: (B, D) 임베딩 (저장 시 L2 정규화)"""
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(names), -1)
+        if embeddings.shape[1] != self.dim:
+            raise ValueError(f"임베딩 차원이 다릅니다: {embeddings.shape[1]} (인덱스 {self.dim})")
+        if self.count + len(names) > self.capacity:
+            raise ValueError("인덱스 용량을 넘었습니다.")
+        vectors = l2_normalize(embeddings)
+        rows = slice(self.count, self.count + len(names))
+        if self.dtype == "int8":
+            self.vectors[rows], self.scales[rows] = quantize_int8(vectors)
+        else:
+            self.vectors[rows] = vectors
+        for name in names:
+            data = str(name).encode("utf-8")
+            self._names.write(data)
+            self.offsets.append(self.offsets[-1] + len(data))
+        self.count += len(names)
+
+    def _flush(self):
+        self.vectors.flush()
+        if self.scales is not None:
+            self.scales.flush()
+        self._names.flush()
+        os.fsync(self._names.fileno())
+        np.save(os.path.join(self.path, NAME_OFFSETS_FILE), np.asarray(self.offsets, dtype=np.int64))
+
+    def checkpoint(self, next_row: int):
+        """next_row: 다음에 처리할 입력 번호 (이어쓰기 시작 위치)"""
+        self._flush()
+        self.next_row = next_row
+        write_json(os.path.join(self.path, PROGRESS_FILE), {
+            "next_row": next_row,
+            "count": self.count,
+            "capacity": self.capacity,
+            "dim": self.dim,
+            "dtype": self.dtype,
+        })
+
+    def finish(self, model_hash: str = "", model_version: str = "", extra: Optional[dict] = None) -> dict:
+        """index.json 기록 (IVF-PQ 없이 exact 검색 가능한 상태)"""
+        if self.count == 0:
+            raise ValueError("인덱스에 기록된 벡터가 없습니다.")
+        self._flush()
+        self._names.close()
+        header = {
+            "format_version": FORMAT_VERSION,
+            "count": self.count,
+            "dim": self.dim,
+            "dtype": self.dtype,
+            "normalized": True,
+            "model_hash": model_hash,
+            "model_version": model_version,
+            "created_at": time.time(),
+        }
+        if extra:
+            header.update(extra)
+        write_json(os.path.join(self.path, HEADER_FILE), header)
+        progress_path = os.path.join(self.path, PROGRESS_FILE)
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+        return header
+
+
+# 리스트 수 자동 선택: 4·√N 근처의 2의 거듭제곱 (학습 벡터가 리스트당 39개 이상 되도록 제한)
+def default_nlist(count: int, train_size: int) -> int:
+    nlist = 2 ** int(round(np.log2(max(16.0, 4 * np.sqrt(count)))))
+    while nlist > 16 and nlist * 39 > min(count, train_size):
+        nlist //= 2
+    return max(1, min(nlist, count))
+
+
+def build_ivfpq(path: str, nlist: Optional[int] = None, pq_m: int = 64, train_size: int = 100_000,
+                iters: int = 20, seed: int = 0, block_rows: int = LOOKALIKE_BLOCK_ROWS, verbose: bool = False) -> dict:
+    """
+    완성된 인덱스 폴더에 IVF-PQ 추가 (이미 있으면 다시 학습)
+    nlist: 코스 클러스터 수 (None이면 default_nlist)
+    pq_m: PQ 부분 공간 수 (벡터당 코드 바이트 수, 차원이 나누어떨어져야 함)
+    train_size: k-means 학습에 쓸 샘플 수
+    """
+    index = LookalikeIndex.open(path, load_ivf=False)
+    count, dim = index.count, index.dim
+    if dim % pq_m:
+        raise ValueError(f"임베딩 차원({dim})이 pq_m({pq_m})으로 나누어떨어지지 않습니다.")
+    sub_dim = dim // pq_m
+    nlist = nlist or default_nlist(count, train_size)
+    log = print if verbose else (lambda *args: None)
+
+    # 1. 학습 샘플 (정렬된 번호로 memmap을 앞에서부터 읽음)
+    rng = np.random.default_rng(seed)
+    sample_ids = np.sort(rng.choice(count, min(count, train_size), replace=False))
+    sample = index.gather(sample_ids)
+    if len(sample) < max(nlist, PQ_CODES):
+        raise ValueError(f"학습 벡터가 부족합니다: {len(sample)}개 (nlist {nlist}, PQ 코드 {PQ_CODES}개 이상 필요)")
+
+    # 2. 코스 클러스터 (cosine k-means)
+    started = time.perf_counter()
+    centroids = kmeans(sample, nlist, iters, spherical=True, seed=seed, block_rows=block_rows)
+    log(f"IVF 학습 완료: nlist={nlist}, 샘플 {len(sample)}개, {time.perf_counter() - started:.1f}s")
+
+    # 3. 잔차 PQ 코드북 (부분 공간마다 256개 중심)
+    started = time.perf_counter()
+    residuals = sample - centroids[assign_clusters(sample, centroids, True, block_rows)]
+    codebooks = np.stack([
+        kmeans(np.ascontiguousarray(residuals[:, m * sub_dim:(m + 1) * sub_dim]), PQ_CODES, iters, seed=seed + m, block_rows=block_rows)
+        for m in range(pq_m)
+    ])
+    del sample, residuals
+    log(f"PQ 학습 완료: M={pq_m}, {time.perf_counter() - started:.1f}s")
+
+    # 4. 전체 벡터 인코딩 (블록 단위)
+    started = time.perf_counter()
+    assign = np.empty(count, dtype=np.int32)
+    codes = np.empty((count, pq_m), dtype=np.uint8)
+    for start in range(0, count, block_rows):
+        block = index.vector_block(start, min(start + block_rows, count))
+        block_assign = assign_clusters(block, centroids, True, block_rows)
+        residual = block - centroids[block_assign]
+        for m in range(pq_m):
+            codes[start:start + len(block), m] = assign_clusters(residual[:, m * sub_dim:(m + 1) * sub_dim], codebooks[m], False, block_rows)
+        assign[start:start + len(block)] = block_assign
+    log(f"인코딩 완료: {count}개, {time.perf_counter() - started:.1f}s")
+
+    # 5. 리스트 순서로 정렬해서 저장
+    order = np.argsort(assign, kind="stable").astype(np.int32)
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))]).astype(np.int64)
+    arrays = (centroids, offsets, order, codebooks.astype(np.float32), codes[order])
+    for name, array in zip(IVF_FILES, arrays):
+        np.save(os.path.join(path, name), array)
+
+    header = dict(index.header)
+    header["ivf"] = {
+        "nlist": int(nlist),
+        "pq_m": int(pq_m),
+        "pq_bits": 8,
+        "train_size": int(min(count, train_size)),
+        "iters": int(iters),
+        "max_list_size": int(np.diff(offsets).max()),
+    }
+    write_json(os.path.join(path, HEADER_FILE), header)
+    return header
+
+
+# 빌드 폴더 → 서비스 폴더 교체 (이전 인덱스를 memmap으로 연 프로세스는 지워진 파일을 계속 읽을 수 있음)
+def publish_index(build_dir: str, path: str):
+    old_dir = None
+    if os.path.exists(path):
+        old_dir = f"{path}.old.{os.getpid()}"
+        os.replace(path, old_dir)
+    os.replace(build_dir, path)
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+# ===== 인덱스 읽기 / 검색 =====
+
+class LookalikeIndex:
+    """
+    인덱스 폴더를 읽기 전용 memmap으로 연 결과
+    header: index.json
+    vectors: (count, D) float16 / int8 memmap
+    scales: (count,) float32 memmap (int8일 때만)
+    ivf: IVF-PQ 배열 dict (없으면 None → exact 검색만 가능)
+    """
+
+    def __init__(self, path: str, header: dict, vectors: np.ndarray, scales: Optional[np.ndarray],
+                 names: np.ndarray, name_offsets: np.ndarray, ivf: Optional[dict] = None):
+        self.path = path
+        self.header = header
+        self.vectors = vectors
+        self.scales = scales
+        self.names = names
+        self.name_offsets = name_offsets
+        self.ivf = ivf
+
+    @classmethod
+    def open(cls, path: str, load_ivf: bool = True) -> "LookalikeIndex":
+        header_path = os.path.join(path, HEADER_FILE)
+        if not os.path.exists(header_path):
+            raise FileNotFoundError(f"닮은 얼굴 인덱스가 없습니다: {path}")
+        header = read_json(header_path)
+        if header.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 인덱스 버전입니다: {header.get('format_version')}")
+
+        count = header["count"]
+        vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")[:count]
+        scales = None
+        if header["dtype"] == "int8":
+            scales = np.load(os.path.join(path, SCALES_FILE), mmap_mode="r")[:count]
+        name_offsets = np.load(os.path.join(path, NAME_OFFSETS_FILE), mmap_mode="r")
+        names = np.memmap(os.path.join(path, NAMES_FILE), dtype=np.uint8, mode="r") if name_offsets[-1] else np.zeros(0, np.uint8)
+        if vectors.shape != (count, header["dim"]) or len(name_offsets) != count + 1:
+            raise ValueError(f"인덱스 파일 크기가 헤더와 다릅니다: {path}")
+
+        ivf = None
+        if load_ivf and header.get("ivf"):
+            centroids, offsets, ids, codebooks, codes = [np.load(os.path.join(path, name), mmap_mode="r") for name in IVF_FILES]
+            ivf = {
+                "centroids": np.asarray(centroids),   # 작은 배열은 메모리로 (질의마다 전체를 씀)
+                "offsets": np.asarray(offsets),
+                "ids": ids,
+                "codebooks": np.asarray(codebooks),
+                "codes": codes,
+            }
+        return cls(path, header, vectors, scales, names, name_offsets, ivf)
+
+    @property
+    def count(self) -> int:
+        return self.header["count"]
+
+    @property
+    def dim(self) -> int:
+        return self.header["dim"]
+
+    @property
+    def model_hash(self) -> str:
+        return self.header.get("model_hash", "")
+
+    def name(self, i: int) -> str:
+        return bytes(self.names[self.name_offsets[i]:self.name_offsets[i + 1]]).decode("utf-8")
+
+    def vector_block(self, start: int, stop: int) -> np.ndarray:
+        """연속 구간 [start, stop) → float32 (B, D)"""
+        block = self.vectors[start:stop].astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[start:stop, None]
+        return block
+
+    def gather(self, ids: np.ndarray) -> np.ndarray:
+        """번호 목록 → float32 (len, D) (정렬된 번호면 memmap을 순서대로 읽음)"""
+        block = self.vectors[ids].astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[ids][:, None]
+        return block
+
+    def normalize_queries(self, queries: np.ndarray) -> np.ndarray:
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        return l2_normalize(queries).astype(np.float32)
+
+    def search_exact(self, queries: np.ndarray, k: int, block_rows: int = LOOKALIKE_BLOCK_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+        """전체 벡터와 블록 행렬곱 → (Q, k) 점수, (Q, k) 번호 (점수 내림차순)"""
+        queries = self.normalize_queries(queries)
+        k = min(k, self.count)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, self.count, block_rows):
+            stop = min(start + block_rows, self.count)
+            block = self.vectors[start:stop].astype(np.float32)
+            scores = queries @ block.T                            # (Q, B)
+            if self.scales is not None:
+                scores *= self.scales[start:stop]
+            ids = np.broadcast_to(np.arange(start, stop, dtype=np.int64), scores.shape)
+            scores, ids = select_top_k(scores, ids, k)
+            best_scores, best_ids = select_top_k(
+                np.concatenate([best_scores, scores], axis=1), np.concatenate([best_ids, ids], axis=1), k
+            )
+        return sort_top_k(best_scores, best_ids)
+
+    def search_ivfpq(self, queries: np.ndarray, k: int, nprobe: int = 16, rerank: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        IVF-PQ 근사 검색 → (Q, k) 점수, (Q, k) 번호 (점수는 rerank 후 원본 벡터 기준)
+        nprobe: 살펴볼 리스트 수
+        rerank: 근사 점수 상위 몇 개를 원본 벡터로 다시 계산할지 (k 이상)
+        """
+        if self.ivf is None:
+            raise ValueError("IVF-PQ가 없는 인덱스입니다. scripts/build_lookalike_index.py ivf로 먼저 만들어주세요.")
+        queries = self.normalize_queries(queries)
+        ivf = self.ivf
+        centroids, offsets, codebooks = ivf["centroids"], ivf["offsets"], ivf["codebooks"]
+        pq_m, _, sub_dim = codebooks.shape
+        nprobe = min(nprobe, len(centroids))
+        k = min(k, self.count)
+        lut_offsets = np.arange(pq_m, dtype=np.intp) * PQ_CODES
+
+        results_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        results_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        for qi, query in enumerate(queries):
+            # 1. 가까운 리스트 nprobe개
+            coarse = centroids @ query
+            probe = np.argpartition(-coarse, nprobe - 1)[:nprobe] if nprobe < len(coarse) else np.arange(len(coarse))
+            probe = np.sort(probe)  # 리스트 순서대로 읽음 (memmap 앞에서부터)
+            probe = probe[offsets[probe + 1] > offsets[probe]]
+            if not len(probe):
+                continue
+            codes = np.concatenate([ivf["codes"][offsets[l]:offsets[l + 1]] for l in probe])
+            ids = np.concatenate([ivf["ids"][offsets[l]:offsets[l + 1]] for l in probe]).astype(np.int64)
+            base = np.repeat(coarse[probe], offsets[probe + 1] - offsets[probe])
+
+            # 2. LUT (M, 256): 부분 공간별 질의 · 코드북 → 코드 합산으로 근사 점수
+            lut = np.einsum("mcd,md->mc", codebooks, query.reshape(pq_m, sub_dim)).ravel()
+            approx = base + lut[codes.astype(np.intp) + lut_offsets].sum(axis=1)
+
+            # 3. 상위 rerank개를 원본 벡터로 다시 계산
+            n_candidates = min(max(rerank, k), len(ids))
+            if n_candidates < len(ids):
+                candidates = ids[np.argpartition(-approx, n_candidates - 1)[:n_candidates]]
+            else:
+                candidates = ids
+            candidates = np.sort(candidates)
+            exact = self.gather(candidates) @ query
+            scores, top_ids = sort_top_k(*select_top_k(exact[None, :], candidates[None, :], k))
+            results_scores[qi, :scores.shape[1]] = scores[0]
+            results_ids[qi, :top_ids.shape[1]] = top_ids[0]
+        return results_scores, results_ids
+
+    def search(self, queries: np.ndarray, k: int, mode: str = "ivfpq", nprobe: int = 16, rerank: int = 100):
+        """mode: exact / ivfpq (IVF-PQ가 없는 인덱스면 exact)"""
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"지원하지 않는 검색 방식입니다: {mode}")
+        if mode == "ivfpq" and self.ivf is not None:
+            return self.search_ivfpq(queries, k, nprobe, rerank)
+        return self.search_exact(queries, k)
+
+    def neighbors(self, scores: np.ndarray, ids: np.ndarray) -> List[List[dict]]:
+        """검색 결과 → 질의별 [{"rank", "id", "name", "score"}, ...]"""
+        return [
+            [
+                {"rank": rank, "id": int(i), "name": self.name(int(i)), "score": round(float(s), 4)}
+                for rank, (s, i) in enumerate(zip(row_scores, row_ids), start=1) if i >= 0
+            ]
+            for row_scores, row_ids in zip(scores, ids)
+        ]
+
+    def stats(self) -> dict:
+        files = [VECTORS_FILE, SCALES_FILE, NAMES_FILE, NAME_OFFSETS_FILE] + list(IVF_FILES)
+        paths = [os.path.join(self.path, name) for name in files]
+        return {
+            "path": self.path,
+            "count": self.count,
+            "dim": self.dim,
+            "dtype": self.header["dtype"],
+            "model_version": self.header.get("model_version", ""),
+            "ivf": self.header.get("ivf"),
+            "bytes": sum(os.path.getsize(p) for p in paths if os.path.exists(p)),
+        }
+
+
+# 전역 인덱스 (첫 검색 때 1번만 열고 계속 재사용, 폴더가 없으면 FileNotFoundError)
+# 인덱스를 다시 만들어 교체(publish_index)한 뒤에는 서버를 재시작해야 새 인덱스를 연다.
+lookalike_index = None
+_index_lock = threading.Lock()
+
+
+def load_lookalike_index(path: str = LOOKALIKE_INDEX_DIR) -> LookalikeIndex:
+    global lookalike_index
+    if lookalike_index is not None:
+        return lookalike_index
+    with _index_lock:
+        if lookalike_index is None:
+            lookalike_index = LookalikeIndex.open(path)
+    return lookalike_index
@@ -0,0 +1,201 @@
+# 단계별 지연 시간 / 카운터 수집 (Prometheus 텍스트 형식으로 /metrics에서 노출)
+#   - 히스토그램 : stage_duration_seconds{stage}  (decode / detect / face_to_input / invoke / postprocess / card_render ...)
+#                  request_duration_seconds{endpoint, status}
+#   - 카운터     : faces_not_found_total, errors_total{kind}, bytes_processed_total
+#   - 게이지     : pipeline_in_flight 등 (/metrics 요청 시점 값)
+# 관측 1번 = perf_counter 2번 + bisect + 락 1번 (수 µs 미만)이라 항상 켜두고 사용한다.
+# 값은 프로세스별로 모인다. process 모드 실행기 워커의 값은 작업 결과와 함께 부모로 넘겨 합친다. (executor.py)
+# uvicorn 워커를 여러 개 띄우면 워커마다 따로 노출되므로 Prometheus에서 합산한다.
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Optional, Tuple
+
+from app.config import METRICS_ENABLED, METRICS_LATENCY_BUCKETS
+
+METRIC_PREFIX = "animalface_"
+STAGE_HISTOGRAM = "stage_duration_seconds"
+REQUEST_HISTOGRAM = "request_duration_seconds"
+
+METRIC_HELP = {
+    STAGE_HISTOGRAM: "Time spent in each /upload pipeline stage.",
+    REQUEST_HISTOGRAM: "HTTP request latency by route and status code.",
+    "faces_not_found_total": "Uploads rejected because no face was detected.",
+    "errors_total": "Failed requests / pipeline steps by kind.",
+    "bytes_processed_total": "Uploaded image bytes read.",
+    "pipeline_in_flight": "Requests currently holding a pipeline slot.",
+    "pipeline_rejected_total": "Requests rejected because the pipeline queue was full.",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """buckets: 상한 목록 (초, 오름차순). 마지막 칸은 +Inf"""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def add(self, counts, total: float, count: int):
+        with self._lock:
+            for i, c in enumerate(counts):
+                self.counts[i] += c
+            self.sum += total
+            self.count += count
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class StageTimer:
+    """with stage_timer("decode"): ... 블록 실행 시간을 단계 히스토그램에 기록"""
+
+    __slots__ = ("metrics", "key", "started")
+
+    def __init__(self, metrics: "Metrics", key):
+        self.metrics = metrics
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe_key(self.key, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    """
+    buckets: 히스토그램 상한 목록 (초)
+    enabled: False면 기록하지 않음 (타이머는 그대로 동작)
+    """
+
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS, enabled: bool = True):
+        self.buckets = tuple(sorted(buckets))
+        self.enabled = enabled
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+
+    # ===== 기록 =====
+
+    def observe_key(self, key: Tuple[str, Labels], seconds: float):
+        if not self.enabled:
+            return
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+        histogram.observe(seconds)
+
+    def observe(self, name: str, seconds: float, **labels):
+        self.observe_key((name, tuple(sorted(labels.items()))), seconds)
+
+    def timer(self, stage: str) -> StageTimer:
+        return StageTimer(self, (STAGE_HISTOGRAM, (("stage", stage),)))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    # ===== process 모드 워커 → 부모 =====
+
+    def drain(self) -> dict:
+        """지금까지 모인 값을 꺼내고 비움 (워커가 작업 결과와 함께 부모로 보냄)"""
+        with self._lock:
+            histograms, self._histograms = self._histograms, {}
+            counters, self._counters = self._counters, {}
+        return {
+            "histograms": {key: h.snapshot() for key, h in histograms.items()},
+            "counters": counters,
+        }
+
+    def merge(self, delta: dict):
+        for key, (counts, total, count) in delta["histograms"].items():
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                with self._lock:
+                    histogram = self._histograms.setdefault(key, Histogram(self.buckets))
+            histogram.add(counts, total, count)
+        with self._lock:
+            for key, value in delta["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    # ===== 노출 =====
+
+    def render(self, gauges: Optional[Dict[str, float]] = None) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        described = set()
+
+        def describe(name: str, kind: str):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {METRIC_PREFIX}{name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+
+        for (name, labels), histogram in histograms:
+            describe(name, "histogram")
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{METRIC_PREFIX}{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{METRIC_PREFIX}{name}_sum{format_labels(labels)} {total!r}")
+            lines.append(f"{METRIC_PREFIX}{name}_count{format_labels(labels)} {count}")
+
+        for (name, labels), value in counters:
+            describe(name, "counter")
+            lines.append(f"{METRIC_PREFIX}{name}{format_labels(labels)} {value!r}")
+
+        for name, value in (gauges or {}).items():
+            describe(name, "counter" if name.endswith("_total") else "gauge")
+            lines.append(f"{METRIC_PREFIX}{name} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{escape_label(v)}"' for k, v in labels) + "}"
+
+
+# 전역 메트릭
+metrics = Metrics(enabled=METRICS_ENABLED)
+
+
+# 단계 시간 측정 (with stage_timer("detect"): ...)
+def stage_timer(stage: str) -> StageTimer:
+    return metrics.timer(stage)
+
+
+# 카운터 증가 (count("errors_total", kind="internal"))
+def count(name: str, value: float = 1, **labels):
+    metrics.inc(name, value, **labels)
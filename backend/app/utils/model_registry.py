@@ -0,0 +1,293 @@
+# 모델 레지스트리 (버전 관리 + 무중단 교체)
+# 모델 파일(.tflite) 옆의 사이드카 JSON(같은 이름의 .json)에서 메타데이터를 읽어
+# 인터프리터를 만들고, 더미 입력으로 워밍업한 뒤 한 번에 교체한다.
+# 요청은 시작할 때 get()으로 받은 모델 객체를 끝까지 사용하므로
+# 교체 중에도 처리 중인 요청은 이전 버전으로 끝나고, 새 요청부터 새 버전을 사용한다.
+#
+# 사이드카 JSON 예시 (app/models/model_unquant.json)
+# {
+#   "version": "ttm-v1",                # 실제 버전은 "ttm-v1+{파일 해시 앞 8자리}" (가중치가 바뀌면 버전도 바뀜)
+#   "input_shape": [224, 224, 3],
+#   "normalization": "unit",            # unit: 0~1 / {"mean": [...], "std": [...]}
+#   "output_index": null,               # null이면 첫 번째 출력 텐서
+#   "embedding_index": null,            # 임베딩 모델이면 임베딩 텐서 인덱스
+#   "class_names": ["bear", ...],
+#   "precision": "float32",             # float32 / fp16 / int8-dynamic / int8 (scripts/quantize_models.py)
+#   "xnnpack": true                     # 생략하면 INTERPRETER_USE_XNNPACK
+# }
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.config import (
+    INTERPRETER_CHECKOUT_TIMEOUT_SEC,
+    INTERPRETER_NUM_THREADS,
+    INTERPRETER_POOL_SIZE,
+    INTERPRETER_USE_XNNPACK,
+    MODEL_WARMUP_RUNS,
+    MODEL_WATCH_INTERVAL_SEC,
+)
+from app.utils.interpreter_pool import InterpreterPool
+
+# 추론 정밀도 (float32 외에는 {모델 이름}.{precision}.tflite 파일 사용)
+PRECISIONS = ("float32", "fp16", "int8-dynamic", "int8")
+
+DEFAULT_METADATA = {
+    "version": None,
+    "input_shape": [224, 224, 3],
+    "normalization": "unit",
+    "output_index": None,
+    "embedding_index": None,
+    "class_names": None,
+    "precision": "float32",
+    "xnnpack": None,
+}
+
+
+# 모델 파일 옆의 사이드카 JSON 경로
+def sidecar_path(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".json"
+
+
+# 정밀도별 모델 파일 경로 (예: model_unquant.tflite → model_unquant.int8.tflite)
+def model_variant_path(model_path: str, precision: str = "float32") -> str:
+    if precision not in PRECISIONS:
+        raise ValueError(f"지원하지 않는 정밀도입니다: {precision}")
+    if precision == "float32":
+        return model_path
+    stem, ext = os.path.splitext(model_path)
+    return f"{stem}.{precision}{ext}"
+
+
+# 모델 파일 해시 (사이드카에 버전이 없을 때 버전 문자열로 사용)
+def file_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# 기본값 ← 코드에서 넘긴 기본값 ← 사이드카 JSON 순서로 덮어씀
+def load_metadata(model_path: str, defaults: Optional[dict] = None) -> dict:
+    metadata = dict(DEFAULT_METADATA)
+    metadata.update(defaults or {})
+    path = sidecar_path(model_path)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            metadata.update(json.load(f))
+    return metadata
+
+
+# 사이드카 JSON의 version (스크립트에서 임베딩 저장소 / 닮은 얼굴 인덱스 헤더에 기록, 없으면 "")
+def sidecar_version(model_path: str) -> str:
+    return load_metadata(model_path).get("version") or ""
+
+
+class LoadedModel:
+    """
+    name: 레지스트리 이름 (예: ttm, embedding)
+    path: .tflite 파일 경로
+    metadata: 사이드카 JSON + 기본값
+    pool_size / num_threads / checkout_timeout: 인터프리터 풀 설정 (InterpreterPool 참고)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        metadata: dict,
+        pool_size: Optional[int] = None,
+        num_threads: int = 1,
+        checkout_timeout: float = 5.0,
+        use_xnnpack: bool = True,
+    ):
+        self.name = name
+        self.path = path
+        self.metadata = metadata
+        self.file_hash = file_hash(path)
+        # 버전에는 항상 파일 해시를 붙임: 사이드카를 그대로 두고 .tflite만 바꿔도 캐시 키 / 응답 / process 워커가 새 가중치를 구분
+        self.version = f"{metadata['version']}+{self.file_hash[:8]}" if metadata.get("version") else f"{name}-{self.file_hash[:8]}"
+        self.class_names = metadata.get("class_names")
+        self.input_shape = list(metadata["input_shape"])
+        self.normalization = metadata["normalization"]
+        self.precision = metadata["precision"]
+        self.use_xnnpack = use_xnnpack if metadata.get("xnnpack") is None else bool(metadata["xnnpack"])
+        self.loaded_at = time.time()
+
+        # 인터프리터 N개를 미리 만들어 두고 invoke마다 1개씩 빌려 씀 (스레드 안전 + 코어 병렬)
+        self.pool = InterpreterPool(
+            path,
+            size=pool_size,
+            num_threads=num_threads,
+            checkout_timeout=checkout_timeout,
+            use_xnnpack=self.use_xnnpack,
+        )
+        output_index = metadata.get("output_index")
+        self.output_index = output_index if output_index is not None else self.pool.interpreter.get_output_details()[0]["index"]
+        self.embedding_index = metadata.get("embedding_index")
+
+    def run_batch(self, input_tensor: np.ndarray, tensor_index: Optional[int] = None) -> np.ndarray:
+        """(N, H, W, C) 입력 → (N, ...) 출력 (tensor_index를 주면 해당 텐서, 예: 임베딩)"""
+        index = self.output_index if tensor_index is None else tensor_index
+        return self.pool.run(input_tensor, index)
+
+    def __reduce__(self):
+        # process 모드 실행기로 넘길 때는 인터프리터 대신 (이름, 버전, 경로)만 보내고 워커에서 같은 버전 모델 사용
+        return (get_model_version, (self.name, self.version, self.path))
+
+    def warm_up(self, runs: int = 2):
+        """더미 입력으로 invoke해서 첫 요청 지연(메모리 할당, 커널 준비)을 미리 처리"""
+        dummy = np.zeros([1] + self.input_shape, dtype=np.float32)
+        self.pool.warm_up(dummy, self.output_index, runs)
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "path": self.path,
+            "file_hash": self.file_hash,
+            "input_shape": self.input_shape,
+            "normalization": self.normalization,
+            "precision": self.precision,
+            "xnnpack": self.use_xnnpack,
+            "output_index": self.output_index,
+            "embedding_index": self.embedding_index,
+            "class_names": self.class_names,
+            "loaded_at": self.loaded_at,
+            "pool": self.pool.stats(),
+        }
+
+
+class ModelRegistry:
+    """
+    warmup_runs: 교체 전에 실행할 더미 invoke 횟수
+    watch_interval_sec: 모델/사이드카 파일 변경 확인 주기 (start_watcher 호출 시)
+    pool_size / num_threads / checkout_timeout / use_xnnpack: 모델마다 만드는 인터프리터 풀 설정
+    """
+
+    def __init__(
+        self,
+        warmup_runs: int = 2,
+        watch_interval_sec: float = 5.0,
+        pool_size: Optional[int] = None,
+        num_threads: int = 1,
+        checkout_timeout: float = 5.0,
+        use_xnnpack: bool = True,
+    ):
+        self.warmup_runs = warmup_runs
+        self.use_xnnpack = use_xnnpack
+        self.pool_size = pool_size
+        self.num_threads = num_threads
+        self.checkout_timeout = checkout_timeout
+        self.watch_interval_sec = watch_interval_sec
+        self._models: Dict[str, LoadedModel] = {}
+        self._sources: Dict[str, dict] = {}   # name -> {"path", "defaults", "mtime"}
+        self._lock = threading.Lock()          # 교체(swap)와 reload 직렬화
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def register(self, name: str, path: str, defaults: Optional[dict] = None) -> LoadedModel:
+        """모델을 등록하고 바로 로드 (이미 등록된 이름이면 그대로 반환)"""
+        with self._lock:
+            if name in self._models:
+                return self._models[name]
+            self._sources[name] = {"path": path, "defaults": defaults or {}, "mtime": None}
+        return self.reload(name)
+
+    def get(self, name: str) -> LoadedModel:
+        """현재 버전 모델 (요청 하나는 받은 객체를 끝까지 사용)"""
+        return self._models[name]
+
+    def reload(self, name: str, path: Optional[str] = None) -> LoadedModel:
+        """새 모델 로드 + 워밍업 후 교체. 실패하면 예외를 올리고 기존 모델은 그대로 유지"""
+        with self._lock:
+            source = self._sources[name]
+            path = path or source["path"]
+            mtime = self._mtime(path)
+            model = LoadedModel(
+                name, path, load_metadata(path, source["defaults"]),
+                pool_size=self.pool_size,
+                num_threads=self.num_threads,
+                checkout_timeout=self.checkout_timeout,
+                use_xnnpack=self.use_xnnpack,
+            )
+            model.warm_up(self.warmup_runs)
+
+            # 참조 교체는 원자적 (처리 중인 요청은 이전 객체를 계속 사용)
+            previous = self._models.get(name)
+            self._models[name] = model
+            source["path"] = path
+            source["mtime"] = mtime
+
+        if previous is not None:
+            print(f"모델 교체: {name} {previous.version} → {model.version}")
+        return model
+
+    def models(self) -> list:
+        return [model.info() for model in self._models.values()]
+
+    # 모델 파일과 사이드카 중 최근 수정 시각
+    @staticmethod
+    def _mtime(path: str) -> float:
+        mtimes = [os.path.getmtime(path)]
+        if os.path.exists(sidecar_path(path)):
+            mtimes.append(os.path.getmtime(sidecar_path(path)))
+        return max(mtimes)
+
+    # ==== 파일 변경 감시 ====
+    def start_watcher(self):
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+    def _watch(self):
+        while not self._stop.wait(self.watch_interval_sec):
+            for name, source in list(self._sources.items()):
+                mtime = source["mtime"]
+                try:
+                    mtime = self._mtime(source["path"])
+                    if mtime == source["mtime"]:
+                        continue
+                    self.reload(name)
+                except Exception as e:
+                    # 복사 중인 파일 등 로드 실패 시 기존 모델 유지, 파일이 다시 바뀌면 재시도
+                    print(f"모델 다시 로드 실패 ({name}): {e}")
+                    source["mtime"] = mtime
+
+
+# 전역 레지스트리 (inference / inference_embeding에서 모델 등록)
+model_registry = ModelRegistry(
+    warmup_runs=MODEL_WARMUP_RUNS,
+    watch_interval_sec=MODEL_WATCH_INTERVAL_SEC,
+    pool_size=INTERPRETER_POOL_SIZE,
+    num_threads=INTERPRETER_NUM_THREADS,
+    checkout_timeout=INTERPRETER_CHECKOUT_TIMEOUT_SEC,
+    use_xnnpack=INTERPRETER_USE_XNNPACK,
+)
+
+
+# process 모드 워커에서 부모가 보낸 모델 버전 찾기
+# 부모가 모델을 교체한 뒤라면 워커 레지스트리도 같은 파일로 다시 로드한다. (워커는 파일 변경을 감시하지 않음)
+# 같은 경로의 파일을 덮어써서 교체한 직후처럼 그 버전을 더 이상 로드할 수 없으면 다른 가중치로 추론하지 않고 실패
+def get_model_version(name: str, version: str, path: str) -> LoadedModel:
+    model = model_registry.get(name)
+    if model.version != version:
+        model = model_registry.reload(name, path)
+        if model.version != version:
+            raise RuntimeError(f"모델 버전을 로드할 수 없습니다: {name} {version} (현재 {model.version})")
+    return model
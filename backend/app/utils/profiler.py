@@ -0,0 +1,226 @@
+# 샘플링 프로파일러 (관리자 API로 켜고 끔)
+# 켜져 있으면 /upload 요청 N개 중 1개를 골라
+#   - cProfile : 그 요청이 pipeline_executor에서 실행한 CPU 작업(디코딩/검출/추론/카드)을 호출마다 프로파일링해서 합침
+#                (cProfile은 스레드별로만 동작하므로 요청 컨텍스트를 따라 실행기 안에서 켬, process 모드는 워커에서 기록 후 전달)
+#   - tracemalloc (선택) : 요청 동안 새로 할당된 메모리 위치 상위 N개 + peak (프로세스 전체 기준이라 동시 요청의 할당도 섞임)
+# 을 기록하고, 최근 K개를 링 버퍼에 보관한다. (/admin/profiler/{id}/pstats 로 내려받아 snakeviz / pstats로 확인)
+# 꺼져 있을 때 요청당 비용은 카운터 증가 1번뿐이다.
+import contextvars
+import cProfile
+import io
+import itertools
+import marshal
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from typing import Optional
+
+from app.config import PROFILER_ENABLED, PROFILER_MAX_PROFILES, PROFILER_SAMPLE_EVERY, PROFILER_TOP_N, PROFILER_TRACEMALLOC
+
+
+# pstats.Stats에 이미 수집된 통계 dict를 넘기기 위한 래퍼 (Stats는 create_stats()/stats를 가진 객체를 받음)
+class _CollectedStats:
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+# 함수 하나를 cProfile로 실행하고 (결과, 통계 dict) 반환
+def profile_call(fn, *args, **kwargs):
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profile.disable()
+        profile.create_stats()
+    return result, profile.stats
+
+
+class RequestProfile:
+    """
+    샘플링된 요청 하나의 프로파일
+    profile_id: 링 버퍼 안에서의 번호
+    path: 요청 경로
+    trace_memory: tracemalloc 사용 여부
+    """
+
+    def __init__(self, profile_id: int, path: str, trace_memory: bool):
+        self.profile_id = profile_id
+        self.path = path
+        self.trace_memory = trace_memory
+        self.started_at = time.time()
+        self.duration_ms = None
+        self.status = None
+        self.memory = None
+        self._stats = []
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def call(self, fn, *args, **kwargs):
+        """실행기 스레드에서 fn을 프로파일링하며 실행"""
+        result, stats = profile_call(fn, *args, **kwargs)
+        self.add(stats)
+        return result
+
+    def add(self, stats: dict):
+        with self._lock:
+            self._stats.append(stats)
+
+    @property
+    def calls(self) -> int:
+        return len(self._stats)
+
+    def pstats(self) -> Optional[pstats.Stats]:
+        with self._lock:
+            collected = list(self._stats)
+        if not collected:
+            return None
+        return pstats.Stats(*[_CollectedStats(s) for s in collected])
+
+    def dump(self) -> bytes:
+        """pstats 파일 형식 (pstats.Stats(path) / snakeviz로 열 수 있음)"""
+        stats = self.pstats()
+        return marshal.dumps(stats.stats if stats is not None else {})
+
+    def top(self, limit: int, sort: str = "cumulative") -> str:
+        stats = self.pstats()
+        if stats is None:
+            return ""
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def summary(self) -> dict:
+        return {
+            "id": self.profile_id,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "profiled_calls": self.calls,
+            "memory": self.memory,
+        }
+
+
+class SamplingProfiler:
+    """
+    enabled: 샘플링 여부 (관리자 API로 변경)
+    sample_every: N개 요청마다 1개 샘플링
+    max_profiles: 보관할 최근 프로파일 수 (링 버퍼)
+    trace_memory: 샘플링한 요청 동안 tracemalloc 사용
+    top_n: 요약에 보여줄 함수 / 할당 위치 수
+    """
+
+    def __init__(self, enabled: bool = False, sample_every: int = 100, max_profiles: int = 20, trace_memory: bool = False, top_n: int = 30):
+        self.enabled = enabled
+        self.sample_every = max(1, sample_every)
+        self.trace_memory = trace_memory
+        self.top_n = top_n
+        self.profiles = deque(maxlen=max_profiles)
+        self.seen = 0
+        self.sampled = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._tracing = 0               # tracemalloc을 쓰는 진행 중 요청 수
+        self._started_tracemalloc = False
+
+    def configure(self, enabled: Optional[bool] = None, sample_every: Optional[int] = None,
+                  trace_memory: Optional[bool] = None, max_profiles: Optional[int] = None):
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+            if sample_every is not None:
+                self.sample_every = max(1, sample_every)
+            if trace_memory is not None:
+                self.trace_memory = trace_memory
+            if max_profiles is not None and max_profiles != self.profiles.maxlen:
+                self.profiles = deque(self.profiles, maxlen=max(1, max_profiles))
+
+    # ===== 요청 시작 / 종료 (app.main 미들웨어) =====
+
+    def start(self, path: str) -> Optional[RequestProfile]:
+        """샘플링 대상이면 RequestProfile, 아니면 None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self.seen += 1
+            if self.seen % self.sample_every:
+                return None
+            self.sampled += 1
+            profile = RequestProfile(next(self._ids), path, self.trace_memory)
+        if profile.trace_memory:
+            self._begin_tracemalloc(profile)
+        return profile
+
+    def finish(self, profile: RequestProfile, duration_sec: float, status: int):
+        profile.duration_ms = round(duration_sec * 1000, 3)
+        profile.status = status
+        if profile.trace_memory:
+            self._end_tracemalloc(profile)
+        with self._lock:
+            self.profiles.append(profile)
+
+    def _begin_tracemalloc(self, profile: RequestProfile):
+        with self._lock:
+            if self._tracing == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self._tracing += 1
+            tracemalloc.reset_peak()
+            profile._snapshot = tracemalloc.take_snapshot()
+
+    def _end_tracemalloc(self, profile: RequestProfile):
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        top = snapshot.compare_to(profile._snapshot, "lineno")[:self.top_n]
+        profile._snapshot = None
+        profile.memory = {
+            "peak_kb": round(peak / 1024, 1),
+            "top_allocations": [str(stat) for stat in top],
+        }
+        with self._lock:
+            self._tracing -= 1
+            if self._tracing == 0 and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    # ===== 조회 =====
+
+    def get(self, profile_id: int) -> Optional[RequestProfile]:
+        with self._lock:
+            for profile in self.profiles:
+                if profile.profile_id == profile_id:
+                    return profile
+        return None
+
+    def status(self) -> dict:
+        with self._lock:
+            profiles = list(self.profiles)
+            return {
+                "enabled": self.enabled,
+                "sample_every": self.sample_every,
+                "trace_memory": self.trace_memory,
+                "max_profiles": self.profiles.maxlen,
+                "seen": self.seen,
+                "sampled": self.sampled,
+                "profiles": [p.summary() for p in profiles],
+            }
+
+
+# 현재 요청의 프로파일 (샘플링된 요청에서만 설정, pipeline_executor가 보고 cProfile을 켬)
+current_profile: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar("current_profile", default=None)
+
+# 전역 프로파일러
+profiler = SamplingProfiler(
+    enabled=PROFILER_ENABLED,
+    sample_every=PROFILER_SAMPLE_EVERY,
+    max_profiles=PROFILER_MAX_PROFILES,
+    trace_memory=PROFILER_TRACEMALLOC,
+    top_n=PROFILER_TOP_N,
+)
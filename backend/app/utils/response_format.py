@@ -1,10 +1,13 @@
 from typing import List
-from PIL import Image, ImageDraw, ImageFont
 import os
-from app.config import IMAGE_SAVE_DIR, PROD_IMAGE_URL, BASE_DIR
+from app.config import IMAGE_SAVE_DIR, PROD_IMAGE_URL, BASE_DIR, CARD_FORMAT, CARD_PNG_COMPRESS_LEVEL, CARD_QUALITY, CARD_TTL_SEC, CARD_MAX_BYTES
+from app.utils.card_renderer import CardRenderer
+from app.utils.card_store import SharedCardStore
+from app.utils.metrics import stage_timer
+from app.utils.storage import ShardedFileStore, storage_gc
 
 FONT_PATH = os.path.abspath(os.path.join(BASE_DIR, "..", "..", "android", "app", "src", "main", "res", "font", "hakgyoansim_dunggeunmiso_b.otf"))
-ANIMAL_IMAGES_DIR = os.path.abspath(os.path.join(BASE_DIR, "static", "animal_icons"))
+ANIMAL_IMAGES_DIR = os.path.abspath(os.path.join(BASE_DIR, "static", "animal_icon"))
 
 ANIMAL_NAME_KR = {
     "bear": "곰상", "cat": "고양이상", "dog": "강아지상", "deer": "사슴상",
@@ -40,62 +43,38 @@ def format_response(prediction: List[dict], image_id: str) -> dict:
     }
 
 
-def generate_share_card_for_app(animal: str, image_id: str, top_k: list, save_dir: str = IMAGE_SAVE_DIR) -> str:
-    width, height = 600, 600
-    img = Image.new("RGB", (width, height), color=(240, 220, 200))
-    draw = ImageDraw.Draw(img)
-    draw.rounded_rectangle([20, 20, width - 20, height - 20], radius=30, fill=(255, 255, 255), outline=(112, 84, 56), width=4)
+# 카드 렌더러 (폰트/아이콘/동물별 기본 카드 캐시)
+card_renderer = CardRenderer(
+    names=ANIMAL_NAME_KR,
+    messages=MESSAGES,
+    font_path=FONT_PATH,
+    icon_dir=ANIMAL_IMAGES_DIR,
+    fmt=CARD_FORMAT,
+    png_compress_level=CARD_PNG_COMPRESS_LEVEL,
+    quality=CARD_QUALITY,
+)
 
-    try:
-        title_font = ImageFont.truetype(FONT_PATH, 28)
-        result_font = ImageFont.truetype(FONT_PATH, 36)
-        bar_font = ImageFont.truetype(FONT_PATH, 18)
-        message_font = ImageFont.truetype(FONT_PATH, 22)
-    except Exception:
-        title_font = result_font = bar_font = message_font = ImageFont.load_default()
 
-    message = MESSAGES.get(animal, f"{animal}상이에요!")
+# 공유 카드 URL (lazy 모드에서는 렌더링 없이 URL만 발급)
+def share_card_url(image_id: str) -> str:
+    return f"{PROD_IMAGE_URL}/{card_renderer.filename(image_id)}"
 
-    draw.text((width // 2, 60), "내 동물상 분석 결과", font=title_font, fill=(112, 84, 56), anchor="mm")
-    draw.text((width // 2, 110), f"{ANIMAL_NAME_KR.get(animal, animal + '상')}!!", font=result_font, fill="black", anchor="mm")
 
-    try:
-        animal_img_path = os.path.join(ANIMAL_IMAGES_DIR, f"ic_{animal}.png")
-        animal_img = Image.open(animal_img_path).convert("RGBA").resize((200, 200))
-        img.paste(animal_img, (width//2 - 100, 150), animal_img)
-    except Exception as e:
-        print(f"❌ 동물 이미지 로드 실패: {e}")
+# 카드 파일 저장소 (IMAGE_SAVE_DIR/ab/cd/{파일}, TTL / 용량 상한을 넘으면 GC가 삭제 → 다시 요청되면 결과로 재렌더링)
+card_files = ShardedFileStore("cards", IMAGE_SAVE_DIR, ttl_sec=CARD_TTL_SEC, max_bytes=CARD_MAX_BYTES)
+storage_gc.register("cards", card_files)
 
-    draw.text((width // 2, 370), message, font=message_font, fill=(112, 84, 56), anchor="mm")
+# 같은 내용의 카드는 {card_key}.{ext} 파일 하나를 공유 (image_id는 결과 레코드의 card_key로 연결)
+card_store = SharedCardStore(card_renderer, card_files)
 
-    color_map = ["#a5dff9", "#ffb5a7"]
-    background_colors = ["#d8f1ff", "#ffe4d9"]
 
-    bar_y = 425
-    bar_width = 320
-    bar_height = 20
-    gap = 50
-    bar_radius = 10
+# 결과(대표 동물 + top_k) → 공유 카드 키 (결과 레코드에 함께 저장)
+def card_key_for(animal: str, top_k: list) -> str:
+    return card_store.key(animal, top_k)
 
-    for i, item in enumerate(top_k[:2]):
-        label = ANIMAL_NAME_KR.get(item["animal"], f"{item['animal']}상")
-        percent_text = f"{int(item['score'])}%"
-        score = item['score'] / 100
 
-        x0 = (width - bar_width) // 2
-        y0 = bar_y + i * gap
-        x1 = x0 + bar_width
-        y1 = y0 + bar_height
-
-        draw.text((x0, y0 - 25), f"{label}", font=bar_font, fill="black")
-        draw.text((x1, y0 - 25), percent_text, font=bar_font, fill="black", anchor="ra")
-
-        draw.rounded_rectangle([x0, y0, x1, y1], radius=bar_radius, fill=background_colors[i])
-        draw.rounded_rectangle([x0, y0, x0 + int(bar_width * score), y1], radius=bar_radius, fill=color_map[i])
-
-    os.makedirs(save_dir, exist_ok=True)
-    filename = f"{image_id}_app.png"
-    filepath = os.path.join(save_dir, filename)
-    img.save(filepath, optimize=True)
-
-    return f"{PROD_IMAGE_URL}/{filename}"
+# 카드가 아직 없을 때만 렌더링해서 공유 파일로 저장하고 image_id의 카드 URL 반환
+def generate_share_card_for_app(animal: str, image_id: str, top_k: list) -> str:
+    with stage_timer("share_card"):  # 공유 카드 확인 + (없으면) card_render + 저장
+        card_store.ensure(animal, top_k)
+    return share_card_url(image_id)
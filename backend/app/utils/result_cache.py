@@ -0,0 +1,132 @@
+# 업로드 결과 캐시 (이미지 해시 + 성별 + 모델 버전 기준)
+# 같은 사진을 다시 올리면 전처리/추론/카드 생성 없이 저장된 응답을 그대로 돌려준다.
+#   - 1단계: 프로세스 내 LRU (최대 개수 + TTL)
+#   - 2단계: 디스크 (RESULT_DIR/cache/ab/cd/{key}.json, 선택 / TTL과 전체 크기 상한은 StorageGC가 정리)
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import (
+    MODEL_VERSION,
+    RESULT_CACHE_DISK,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_MAX_ENTRIES,
+    RESULT_CACHE_TTL_SEC,
+    RESULT_DIR,
+)
+from app.utils.storage import ShardedFileStore, storage_gc
+
+
+# 캐시 키: 업로드 바이트 해시 + 성별 + 모델 버전 (+ 앱이 보낸 얼굴 박스)
+def make_cache_key(image_bytes: bytes, gender: Optional[str], model_version: str = MODEL_VERSION, face_box=None, variant: str = "") -> str:
+    h = hashlib.blake2b(image_bytes, digest_size=20)
+    h.update(f"|{gender or ''}|{model_version}".encode("utf-8"))
+    if face_box is not None:
+        h.update(("|" + ",".join(f"{v:.6f}" for v in face_box)).encode("utf-8"))
+    if variant:  # 응답 형식이 다른 요청 (예: 여러 얼굴 모드)은 따로 캐시
+        h.update(f"|{variant}".encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    max_entries: 메모리 LRU 최대 개수
+    ttl_sec: 저장 후 유효 시간 (초)
+    disk: 디스크 캐시 파일 저장소 (None이면 메모리만 사용)
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_sec: float = 86400, disk: Optional[ShardedFileStore] = None):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self.disk = disk
+        self._entries = OrderedDict()  # key -> (저장 시각, 응답 dict)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+
+        # 1. 메모리 LRU 조회
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_sec:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return value
+                del self._entries[key]
+
+        # 2. 디스크 조회 (hit이면 메모리로 올림)
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store_memory(key, value, now)
+        return value
+
+    def put(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self._store_memory(key, value, now)
+        self._write_disk(key, value)
+
+    def _store_memory(self, key: str, value: dict, stored_at: float):
+        self._entries[key] = (stored_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key: str, now: float) -> Optional[dict]:
+        if self.disk is None:
+            return None
+        # TTL이 지난 파일은 읽지 않음 (삭제는 GC가 처리)
+        try:
+            data = self.disk.read(f"{key}.json", max_age_sec=self.ttl_sec)
+            return json.loads(data) if data is not None else None
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, value: dict):
+        if self.disk is None:
+            return
+        # 다른 워커가 반쯤 쓴 파일을 읽지 않도록 저장소가 임시 파일에 쓰고 교체
+        self.disk.write(f"{key}.json", json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_sec": self.ttl_sec,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# 디스크 캐시 파일 저장소 (TTL / 전체 크기 상한은 StorageGC가 정리)
+result_cache_files = None
+if RESULT_CACHE_DISK:
+    result_cache_files = ShardedFileStore(
+        "result_cache", os.path.join(RESULT_DIR, "cache"), ttl_sec=RESULT_CACHE_TTL_SEC, max_bytes=RESULT_CACHE_MAX_BYTES
+    )
+    storage_gc.register("result_cache", result_cache_files)
+
+# 전역 결과 캐시
+result_cache = ResultCache(
+    max_entries=RESULT_CACHE_MAX_ENTRIES,
+    ttl_sec=RESULT_CACHE_TTL_SEC,
+    disk=result_cache_files,
+)
@@ -0,0 +1,547 @@
+# 예측 결과 저장소
+#   - FileResultStore    : 기존 방식 (결과마다 JSON 파일 1개, RESULT_DIR/ab/cd/{image_id}.json 샤드 폴더)
+#   - SegmentResultStore : 백그라운드 쓰기 스레드가 결과를 모아서 append-only 세그먼트(JSONL)에 기록
+#                          메모리 인덱스 image_id -> (세그먼트, offset, 길이) 로 디렉터리 탐색 없이 조회
+# 두 저장소 모두 gc()로 TTL이 지난 결과 / 전체 크기 상한을 넘는 오래된 결과를 지운다. (StorageGC가 주기적으로 호출)
+import glob
+import itertools
+import json
+import os
+import queue
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.config import (
+    RESULT_COMPACT_INTERVAL_SEC,
+    RESULT_DIR,
+    RESULT_FLUSH_INTERVAL_MS,
+    RESULT_FSYNC_INTERVAL_SEC,
+    RESULT_MAX_BYTES,
+    RESULT_SEGMENT_DIR,
+    RESULT_SEGMENT_MAX_BYTES,
+    RESULT_STORE_BACKEND,
+    RESULT_TTL_SEC,
+)
+from app.utils.storage import ShardedFileStore, storage_gc
+
+
+class ResultStore:
+    """결과 저장소 인터페이스"""
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def put(self, image_id: str, record: dict):
+        raise NotImplementedError
+
+    def get(self, image_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def gc(self) -> dict:
+        return {}
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__}
+
+
+# 기존 방식: 결과마다 JSON 파일 1개 (샤드 폴더, 샤딩 이전 RESULT_DIR/{image_id}.json 도 조회)
+class FileResultStore(ResultStore):
+    def __init__(self, result_dir: str = RESULT_DIR, ttl_sec: Optional[float] = RESULT_TTL_SEC, max_bytes: Optional[int] = RESULT_MAX_BYTES):
+        self.result_dir = result_dir
+        self.files = ShardedFileStore("results", result_dir, ttl_sec=ttl_sec, max_bytes=max_bytes)
+
+    def filename(self, image_id: str) -> str:
+        return f"{image_id}.json"
+
+    def path(self, image_id: str) -> str:
+        return self.files.path(self.filename(image_id))
+
+    def put(self, image_id: str, record: dict):
+        self.files.write(self.filename(image_id), json.dumps(record, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    def get(self, image_id: str) -> Optional[dict]:
+        try:
+            data = self.files.read(self.filename(image_id))
+            return json.loads(data) if data is not None else None
+        except (OSError, ValueError):
+            return None
+
+    def gc(self) -> dict:
+        return self.files.gc()
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "files": self.files.stats()}
+
+
+SEGMENT_RE = re.compile(r"^(?P<seq>\d{6})-(?P<writer>[0-9a-f]+)\.jsonl$")
+
+
+class SegmentResultStore(ResultStore):
+    """
+    segment_dir: 세그먼트 파일 폴더 ({seq}-{writer}.jsonl)
+    max_segment_bytes: 세그먼트 최대 크기 (넘으면 새 세그먼트)
+    flush_interval_ms: 쓰기 스레드가 레코드를 모으는 최대 시간
+    fsync_interval_sec: fsync 주기
+    compact_interval_sec: 압축(덮어쓴 레코드 제거) 주기
+    legacy_dir: 기존 {image_id}.json 파일 폴더 (인덱스에 없을 때 조회)
+    ttl_sec: 결과 보관 시간 (압축 시 지난 레코드 제거, 살아있는 레코드가 모두 지난 세그먼트는 gc()가 삭제)
+    max_bytes: 세그먼트 전체 크기 상한 (넘으면 gc()가 오래된 세그먼트부터 삭제)
+
+    여러 uvicorn 워커가 같은 폴더를 써도 되도록 세그먼트 이름에 워커 ID를 넣고,
+    인덱스에 없는 ID는 다른 워커가 새로 쓴 부분만 이어서 읽어 인덱스를 따라잡는다. (flush 주기당 최대 1번)
+    """
+
+    def __init__(
+        self,
+        segment_dir: str = RESULT_SEGMENT_DIR,
+        max_segment_bytes: int = RESULT_SEGMENT_MAX_BYTES,
+        flush_interval_ms: float = RESULT_FLUSH_INTERVAL_MS,
+        fsync_interval_sec: float = RESULT_FSYNC_INTERVAL_SEC,
+        compact_interval_sec: float = RESULT_COMPACT_INTERVAL_SEC,
+        legacy_dir: Optional[str] = RESULT_DIR,
+        ttl_sec: Optional[float] = RESULT_TTL_SEC,
+        max_bytes: Optional[int] = RESULT_MAX_BYTES,
+    ):
+        self.segment_dir = segment_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.fsync_interval = fsync_interval_sec
+        self.compact_interval = compact_interval_sec
+        self.legacy = FileResultStore(legacy_dir, ttl_sec=ttl_sec, max_bytes=max_bytes) if legacy_dir else None
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.writer_id = f"{os.getpid():x}{int(time.time() * 1000) & 0xffffff:06x}"
+
+        self._index: Dict[str, Tuple[str, int, int, float]] = {}  # image_id -> (세그먼트 이름, offset, 길이, 기록 시각)
+        self._scanned: Dict[str, int] = {}                 # 세그먼트 이름 -> 인덱싱 완료 offset
+        self._pending: Dict[str, dict] = {}                # 아직 디스크에 안 쓴 레코드
+        self._lock = threading.RLock()                     # 인덱스 / pending (메모리 작업만, 디스크 I/O는 잠금 밖)
+        self._catch_up_lock = threading.Lock()             # 세그먼트 스캔과 압축 / GC의 세그먼트 삭제 직렬화
+        self._maintenance_lock = threading.Lock()          # compact / gc 직렬화
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._active = None          # 현재 쓰는 세그먼트 파일 객체
+        self._active_name = None
+        self._last_fsync = time.monotonic()
+        self._last_compact = time.monotonic()
+        self._last_catch_up = 0.0
+        self.written = 0
+        self.compactions = 0
+        self.expired_segments = 0
+        self.evicted_segments = 0
+
+    # ===== 시작 / 종료 =====
+
+    def start(self):
+        if self._thread is not None:
+            return
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self.catch_up()
+        self._thread = threading.Thread(target=self._writer_loop, name="result-store-writer", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    # ===== 조회 / 저장 =====
+
+    def put(self, image_id: str, record: dict):
+        """즉시 반환, 실제 디스크 기록은 쓰기 스레드가 묶어서 처리"""
+        with self._lock:
+            self._pending[image_id] = record
+        self._queue.put((image_id, record))
+
+    def get(self, image_id: str) -> Optional[dict]:
+        with self._lock:
+            record = self._pending.get(image_id)
+            if record is not None:
+                return record
+            location = self._index.get(image_id)
+
+        # 인덱스에 없으면 다른 워커가 쓴 내용을 따라잡고 다시 확인 (폴더 확인은 flush 주기당 최대 1번)
+        if location is None:
+            self.catch_up(force=False)
+            with self._lock:
+                location = self._index.get(image_id)
+
+        if location is not None:
+            try:
+                return self._read(location)
+            except (OSError, ValueError):
+                # 압축으로 세그먼트가 바뀐 경우 인덱스 재구성 후 재시도
+                self.rebuild_index()
+                with self._lock:
+                    location = self._index.get(image_id)
+                if location is not None:
+                    return self._read(location)
+
+        return self.legacy.get(image_id) if self.legacy else None
+
+    def _read(self, location: Tuple[str, int, int, float]) -> dict:
+        name, offset, length, _ = location
+        with open(os.path.join(self.segment_dir, name), "rb") as f:
+            f.seek(offset)
+            line = f.read(length)
+        return json.loads(line)["data"]
+
+    # ===== 인덱스 =====
+
+    def segment_names(self):
+        names = [os.path.basename(p) for p in glob.glob(os.path.join(self.segment_dir, "*.jsonl"))]
+        return sorted(n for n in names if SEGMENT_RE.match(n))
+
+    def catch_up(self, force: bool = True):
+        """
+        세그먼트 파일에서 아직 인덱싱하지 않은 부분만 읽어 인덱스에 반영
+        force=False (조회에서 인덱스에 없는 ID): 마지막 확인 후 flush 주기가 지나지 않았거나
+        다른 스레드가 이미 확인 중이면 건너뜀 (없는 ID 요청이 몰려도 폴더를 매번 읽지 않음)
+        """
+        if not self._catch_up_lock.acquire(blocking=force):
+            return
+        try:
+            if not force and time.monotonic() - self._last_catch_up < self.flush_interval:
+                return
+            self._last_catch_up = time.monotonic()
+            for name in self.segment_names():
+                self._scan_segment(name)
+        finally:
+            self._catch_up_lock.release()
+
+    def rebuild_index(self):
+        with self._catch_up_lock, self._lock:
+            self._index.clear()
+            self._scanned.clear()
+            for name in self.segment_names():
+                self._scan_segment(name)
+
+    # 파일은 인덱스 잠금 밖에서 읽고, 읽은 항목만 잠금 안에서 반영 (catch_up 잠금을 잡은 상태에서 호출)
+    def _scan_segment(self, name: str):
+        start = self._scanned.get(name, 0)
+        path = os.path.join(self.segment_dir, name)
+        entries = []
+        try:
+            if os.path.getsize(path) <= start:
+                return
+            with open(path, "rb") as f:
+                f.seek(start)
+                offset = start
+                for line in f:
+                    # 아직 다 쓰이지 않은 마지막 줄은 다음에 다시 읽음
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                        entries.append((entry["id"], (name, offset, len(line), entry["ts"])))
+                    except (ValueError, KeyError):
+                        pass
+                    offset += len(line)
+        except OSError:
+            with self._lock:
+                self._scanned.pop(name, None)
+            return
+
+        with self._lock:
+            for image_id, location in entries:
+                self._index_entry(image_id, location)
+            # 쓰기 스레드가 그 사이 더 뒤까지 기록했으면 그 값 유지
+            self._scanned[name] = max(offset, self._scanned.get(name, 0))
+
+    # 같은 image_id는 기록 시각이 가장 늦은 레코드가 유효 (세그먼트 순서와 무관)
+    def _index_entry(self, image_id: str, location: Tuple[str, int, int, float]):
+        current = self._index.get(image_id)
+        if current is None or location[3] >= current[3]:
+            self._index[image_id] = location
+
+    # ===== 쓰기 스레드 =====
+
+    def _writer_loop(self):
+        running = True
+        while running:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+                if item is None:
+                    running = False
+                else:
+                    batch.append(item)
+                    # flush_interval 동안 들어온 레코드를 한 번에 기록
+                    deadline = time.monotonic() + self.flush_interval
+                    while True:
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        try:
+                            item = self._queue.get(timeout=timeout)
+                        except queue.Empty:
+                            break
+                        if item is None:
+                            running = False
+                            break
+                        batch.append(item)
+            except queue.Empty:
+                pass
+
+            try:
+                # 오래 쓰지 않은 세그먼트는 닫아서 압축 대상이 되게 함
+                if not batch and self._active is not None and time.time() - os.path.getmtime(self._active.name) >= self.compact_interval / 2:
+                    self._maybe_fsync(force=True)
+                    self._active.close()
+                    self._active = None
+                    self._active_name = None
+
+                if batch:
+                    self._write_batch(batch)
+                self._maybe_fsync(force=not running)
+                if running and time.monotonic() - self._last_compact >= self.compact_interval:
+                    self.compact()
+            except Exception as e:
+                print(f"❌ 결과 저장 실패: {e}")
+
+        if self._active is not None:
+            self._active.close()
+            self._active = None
+
+    def _open_segment(self):
+        if self._active is not None:
+            self._maybe_fsync(force=True)
+            self._active.close()
+        names = self.segment_names()
+        seq = int(SEGMENT_RE.match(names[-1]).group("seq")) + 1 if names else 1
+        self._active_name = f"{seq:06d}-{self.writer_id}.jsonl"
+        self._active = open(os.path.join(self.segment_dir, self._active_name), "ab")
+
+    def _write_batch(self, batch):
+        if self._active is None or self._active.tell() >= self.max_segment_bytes:
+            self._open_segment()
+
+        now = time.time()
+        offset = self._active.tell()
+        locations = []
+        chunks = []
+        for image_id, record in batch:
+            line = json.dumps({"id": image_id, "ts": now, "data": record}, ensure_ascii=False, separators=(",", ":"))
+            line = line.encode("utf-8") + b"\n"
+            locations.append((image_id, record, (self._active_name, offset, len(line), now)))
+            chunks.append(line)
+            offset += len(line)
+        self._active.write(b"".join(chunks))
+        self._active.flush()
+
+        with self._lock:
+            for image_id, record, location in locations:
+                self._index_entry(image_id, location)
+                # 그 사이 새로 put된 값이 있으면 pending 유지
+                if self._pending.get(image_id) is record:
+                    del self._pending[image_id]
+            self._scanned[self._active_name] = offset
+        self.written += len(batch)
+
+    def _maybe_fsync(self, force: bool = False):
+        if self._active is None:
+            return
+        if force or time.monotonic() - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._active.fileno())
+            self._last_fsync = time.monotonic()
+
+    # ===== 압축 =====
+
+    def compact(self, min_age_sec: Optional[float] = None):
+        """
+        닫힌 세그먼트(일정 시간 이상 수정되지 않은 파일)에서 살아있는 레코드만 새 세그먼트로 옮긴다.
+        같은 image_id를 다시 쓴 경우(finalize 등) 예전 레코드와 TTL이 지난 레코드가 제거된다.
+        인덱스 잠금은 살아있는 레코드 위치를 복사할 때와 새 위치로 바꿀 때만 잡고,
+        파일 복사 / fsync / 삭제는 잠금 밖에서 해서 그동안에도 put() / get()이 기다리지 않는다.
+        """
+        self._last_compact = time.monotonic()
+        min_age = self.compact_interval if min_age_sec is None else min_age_sec
+        now = time.time()
+        self.catch_up()
+
+        with self._maintenance_lock:
+            # 1. 대상 세그먼트 (쓰는 중인 세그먼트 제외)
+            candidates = []
+            for name in self.segment_names():
+                if name == self._active_name:
+                    continue
+                try:
+                    if now - os.path.getmtime(os.path.join(self.segment_dir, name)) >= min_age:
+                        candidates.append(name)
+                except OSError:
+                    pass
+            if not candidates:
+                return
+
+            # 2. 잠금 안에서는 살아있는 레코드 위치만 복사
+            candidate_set = set(candidates)
+            with self._lock:
+                live = [(image_id, loc) for image_id, loc in self._index.items() if loc[0] in candidate_set]
+            if len(candidates) < 2 and not self._has_dead_records(candidates, live):
+                return
+
+            cutoff = now - self.ttl_sec if self.ttl_sec is not None else None
+            expired = [(image_id, loc) for image_id, loc in live if cutoff is not None and loc[3] < cutoff]
+            keep = sorted(
+                ((image_id, loc) for image_id, loc in live if cutoff is None or loc[3] >= cutoff),
+                key=lambda x: (x[1][0], x[1][1]),
+            )
+
+            # 3. 새 세그먼트에 살아있는 레코드만 복사 (잠금 없이, 세그먼트마다 한 번 열어 offset 순서대로 읽음)
+            moved = []
+            new_name = None
+            offset = 0
+            if keep:
+                seq = int(SEGMENT_RE.match(self.segment_names()[-1]).group("seq")) + 1
+                new_name = f"{seq:06d}-{self.writer_id}.jsonl"
+                new_path = os.path.join(self.segment_dir, new_name)
+                tmp_path = new_path + ".tmp"
+                with open(tmp_path, "wb") as out:
+                    for name, group in itertools.groupby(keep, key=lambda x: x[1][0]):
+                        with open(os.path.join(self.segment_dir, name), "rb") as f:
+                            for image_id, old_loc in group:
+                                _, old_offset, length, ts = old_loc
+                                f.seek(old_offset)
+                                out.write(f.read(length))
+                                moved.append((image_id, old_loc, (new_name, offset, length, ts)))
+                                offset += length
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.replace(tmp_path, new_path)
+
+            # 4. 그동안 바뀌지 않은 인덱스 항목만 새 위치로 교체 (압축 중에 다시 쓴 레코드는 새 값 유지)
+            #    catch_up이 지우는 중인 세그먼트를 다시 읽지 않도록 삭제까지 catch_up 잠금 유지
+            with self._catch_up_lock:
+                with self._lock:
+                    for image_id, old_loc in expired:
+                        if self._index.get(image_id) == old_loc:
+                            del self._index[image_id]
+                    for image_id, old_loc, new_loc in moved:
+                        if self._index.get(image_id) == old_loc:
+                            self._index[image_id] = new_loc
+                    if new_name is not None:
+                        self._scanned[new_name] = offset
+                    for name in candidates:
+                        self._scanned.pop(name, None)
+
+                # 5. 예전 세그먼트 삭제
+                for name in candidates:
+                    try:
+                        os.remove(os.path.join(self.segment_dir, name))
+                    except FileNotFoundError:
+                        pass
+            self.compactions += 1
+
+    # ===== GC (TTL / 전체 크기 상한) =====
+
+    def gc(self, now: Optional[float] = None) -> dict:
+        """
+        세그먼트 단위로 삭제한다. (레코드 단위 만료는 compact에서 처리)
+          1. 살아있는 레코드가 모두 TTL이 지난 세그먼트 삭제
+          2. 전체 크기가 max_bytes를 넘으면 가장 최근 레코드가 오래된 세그먼트부터 삭제
+        쓰는 중인 세그먼트는 건드리지 않는다. 샤딩 이전 결과 파일은 legacy 저장소의 GC로 정리한다.
+        파일 크기 확인 / 삭제는 인덱스 잠금 밖에서 한다.
+        """
+        now = now or time.time()
+        self.catch_up()
+        removed = {}
+        sizes = {}
+        with self._maintenance_lock:
+            newest: Dict[str, float] = {}
+            with self._lock:
+                for name, _, _, ts in self._index.values():
+                    newest[name] = max(ts, newest.get(name, 0.0))
+            for name in self.segment_names():
+                try:
+                    sizes[name] = os.path.getsize(os.path.join(self.segment_dir, name))
+                except OSError:
+                    pass
+            closed = sorted((n for n in sizes if n != self._active_name), key=lambda n: (newest.get(n, 0.0), n))
+
+            if self.ttl_sec is not None:
+                cutoff = now - self.ttl_sec
+                for name in closed:
+                    if newest.get(name, 0.0) < cutoff:
+                        removed[name] = "expired"
+
+            if self.max_bytes is not None:
+                total = sum(size for name, size in sizes.items() if name not in removed)
+                for name in closed:
+                    if total <= self.max_bytes:
+                        break
+                    if name not in removed:
+                        removed[name] = "evicted"
+                        total -= sizes[name]
+
+            if removed:
+                with self._catch_up_lock:
+                    with self._lock:
+                        for name in removed:
+                            self._scanned.pop(name, None)
+                        self._index = {image_id: loc for image_id, loc in self._index.items() if loc[0] not in removed}
+                    for name in removed:
+                        try:
+                            os.remove(os.path.join(self.segment_dir, name))
+                        except FileNotFoundError:
+                            pass
+
+        expired = sum(1 for reason in removed.values() if reason == "expired")
+        self.expired_segments += expired
+        self.evicted_segments += len(removed) - expired
+        result = {
+            "expired_segments": expired,
+            "evicted_segments": len(removed) - expired,
+            "freed_bytes": sum(sizes[name] for name in removed),
+        }
+        if self.legacy is not None:
+            result["legacy"] = self.legacy.gc()
+        return result
+
+    # 세그먼트의 전체 레코드 수가 살아있는 레코드 수보다 많은지 (파일은 잠금 밖에서 읽음)
+    def _has_dead_records(self, candidates, live) -> bool:
+        live_counts = {}
+        for _, (name, _, _, _) in live:
+            live_counts[name] = live_counts.get(name, 0) + 1
+        for name in candidates:
+            try:
+                with open(os.path.join(self.segment_dir, name), "rb") as f:
+                    total = sum(1 for _ in f)
+            except OSError:
+                continue
+            if total > live_counts.get(name, 0):
+                return True
+        return False
+
+    def stats(self) -> dict:
+        segments = len(self.segment_names())
+        with self._lock:
+            return {
+                "backend": type(self).__name__,
+                "records": len(self._index),
+                "pending": len(self._pending),
+                "segments": segments,
+                "written": self.written,
+                "compactions": self.compactions,
+                "expired_segments": self.expired_segments,
+                "evicted_segments": self.evicted_segments,
+            }
+
+
+def create_result_store(backend: str = RESULT_STORE_BACKEND) -> ResultStore:
+    if backend == "file":
+        return FileResultStore()
+    if backend == "segment":
+        return SegmentResultStore()
+    raise ValueError(f"지원하지 않는 결과 저장소입니다: {backend}")
+
+
+# 전역 결과 저장소 (app.main 시작 시 start)
+result_store = create_result_store()
+storage_gc.register("results", result_store)
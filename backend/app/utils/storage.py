@@ -0,0 +1,270 @@
+# 파일 저장소 (해시 prefix 샤딩 + 생성 시각 인덱스 + TTL / 용량 GC)
+# 카드, 결과 캐시, 파일 결과 저장소가 한 폴더에 파일을 계속 쌓지 않도록
+#   root/{h[0:2]}/{h[2:4]}/{name}   (h = 파일 이름의 blake2b 해시)
+# 로 나눠 저장하고, 파일마다 (크기, 생성 시각)을 sqlite 인덱스에 기록한다.
+# StorageGC 스레드가 주기적으로 TTL이 지난 파일을 지우고, 전체 크기가 상한을 넘으면 오래된 파일부터 지운다.
+# 샤딩 이전의 평평한 폴더(root/{name})에 남은 파일도 읽을 수 있고, scripts/migrate_storage.py로 옮긴다.
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Optional
+
+from app.config import STORAGE_GC_INTERVAL_SEC, STORAGE_INDEX_DIR, STORAGE_SHARD_DEPTH
+
+GC_BATCH_SIZE = 1000   # GC가 한 번에 조회/삭제하는 파일 수
+
+
+# 파일 이름 → 샤드 하위 폴더 (예: "3f/a2")
+def shard_dir(name: str, depth: int = STORAGE_SHARD_DEPTH) -> str:
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).hexdigest()
+    return os.path.join(*[digest[i * 2:i * 2 + 2] for i in range(depth)]) if depth > 0 else ""
+
+
+class ShardedFileStore:
+    """
+    name: 저장소 이름 (인덱스 파일 이름, 통계용)
+    root: 저장 폴더
+    ttl_sec: 생성 후 보관 시간 (None이면 TTL 삭제 없음)
+    max_bytes: 전체 크기 상한 (넘으면 오래된 파일부터 삭제, None이면 무제한)
+    index_dir: sqlite 인덱스 폴더 ({index_dir}/{name}.sqlite3)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        root: str,
+        ttl_sec: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        index_dir: str = STORAGE_INDEX_DIR,
+        depth: int = STORAGE_SHARD_DEPTH,
+    ):
+        self.name = name
+        self.root = root
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.depth = depth
+        self.index_path = os.path.join(index_dir, f"{name}.sqlite3")
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
+        self.freed_bytes = 0
+
+    # ===== 인덱스 (스레드마다 연결 1개, 여러 워커가 같이 써도 되도록 WAL) =====
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            db = sqlite3.connect(self.index_path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, size INTEGER NOT NULL, created_at REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS files_created_at ON files (created_at)")
+            self._local.db = db
+        return db
+
+    def _index(self, name: str, size: int, created_at: float):
+        self._db().execute(
+            "INSERT OR REPLACE INTO files (name, size, created_at) VALUES (?, ?, ?)", (name, size, created_at)
+        )
+
+    # ===== 경로 =====
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, shard_dir(name, self.depth), name)
+
+    def flat_path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def find(self, name: str) -> Optional[str]:
+        """실제 파일 경로 (샤드 → 샤딩 이전 평평한 폴더 순서, 없으면 None)"""
+        for path in (self.path(name), self.flat_path(name)):
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def exists(self, name: str) -> bool:
+        return self.find(name) is not None
+
+    # ===== 읽기 / 쓰기 =====
+
+    def read(self, name: str, max_age_sec: Optional[float] = None) -> Optional[bytes]:
+        """파일 내용 (없거나 max_age_sec보다 오래됐으면 None)"""
+        path = self.find(name)
+        if path is None:
+            return None
+        try:
+            if max_age_sec is not None and time.time() - os.path.getmtime(path) > max_age_sec:
+                return None
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, name: str, data: bytes):
+        """임시 파일에 쓴 뒤 교체 (다른 워커가 반쯤 쓴 파일을 읽지 않음). 인덱스를 먼저 기록해서 GC 대상에서 빠지지 않게 함"""
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            self._index(name, len(data), time.time())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def delete(self, name: str):
+        for path in (self.path(name), self.flat_path(name)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._db().execute("DELETE FROM files WHERE name = ?", (name,))
+
+    def adopt(self, name: str, src_path: str) -> int:
+        """샤딩 이전 파일을 샤드 폴더로 옮기고 인덱스에 등록 (생성 시각은 파일 수정 시각). 옮긴 바이트 수 반환"""
+        stat = os.stat(src_path)
+        path = self.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._index(name, stat.st_size, stat.st_mtime)
+        os.replace(src_path, path)
+        return stat.st_size
+
+    # ===== GC =====
+
+    def _remove_rows(self, rows) -> int:
+        freed = 0
+        for name, size in rows:
+            for path in (self.path(name), self.flat_path(name)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            freed += size
+        self._db().executemany("DELETE FROM files WHERE name = ?", [(name,) for name, _ in rows])
+        return freed
+
+    def gc(self, now: Optional[float] = None) -> dict:
+        """TTL이 지난 파일 삭제 → 전체 크기가 max_bytes를 넘으면 오래된 파일부터 삭제"""
+        now = now or time.time()
+        db = self._db()
+        expired = evicted = freed = 0
+
+        if self.ttl_sec is not None:
+            cutoff = now - self.ttl_sec
+            while True:
+                rows = db.execute(
+                    "SELECT name, size FROM files WHERE created_at < ? ORDER BY created_at LIMIT ?", (cutoff, GC_BATCH_SIZE)
+                ).fetchall()
+                if not rows:
+                    break
+                freed += self._remove_rows(rows)
+                expired += len(rows)
+
+        if self.max_bytes is not None:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+            while total > self.max_bytes:
+                rows = db.execute("SELECT name, size FROM files ORDER BY created_at LIMIT ?", (GC_BATCH_SIZE,)).fetchall()
+                if not rows:
+                    break
+                # 상한 아래로 내려갈 만큼만 삭제
+                victims = []
+                for name, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    victims.append((name, size))
+                    total -= size
+                freed += self._remove_rows(victims)
+                evicted += len(victims)
+
+        with self._stats_lock:
+            self.expired += expired
+            self.evicted += evicted
+            self.freed_bytes += freed
+        return {"expired": expired, "evicted": evicted, "freed_bytes": freed}
+
+    def stats(self) -> dict:
+        files, total = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+        with self._stats_lock:
+            return {
+                "name": self.name,
+                "root": self.root,
+                "files": files,
+                "bytes": total,
+                "ttl_sec": self.ttl_sec,
+                "max_bytes": self.max_bytes,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "freed_bytes": self.freed_bytes,
+            }
+
+
+class StorageGC:
+    """
+    interval_sec: GC 주기
+    등록된 저장소(gc() / stats()를 가진 객체)마다 주기적으로 gc()를 실행하는 백그라운드 스레드
+    """
+
+    def __init__(self, interval_sec: float = 600):
+        self.interval_sec = interval_sec
+        self.stores: Dict[str, object] = {}
+        self.runs = 0
+        self.last_run: Optional[float] = None
+        self.last_result: Dict[str, dict] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, store):
+        self.stores[name] = store
+
+    def run_once(self) -> dict:
+        results = {}
+        for name, store in list(self.stores.items()):
+            try:
+                results[name] = store.gc()
+            except Exception as e:
+                print(f"저장소 GC 실패 ({name}): {e}")
+                results[name] = {"error": str(e)}
+        self.runs += 1
+        self.last_run = time.time()
+        self.last_result = results
+        return results
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="storage-gc", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_sec):
+            self.run_once()
+
+    def stats(self) -> dict:
+        return {
+            "interval_sec": self.interval_sec,
+            "runs": self.runs,
+            "last_run": self.last_run,
+            "last_result": self.last_result,
+            "stores": {name: store.stats() for name, store in self.stores.items()},
+        }
+
+
+# 전역 GC (각 저장소 모듈에서 register, app.main 시작 시 start)
+storage_gc = StorageGC(interval_sec=STORAGE_GC_INTERVAL_SEC)
@@ -0,0 +1,211 @@
+# 업로드 이미지 읽기 (크기 제한 + 실제 형식 확인 + 압축 폭탄 차단)
+# 파일 확장자 대신 앞부분 magic bytes로 실제 형식을 확인하고, 헤더의 가로/세로로 디코딩 전에 픽셀 수를 검사한다.
+#   - UPLOAD_MAX_BYTES를 넘으면 끝까지 읽지 않고 바로 UploadTooLargeError (413)
+#   - 지원하지 않는 형식이면 첫 청크만 읽고 UnsupportedImageError (422)
+#   - 헤더의 픽셀 수가 UPLOAD_MAX_PIXELS를 넘으면 디코딩 전에 ImageTooLargeError (413)
+# 읽는 동안 헤더를 찾으면 바로 검사하므로 큰 PNG/JPEG 폭탄은 첫 청크에서 거절된다.
+# 요청 본문 전체 크기는 RequestSizeLimitMiddleware가 multipart 파싱(임시 파일 저장) 중에 받은 바이트 수로 제한한다.
+import struct
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+from starlette.responses import Response
+
+from app.config import UPLOAD_ALLOWED_FORMATS, UPLOAD_MAX_BYTES, UPLOAD_MAX_PIXELS, UPLOAD_READ_CHUNK_SIZE
+from app.utils.metrics import count, stage_timer
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+JPEG_MAGIC = b"\xff\xd8\xff"
+
+# JPEG SOF 마커 (가로/세로 포함). DHT(C4), JPG(C8), DAC(CC)는 제외
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# 길이 필드가 없는 마커 (TEM, RST0~7, SOI, EOI)
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8, 0xD9}
+
+
+# 업로드 크기 초과 (라우터에서 413)
+class UploadTooLargeError(ValueError):
+    pass
+
+
+# 디코딩하면 너무 커지는 이미지 (압축 폭탄 포함, 라우터에서 413)
+class ImageTooLargeError(UploadTooLargeError):
+    pass
+
+
+# 지원하지 않는 형식 (라우터에서 422)
+class UnsupportedImageError(ValueError):
+    pass
+
+
+# 요청 본문이 경로별 최대 크기를 넘음 (본문을 읽는 도중 발생, app.main의 예외 핸들러에서 413)
+# FastAPI는 본문 파싱 중 예외를 400으로 바꾸지만 HTTPException은 그대로 올리므로 HTTPException을 상속
+class RequestTooLargeError(HTTPException):
+    def __init__(self, path: str, limit: int):
+        super().__init__(status_code=413, detail=f"요청이 너무 큽니다. (최대 {limit // (1 << 20)}MB)")
+        self.path = path
+        self.limit = limit
+
+
+# magic bytes → 형식 이름 (PIL의 Image.format과 같은 이름), 모르면 None
+def sniff_format(data: bytes) -> Optional[str]:
+    if data.startswith(JPEG_MAGIC):
+        return "JPEG"
+    if data.startswith(PNG_MAGIC):
+        return "PNG"
+    return None
+
+
+def _png_size(data: bytes) -> Optional[Tuple[int, int]]:
+    # 시그니처(8) + 길이(4) + "IHDR"(4) + width(4) + height(4)
+    if len(data) < 24:
+        return None
+    if data[12:16] != b"IHDR":
+        raise UnsupportedImageError("손상된 PNG 파일입니다.")
+    return struct.unpack(">II", data[16:24])
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    # SOI 다음 마커들을 길이 필드로 건너뛰며 SOF를 찾음 (EXIF 등 APPn 세그먼트가 앞에 올 수 있음)
+    i = 2
+    n = len(data)
+    while True:
+        while i < n and data[i] == 0xFF:  # 채움 바이트
+            i += 1
+        if i >= n:
+            return None
+        marker = data[i]
+        i += 1
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == 0xDA:  # SOS: 이미지 데이터 시작 전에 SOF가 없음
+            raise UnsupportedImageError("손상된 JPEG 파일입니다.")
+        if i + 2 > n:
+            return None
+        length = struct.unpack(">H", data[i:i + 2])[0]
+        if length < 2:
+            raise UnsupportedImageError("손상된 JPEG 파일입니다.")
+        if marker in JPEG_SOF_MARKERS:
+            # 길이(2) + 정밀도(1) + height(2) + width(2)
+            if i + 7 > n:
+                return None
+            height, width = struct.unpack(">HH", data[i + 3:i + 7])
+            return width, height
+        i += length
+
+
+# 헤더에서 (width, height) 읽기 (아직 헤더까지 못 읽었으면 None)
+def image_size(data: bytes, image_format: str) -> Optional[Tuple[int, int]]:
+    if image_format == "PNG":
+        return _png_size(data)
+    return _jpeg_size(data)
+
+
+def check_dimensions(width: int, height: int, max_pixels: int = UPLOAD_MAX_PIXELS):
+    if width <= 0 or height <= 0:
+        raise UnsupportedImageError("이미지 크기를 읽을 수 없습니다.")
+    if width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"이미지 해상도가 너무 큽니다. ({width}x{height}, 최대 {max_pixels // 1_000_000}MP)"
+        )
+
+
+class ImageUploadReader:
+    """
+    청크를 받을 때마다 크기 / 형식 / 헤더 해상도를 검사하는 버퍼
+    max_bytes: 최대 바이트 수
+    max_pixels: 헤더 기준 최대 픽셀 수
+    allowed_formats: 허용 형식 (JPEG / PNG)
+    """
+
+    def __init__(self, max_bytes: int = UPLOAD_MAX_BYTES, max_pixels: int = UPLOAD_MAX_PIXELS, allowed_formats=UPLOAD_ALLOWED_FORMATS):
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.allowed_formats = allowed_formats
+        self.buffer = bytearray()
+        self.format: Optional[str] = None
+        self.size: Optional[Tuple[int, int]] = None
+
+    def feed(self, chunk: bytes):
+        if len(self.buffer) + len(chunk) > self.max_bytes:
+            raise UploadTooLargeError(f"파일이 너무 큽니다. (최대 {self.max_bytes // (1 << 20)}MB)")
+        self.buffer += chunk
+
+        # 1. 첫 청크에서 magic bytes로 형식 확인
+        if self.format is None and len(self.buffer) >= 8:
+            self.format = sniff_format(bytes(self.buffer[:8]))
+            if self.format not in self.allowed_formats:
+                raise UnsupportedImageError("지원하지 않는 파일 형식입니다.")
+
+        # 2. 헤더까지 읽으면 디코딩 전에 해상도 검사
+        if self.format is not None and self.size is None:
+            self.size = image_size(self.buffer, self.format)
+            if self.size is not None:
+                check_dimensions(*self.size, self.max_pixels)
+
+    def finish(self) -> bytearray:
+        """검사를 통과한 버퍼를 복사 없이 반환 (디코더/해시는 bytes-like면 그대로 사용)"""
+        if self.format is None:
+            raise UnsupportedImageError("지원하지 않는 파일 형식입니다.")
+        if self.size is None:
+            raise UnsupportedImageError("이미지 헤더를 읽을 수 없습니다.")
+        return self.buffer
+
+
+# 업로드 파일을 청크 단위로 읽으면서 검사 → 이미지 바이트
+# (Starlette는 1MB가 넘는 파트를 임시 파일에 두므로, 메모리에는 검사를 통과한 만큼만 올라온다)
+async def read_image_upload(file: UploadFile, max_bytes: int = UPLOAD_MAX_BYTES) -> bytearray:
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(f"파일이 너무 큽니다. (최대 {max_bytes // (1 << 20)}MB)")
+    reader = ImageUploadReader(max_bytes=max_bytes)
+    with stage_timer("upload_read"):  # 업로드 임시 파일 읽기 (클라이언트가 느리면 여기서 길어짐)
+        while True:
+            chunk = await file.read(UPLOAD_READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            reader.feed(chunk)
+        data = reader.finish()
+    count("bytes_processed_total", len(data))
+    return data
+
+
+class RequestSizeLimitMiddleware:
+    """
+    경로별 POST 요청 본문 크기 제한 (ASGI 미들웨어)
+    limits: 경로(끝의 / 제외) → 최대 바이트 수
+    too_large: (경로, 최대 바이트 수) → 413 응답
+    Content-Length가 있으면 본문을 받기 전에 바로 413, Content-Length가 없는 chunked 요청도
+    받은 바이트 수를 세다가 최대 크기를 넘는 순간 RequestTooLargeError로 multipart 파싱을 멈춘다.
+    """
+
+    def __init__(self, app, limits: Dict[str, int], too_large: Callable[[str, int], Response]):
+        self.app = app
+        self.limits = limits
+        self.too_large = too_large
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return await self.app(scope, receive, send)
+        path = scope["path"].rstrip("/") or "/"
+        limit = self.limits.get(path)
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        # 1. Content-Length가 최대 크기를 넘으면 본문을 받지 않고 거절
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            return await self.too_large(path, limit)(scope, receive, send)
+
+        # 2. 받은 바이트 수가 최대 크기를 넘으면 본문 읽기 중단 (Content-Length가 없거나 틀린 경우)
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise RequestTooLargeError(path, limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
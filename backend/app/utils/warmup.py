@@ -0,0 +1,106 @@
+# 서버 시작 워밍업 + 준비 상태(readiness)
+# 무거운 초기화(TFLite 런타임 import, 모델 로드 + 더미 invoke, 얼굴 검출 모델 로드, 전처리 버퍼, 기본 카드)를
+# import 시점이 아니라 서버 시작 후 단계별로 실행하고, 단계마다 소요 시간과 RSS 증가량을 기록한다.
+# 모든 단계가 성공해야 ready=True가 되고 /ready가 200을 반환한다. (그 전에는 503)
+import os
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import FACE_DETECTOR
+
+
+# 현재 프로세스 RSS (MB, /proc 없으면 None)
+def current_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (OSError, ValueError):
+        return None
+
+
+class WarmupState:
+    """워밍업 단계별 결과 (name, ms, rss_increase_mb)와 준비 여부"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ready = False
+        self.error: Optional[str] = None
+        self.steps: List[dict] = []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def run(self, steps: List[Tuple[str, Callable[[], None]]]):
+        """단계를 순서대로 실행 (실패하면 error를 남기고 ready는 False로 유지)"""
+        self.started_at = time.time()
+        for name, step in steps:
+            rss_before = current_rss_mb()
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                with self._lock:
+                    self.error = f"{name}: {e}"
+                print(f"워밍업 실패 ({name}): {e}")
+                return False
+            rss_after = current_rss_mb()
+            with self._lock:
+                self.steps.append({
+                    "name": name,
+                    "ms": round((time.perf_counter() - started) * 1000, 1),
+                    "rss_increase_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+                })
+        self.finished_at = time.time()
+        with self._lock:
+            self.ready = True
+        return True
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "error": self.error,
+                "steps": list(self.steps),
+                "warmup_sec": round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+                "rss_mb": round(current_rss_mb() or 0.0, 1),
+            }
+
+
+# ==== 워밍업 단계 (무거운 모듈은 각 단계 안에서 import) ====
+def warm_up_model():
+    # 모델 로드 + 풀 안의 모든 인터프리터 더미 invoke (ModelRegistry.reload에서 MODEL_WARMUP_RUNS번)
+    from app.utils.inference import load_model
+    load_model()
+
+
+def warm_up_detector():
+    # 선택된 검출 백엔드만 로드 (mediapipe 백엔드일 때만 mediapipe import)
+    from app.utils.face_detectors import get_detector
+    get_detector(FACE_DETECTOR).warm_up()
+
+
+def warm_up_pipeline():
+    # 전처리(리사이즈/정규화) → 추론 → 후처리 전체 경로를 한 번 실행
+    from app.utils.image_preprocess import face_to_input
+    from app.utils.inference import predict_animal_face
+    dummy_face = np.zeros((64, 64, 3), dtype=np.uint8)
+    predict_animal_face(face_to_input(dummy_face))
+
+
+def warm_up_cards():
+    # 동물별 기본 카드 미리 렌더링
+    from app.utils.response_format import card_renderer
+    card_renderer.warm_up()
+
+
+WARMUP_STEPS = [
+    ("model", warm_up_model),
+    ("detector", warm_up_detector),
+    ("pipeline", warm_up_pipeline),
+    ("cards", warm_up_cards),
+]
+
+# 전역 상태 (app.main lifespan에서 실행, /ready에서 조회)
+warmup_state = WarmupState()
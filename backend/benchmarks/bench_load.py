@@ -0,0 +1,123 @@
+# /upload 엔드투엔드 부하 테스트 (서버를 띄우지 않고 같은 프로세스에서 ASGI로 호출)
+#   python benchmarks/bench_load.py --output load.json
+#   python benchmarks/bench_load.py --concurrency 1,8,32 --requests 200 --client-bbox
+#
+# 앱 lifespan(워밍업 포함)을 실행한 뒤 동시 요청 수별로 같은 요청 수를 보내고
+# 지연 시간 p50/p95/p99, 처리량(요청/초), 상태 코드 분포, peak RSS를 기록한다.
+# 결과 캐시는 기본으로 끄고(--cache로 켬), 결과/카드 파일은 임시 폴더에 쓴다.
+# 필요 패키지: httpx (benchmarks/requirements.txt)
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from collections import Counter
+
+from common import (
+    SYNTHETIC_FACE_BOX,
+    environment,
+    load_image_dir,
+    peak_rss_mb,
+    summarize,
+    synthetic_images,
+    write_report,
+)
+
+
+# app 모듈을 import하기 전에 벤치마크용 설정 적용 (결과 저장 위치 / 캐시)
+def configure(args, work_dir: str):
+    from app import config
+    config.RESULT_DIR = work_dir
+    config.RESULT_SEGMENT_DIR = os.path.join(work_dir, "segments")
+    config.IMAGE_SAVE_DIR = os.path.join(work_dir, "cards")
+    config.STORAGE_INDEX_DIR = os.path.join(work_dir, "index")
+    config.STORAGE_GC_ENABLED = False
+    config.RESULT_CACHE_ENABLED = args.cache
+    config.STARTUP_WARMUP_BACKGROUND = False  # 워밍업이 끝난 뒤 측정 시작
+
+
+async def run_level(client, images: list, concurrency: int, total: int, face_box) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = Counter()
+
+    async def one(i: int):
+        name, data = images[i % len(images)]
+        form = {"gender": "male"}
+        if face_box is not None:
+            form["bbox"] = ",".join(str(v) for v in face_box)
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post("/upload/", files={"file": (f"{name}.jpg", data)}, data=form)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    wall = time.perf_counter() - started
+
+    result = summarize(latencies, wall_sec=wall)
+    result["concurrency"] = concurrency
+    result["wall_sec"] = round(wall, 3)
+    result["status_codes"] = {str(code): count for code, count in sorted(statuses.items())}
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+async def run(args, images: dict) -> list:
+    import httpx
+    from app.main import app
+
+    face_box = SYNTHETIC_FACE_BOX if args.client_bbox else None
+    image_list = list(images.items())
+    levels = [int(c) for c in args.concurrency.split(",")]
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # 첫 요청 지연 제외 (이미지별 1번씩)
+            for name, data in image_list:
+                await client.post("/upload/", files={"file": (f"{name}.jpg", data)}, data={"gender": "male"})
+            for concurrency in levels:
+                result = await run_level(client, image_list, concurrency, args.requests, face_box)
+                print(f"concurrency {concurrency}: p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, "
+                      f"p99 {result['p99_ms']} ms, {result['throughput_per_sec']} req/s, {result['status_codes']}")
+                results.append(result)
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="/upload 엔드투엔드 부하 테스트 (in-process ASGI)")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로")
+    parser.add_argument("--images", default=None, help="합성 이미지 대신 사용할 사진 폴더")
+    parser.add_argument("--concurrency", default="1,4,16", help="쉼표 구분 동시 요청 수")
+    parser.add_argument("--requests", type=int, default=100, help="동시 요청 수마다 보낼 요청 수")
+    parser.add_argument("--client-bbox", action="store_true", help="합성 이미지 얼굴 박스를 bbox로 보내 서버 검출 생략")
+    parser.add_argument("--cache", action="store_true", help="결과 캐시 사용 (기본: 끔)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    images = load_image_dir(args.images) if args.images else synthetic_images(seed=args.seed)
+    with tempfile.TemporaryDirectory() as work_dir:
+        configure(args, work_dir)
+        levels = asyncio.run(run(args, images))
+
+    report = {
+        "benchmark": "load",
+        "environment": environment(args),
+        "images": {name: len(data) for name, data in images.items()},
+        "requests_per_level": args.requests,
+        "client_bbox": args.client_bbox,
+        "cache": args.cache,
+        "levels": levels,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(f"peak RSS: {report['peak_rss_mb']} MB")
+    write_report(args.output, report)
+
+
+if __name__ == "__main__":
+    main()
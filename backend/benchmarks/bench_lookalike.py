@@ -0,0 +1,124 @@
+# 닮은 얼굴 인덱스 검색 벤치마크 (exact vs ivfpq: recall@k / 질의 1개당 지연 시간)
+#   python benchmarks/bench_lookalike.py --index app/models/lookalike --queries 200 --k 10 --nprobe 4,8,16,32,64
+#   python benchmarks/bench_lookalike.py --synthetic 200000 --dim 1280 --dtype int8 --output lookalike.json
+#
+# 질의 : 인덱스에 있는 벡터에 가우시안 노이즈를 더한 벡터 (--query-noise, seed로 재현 가능)
+# 정답 : 같은 저장소(float16 / int8)에 대한 exact 검색 결과, recall@k = |ivfpq top-k ∩ exact top-k| / k
+# 합성 인덱스 : 클러스터 구조가 있는 정규화 벡터 (가우시안 혼합)를 임시 폴더에 빌드 (저장 / IVF-PQ 학습 시간도 기록)
+# 결과 JSON: {"environment", "index", "build_sec", "exact", "ivfpq": [{"nprobe", "recall_at_k", "recall_at_1", 지연 시간}], "peak_rss_mb"}
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from common import environment, peak_rss_mb, summarize, write_report
+from app.config import LOOKALIKE_BLOCK_ROWS, LOOKALIKE_INDEX_DIR, LOOKALIKE_RERANK
+from app.utils.lookalike_index import LookalikeIndex, LookalikeIndexWriter, build_ivfpq
+
+
+# 가우시안 혼합 벡터를 블록 단위로 생성해서 인덱스 폴더에 기록 (전체 float32 행렬을 만들지 않음)
+def build_synthetic(args, path: str) -> dict:
+    rng = np.random.default_rng(args.seed)
+    centers = rng.normal(size=(args.synthetic_clusters, args.dim)).astype(np.float32)
+    writer = LookalikeIndexWriter(path, args.synthetic, args.dim, args.dtype)
+
+    started = time.perf_counter()
+    for start in range(0, args.synthetic, LOOKALIKE_BLOCK_ROWS):
+        n = min(LOOKALIKE_BLOCK_ROWS, args.synthetic - start)
+        block = centers[rng.integers(0, len(centers), n)] + rng.normal(scale=args.synthetic_spread, size=(n, args.dim)).astype(np.float32)
+        writer.add([f"synthetic/{i}" for i in range(start, start + n)], block)
+    writer.finish(extra={"source": "synthetic"})
+    store_sec = time.perf_counter() - started
+
+    started = time.perf_counter()
+    build_ivfpq(path, args.nlist, args.pq_m, args.train_size, args.iters, args.seed, verbose=True)
+    return {"store_sec": round(store_sec, 3), "ivfpq_sec": round(time.perf_counter() - started, 3)}
+
+
+def make_queries(index: LookalikeIndex, args) -> np.ndarray:
+    rng = np.random.default_rng(args.seed + 1)
+    ids = np.sort(rng.choice(index.count, min(args.queries, index.count), replace=False))
+    base = index.gather(ids)
+    return base + rng.normal(scale=args.query_noise / np.sqrt(index.dim), size=base.shape).astype(np.float32)
+
+
+# 질의를 하나씩 검색 (API와 같은 Q=1) → (결과 번호 (Q, k), 지연 시간 통계)
+def run_queries(search, queries: np.ndarray, k: int):
+    search(queries[:1], k)  # 워밍업 (memmap 페이지 로드)
+    results = []
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        results.append(ids[0])
+    return np.stack(results), summarize(latencies)
+
+
+def recall(found: np.ndarray, truth: np.ndarray, k: int) -> float:
+    hits = [len(np.intersect1d(f[:k], t[:k])) for f, t in zip(found, truth)]
+    return round(float(np.mean(hits)) / k, 4)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="닮은 얼굴 인덱스 exact / ivfpq recall · 지연 시간 측정")
+    parser.add_argument("--index", default=LOOKALIKE_INDEX_DIR, help="측정할 인덱스 폴더 (--synthetic이면 무시)")
+    parser.add_argument("--synthetic", type=int, default=0, help="합성 인덱스 벡터 수 (0이면 --index 사용)")
+    parser.add_argument("--synthetic-clusters", type=int, default=2000)
+    parser.add_argument("--synthetic-spread", type=float, default=1.5)
+    parser.add_argument("--dim", type=int, default=1280)
+    parser.add_argument("--dtype", choices=("float16", "int8"), default="float16")
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--pq-m", type=int, default=64)
+    parser.add_argument("--train-size", type=int, default=100_000)
+    parser.add_argument("--iters", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-noise", type=float, default=0.5, help="질의 노이즈 크기 (벡터 노름 대비)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", default="1,4,8,16,32,64")
+    parser.add_argument("--rerank", type=int, default=LOOKALIKE_RERANK)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="결과 JSON 경로")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    report = {"environment": environment(args)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.index
+        if args.synthetic:
+            path = tmp
+            report["build_sec"] = build_synthetic(args, path)
+        index = LookalikeIndex.open(path)
+        report["index"] = index.stats()
+        queries = make_queries(index, args)
+
+        # 1. exact (정답)
+        truth, latency = run_queries(index.search_exact, queries, args.k)
+        report["exact"] = latency
+        print(f"exact: p50 {latency['p50_ms']}ms, p95 {latency['p95_ms']}ms ({index.count}개, {index.header['dtype']})")
+
+        # 2. ivfpq (nprobe별)
+        report["ivfpq"] = []
+        nprobes = [int(n) for n in args.nprobe.split(",") if n.strip()]
+        if index.ivf is None:
+            print("IVF-PQ가 없는 인덱스라 ivfpq 측정을 건너뜀")
+            nprobes = []
+        for nprobe in nprobes:
+            found, latency = run_queries(lambda q, k: index.search_ivfpq(q, k, nprobe, args.rerank), queries, args.k)
+            row = {"nprobe": nprobe, "recall_at_k": recall(found, truth, args.k), "recall_at_1": recall(found, truth, 1), **latency}
+            report["ivfpq"].append(row)
+            print(f"ivfpq nprobe={nprobe}: recall@{args.k} {row['recall_at_k']}, recall@1 {row['recall_at_1']}, "
+                  f"p50 {row['p50_ms']}ms, p95 {row['p95_ms']}ms")
+
+        del index
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    write_report(args.output, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+# /upload 파이프라인 단계별 벤치마크
+#   python benchmarks/bench_stages.py --output stages.json
+#   python benchmarks/bench_stages.py --images ~/faces --runs 50 --detectors mediapipe_short,opencv_haar
+#
+# 합성 이미지(해상도 / 형식별)마다 각 단계를 따로 측정한다. (단계마다 warmup 후 runs번)
+#   decode        : 전체 해상도 디코딩 (PIL → RGB NumPy)
+#   decode_draft  : JPEG 축소 디코딩 (빠른 경로의 검출용 디코딩, JPEG만)
+#   resize        : 검출용 축소 (긴 변 DETECT_MAX_SIZE, cv2 INTER_AREA)
+#   detect        : 얼굴 검출 (--detectors 백엔드별)
+#   face_to_input : crop → 정사각형 패딩 + 224 리사이즈 + 정규화
+#   preprocess    : preprocess_image 전체 (디코딩 + 검출 + 입력 변환)
+# 이미지와 무관한 단계
+#   invoke_ttm / invoke_embedding : 배치 크기별 인터프리터 invoke (inference.py / inference_embeding.py)
+#   postprocess_ttm / postprocess_embedding : 점수 → 결과 포맷
+#   share_card    : 공유 카드 재사용 (SharedCardStore.ensure, 임시 폴더) / 카드 렌더링 + 인코딩
+# 결과 JSON: {"environment", "images", "stages": {단계: {이미지: p50/p95/p99...}}, "peak_rss_mb"}
+import argparse
+import io
+import tempfile
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from common import (
+    SYNTHETIC_FACE_BOX,
+    environment,
+    load_image_dir,
+    peak_rss_mb,
+    synthetic_images,
+    time_calls,
+    write_report,
+)
+from app.config import DETECT_MAX_SIZE, FACE_DETECTOR
+
+
+def decode(data: bytes) -> np.ndarray:
+    image = Image.open(io.BytesIO(data))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return np.asarray(image)
+
+
+def decode_draft(data: bytes) -> np.ndarray:
+    image = Image.open(io.BytesIO(data))
+    image.draft("RGB", (DETECT_MAX_SIZE, DETECT_MAX_SIZE))
+    return np.asarray(image.convert("RGB"))
+
+
+def resize_for_detection(image_np: np.ndarray) -> np.ndarray:
+    h, w = image_np.shape[:2]
+    scale = min(1.0, DETECT_MAX_SIZE / max(h, w))
+    return cv2.resize(image_np, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def image_stages(args, images: dict) -> dict:
+    from app.utils.face_detectors import get_detector
+    from app.utils.image_preprocess import face_to_input, preprocess_image, to_pixel_box
+
+    detectors = [d.strip() for d in args.detectors.split(",") if d.strip()]
+    stages = {}
+    for name, data in images.items():
+        print(f"[{name}] {len(data) / 1024:.0f} KB")
+        full = decode(data)
+        small = resize_for_detection(full)
+        ih, iw = full.shape[:2]
+        x1, y1, x2, y2 = to_pixel_box(SYNTHETIC_FACE_BOX, iw, ih)
+        crop = full[y1:y2, x1:x2]
+
+        stages.setdefault("decode", {})[name] = time_calls(lambda: decode(data), args.runs)
+        if data[:3] == b"\xff\xd8\xff":
+            stages.setdefault("decode_draft", {})[name] = time_calls(lambda: decode_draft(data), args.runs)
+        stages.setdefault("resize", {})[name] = time_calls(lambda: resize_for_detection(full), args.runs)
+        for detector_name in detectors:
+            detector = get_detector(detector_name)
+            stages.setdefault(f"detect_{detector_name}", {})[name] = time_calls(lambda: detector.detect(small), args.runs)
+        stages.setdefault("face_to_input", {})[name] = time_calls(lambda: face_to_input(crop), args.runs)
+
+        try:
+            preprocess_image(data)
+            stages.setdefault("preprocess", {})[name] = time_calls(lambda: preprocess_image(data), args.runs)
+        except ValueError as e:  # 검출 실패 (실제 사진 폴더 사용 시)
+            stages.setdefault("preprocess", {})[name] = {"n": 0, "error": str(e)}
+    return stages
+
+
+def invoke_stages(args) -> dict:
+    from app.utils import inference, inference_embeding
+
+    stages = {}
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    # TTM (softmax 점수)
+    model = inference.current_model()
+    for batch_size in batch_sizes:
+        x = np.random.default_rng(args.seed).random([batch_size] + model.input_shape, dtype=np.float32)
+        stages.setdefault("invoke_ttm", {})[f"batch_{batch_size}"] = time_calls(lambda: model.run_batch(x), args.runs)
+    output = model.run_batch(np.zeros([1] + model.input_shape, dtype=np.float32))[0]
+    stages["postprocess_ttm"] = {"single": time_calls(lambda: inference.postprocess_scores(output, "male", model), args.runs)}
+
+    # 임베딩 모델 (모델 파일이 없으면 건너뜀)
+    try:
+        embedding_model = inference_embeding.current_model()
+    except (OSError, ValueError) as e:
+        stages["invoke_embedding"] = {"skipped": str(e)}
+        return stages
+    for batch_size in batch_sizes:
+        x = np.random.default_rng(args.seed).random([batch_size] + embedding_model.input_shape, dtype=np.float32)
+        stages.setdefault("invoke_embedding", {})[f"batch_{batch_size}"] = time_calls(
+            lambda: inference_embeding.extract_embeddings(x, embedding_model), args.runs
+        )
+    embeddings = inference_embeding.extract_embeddings(np.zeros([1] + embedding_model.input_shape, dtype=np.float32), embedding_model)
+    scorer = inference_embeding.load_scorer()
+    stages["postprocess_embedding"] = {"single": time_calls(lambda: scorer.score(embeddings, "male"), args.runs)}
+    return stages
+
+
+def card_stage(args) -> dict:
+    from app.utils.card_store import SharedCardStore
+    from app.utils.response_format import card_renderer
+    from app.utils.storage import ShardedFileStore
+
+    card_renderer.warm_up()
+    top_k = [{"animal": "dog", "score": 73.1}, {"animal": "cat", "score": 26.9}]
+    with tempfile.TemporaryDirectory() as save_dir:
+        # 공유 카드가 이미 있으면 렌더링 없이 파일 확인만 (워밍업 이후 대부분의 요청)
+        store = SharedCardStore(card_renderer, ShardedFileStore("cards", save_dir, index_dir=save_dir))
+        shared = time_calls(lambda: store.ensure("dog", top_k), args.runs)
+    rendered = time_calls(lambda: card_renderer.render_bytes("dog", top_k), args.runs)
+    return {"share_card": {"shared": shared, "render": rendered}}
+
+
+def print_stages(stages: dict):
+    print("| stage | case | p50 (ms) | p95 (ms) | p99 (ms) | ops/s |")
+    print("|---|---|---|---|---|---|")
+    for stage, cases in stages.items():
+        for case, r in cases.items():
+            if not isinstance(r, dict) or not r.get("n"):
+                print(f"| {stage} | {case} | - | - | - | {r if not isinstance(r, dict) else r.get('error', '-')} |")
+                continue
+            print(f"| {stage} | {case} | {r['p50_ms']} | {r['p95_ms']} | {r['p99_ms']} | {r['throughput_per_sec']} |")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="/upload 파이프라인 단계별 벤치마크")
+    parser.add_argument("--output", default=None, help="결과 JSON 경로")
+    parser.add_argument("--images", default=None, help="합성 이미지 대신 사용할 사진 폴더")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--batch-sizes", default="1,4,16")
+    parser.add_argument("--detectors", default=FACE_DETECTOR, help="쉼표 구분 검출 백엔드")
+    parser.add_argument("--skip", default="", help="건너뛸 그룹 (images,invoke,card)")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    skip = set(args.skip.split(","))
+    images = load_image_dir(args.images) if args.images else synthetic_images(seed=args.seed)
+
+    stages = {}
+    if "images" not in skip:
+        stages.update(image_stages(args, images))
+    if "invoke" not in skip:
+        stages.update(invoke_stages(args))
+    if "card" not in skip:
+        stages.update(card_stage(args))
+
+    report = {
+        "benchmark": "stages",
+        "environment": environment(args),
+        "images": {name: len(data) for name, data in images.items()},
+        "runs": args.runs,
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print_stages(stages)
+    print(f"peak RSS: {report['peak_rss_mb']} MB")
+    write_report(args.output, report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# 벤치마크 공통 함수 (합성 이미지 / 통계 / 실행 환경 정보 / 결과 저장)
+# 네트워크 없이 seed로 같은 이미지를 다시 만들 수 있으므로 실행 간 결과를 비교할 수 있다.
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# 기본 합성 이미지 (이름, 가로, 세로, 형식) - 휴대폰 사진 크기 위주
+DEFAULT_IMAGE_SPECS = [
+    ("vga_jpeg", 640, 480, "JPEG"),
+    ("hd_jpeg", 1280, 960, "JPEG"),
+    ("12mp_jpeg", 3024, 4032, "JPEG"),
+    ("hd_png", 1280, 960, "PNG"),
+]
+
+# 합성 이미지 안 얼굴 영역 (상대 좌표 xmin, ymin, width, height) - 검출을 생략할 때 client bbox로 사용
+SYNTHETIC_FACE_BOX = (0.3, 0.2, 0.4, 0.45)
+
+
+# 배경 그라디언트 + 노이즈 + 얼굴 모양 타원 (JPEG/PNG 압축률이 실제 사진과 비슷하도록 노이즈 포함)
+def synthetic_image(width: int, height: int, seed: int = 0) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    pixels = np.empty((height, width, 3), dtype=np.uint8)
+    x = np.linspace(0, 1, width, dtype=np.float32)[None, :]
+    # 큰 이미지도 float 임시 배열이 커지지 않도록 행 블록 단위로 생성 (peak RSS 측정에 영향 없게)
+    for top in range(0, height, 256):
+        y = np.linspace(0, 1, height, dtype=np.float32)[top:top + 256, None]
+        block = np.empty((y.shape[0], width, 3), dtype=np.float32)
+        block[..., 0] = 120 + 80 * x
+        block[..., 1] = 90 + 60 * y
+        block[..., 2] = 140 - 50 * x * y
+        block += rng.normal(0, 12, size=block.shape).astype(np.float32)
+        np.clip(block, 0, 255, out=pixels[top:top + 256], casting="unsafe")
+    image = Image.fromarray(pixels)
+
+    xmin, ymin, bw, bh = SYNTHETIC_FACE_BOX
+    box = (int(xmin * width), int(ymin * height), int((xmin + bw) * width), int((ymin + bh) * height))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse(box, fill=(224, 182, 150))
+    ew, eh = (box[2] - box[0]) // 8, (box[3] - box[1]) // 12
+    for cx in (box[0] + (box[2] - box[0]) // 3, box[0] + 2 * (box[2] - box[0]) // 3):
+        cy = box[1] + (box[3] - box[1]) * 2 // 5
+        draw.ellipse((cx - ew // 2, cy - eh // 2, cx + ew // 2, cy + eh // 2), fill=(40, 30, 30))
+    mx, my = (box[0] + box[2]) // 2, box[1] + (box[3] - box[1]) * 3 // 4
+    draw.rectangle((mx - ew, my - eh // 3, mx + ew, my + eh // 3), fill=(150, 60, 60))
+    return image
+
+
+def encode_image(image: Image.Image, image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.save(buffer, "JPEG", quality=90)
+    else:
+        image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+# specs → {이름: 이미지 바이트}
+def synthetic_images(specs=None, seed: int = 0) -> dict:
+    images = {}
+    for i, (name, width, height, image_format) in enumerate(specs or DEFAULT_IMAGE_SPECS):
+        images[name] = encode_image(synthetic_image(width, height, seed + i), image_format)
+    return images
+
+
+# 폴더의 실제 사진 (검출 단계를 실제 얼굴로 재고 싶을 때)
+def load_image_dir(path: str) -> dict:
+    images = {}
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith((".jpg", ".jpeg", ".png")):
+            with open(os.path.join(path, name), "rb") as f:
+                images[os.path.splitext(name)[0]] = f.read()
+    return images
+
+
+# 지연 시간 목록(초) → ms 통계
+def summarize(latencies: list, wall_sec: float = None) -> dict:
+    if not latencies:
+        return {"n": 0}
+    ms = np.asarray(latencies, dtype=np.float64) * 1000
+    total = wall_sec if wall_sec is not None else float(np.sum(latencies))
+    return {
+        "n": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "min_ms": round(float(ms.min()), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "throughput_per_sec": round(len(ms) / total, 2) if total > 0 else None,
+    }
+
+
+# fn()을 warmup번 실행한 뒤 runs번 측정
+def time_calls(fn, runs: int, warmup: int = 2) -> dict:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+# 프로세스 최대 RSS (MB, Linux는 ru_maxrss 단위가 KB)
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# 결과 비교에 필요한 실행 환경 정보
+def environment(args) -> dict:
+    from app import config
+    return {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "config": {
+            "FACE_DETECTOR": config.FACE_DETECTOR,
+            "FAST_DECODE": config.FAST_DECODE,
+            "EXECUTION_MODE": config.EXECUTION_MODE,
+            "BATCH_INFERENCE_ENABLED": config.BATCH_INFERENCE_ENABLED,
+            "TTM_MODEL_PRECISION": config.TTM_MODEL_PRECISION,
+            "INTERPRETER_NUM_THREADS": config.INTERPRETER_NUM_THREADS,
+            "INTERPRETER_POOL_SIZE": config.INTERPRETER_POOL_SIZE,
+            "INTERPRETER_USE_XNNPACK": config.INTERPRETER_USE_XNNPACK,
+        },
+        "timestamp": time.time(),
+    }
+
+
+def write_report(path: str, report: dict):
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {path}")
@@ -0,0 +1,84 @@
+# 벤치마크 결과 비교 (성능 회귀 확인)
+#   python benchmarks/compare.py baseline_stages.json stages.json
+#   python benchmarks/compare.py baseline_load.json load.json --tolerance 0.1 --metrics p50_ms,p95_ms
+#
+# 같은 종류(stages / load)의 결과 JSON 두 개를 비교해서 항목별 변화율을 출력하고,
+# 지연 시간·RSS가 tolerance보다 늘었거나 처리량이 tolerance보다 줄었으면 exit 1.
+import argparse
+import json
+import sys
+
+# 값이 작을수록 좋은 항목 / 클수록 좋은 항목
+LOWER_IS_BETTER = {"p50_ms", "p95_ms", "p99_ms", "mean_ms", "peak_rss_mb"}
+HIGHER_IS_BETTER = {"throughput_per_sec"}
+
+
+# 결과 JSON → {(구분, 케이스): {지표: 값}}
+def flatten(report: dict) -> dict:
+    rows = {}
+    if report["benchmark"] == "stages":
+        for stage, cases in report["stages"].items():
+            for case, result in cases.items():
+                if isinstance(result, dict) and result.get("n"):
+                    rows[(stage, case)] = result
+    else:
+        for level in report["levels"]:
+            rows[("upload", f"concurrency_{level['concurrency']}")] = level
+    rows[("process", "total")] = {"peak_rss_mb": report["peak_rss_mb"]}
+    return rows
+
+
+def compare(baseline: dict, current: dict, metrics: list, tolerance: float) -> list:
+    base_rows, current_rows = flatten(baseline), flatten(current)
+    rows = []
+    for key in sorted(set(base_rows) & set(current_rows)):
+        for metric in metrics + ["peak_rss_mb"]:
+            before, after = base_rows[key].get(metric), current_rows[key].get(metric)
+            if before is None or after is None or before == 0:
+                continue
+            change = (after - before) / before
+            if metric in HIGHER_IS_BETTER:
+                regressed = change < -tolerance
+            else:
+                regressed = change > tolerance
+            rows.append({"group": key[0], "case": key[1], "metric": metric, "baseline": before, "current": after,
+                         "change": round(change, 4), "regressed": regressed})
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="벤치마크 결과 비교")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--metrics", default="p50_ms,p95_ms,p99_ms,throughput_per_sec")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="허용 변화율 (기본 15%%)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, "r", encoding="utf-8") as f:
+        current = json.load(f)
+    if baseline["benchmark"] != current["benchmark"]:
+        raise SystemExit("같은 종류의 벤치마크 결과끼리만 비교할 수 있습니다.")
+    if baseline["environment"]["cpu_count"] != current["environment"]["cpu_count"]:
+        print("⚠️ CPU 코어 수가 다른 환경의 결과입니다.")
+
+    rows = compare(baseline, current, [m.strip() for m in args.metrics.split(",")], args.tolerance)
+    print("| group | case | metric | baseline | current | change |")
+    print("|---|---|---|---|---|---|")
+    for r in rows:
+        mark = " ❌" if r["regressed"] else ""
+        print(f"| {r['group']} | {r['case']} | {r['metric']} | {r['baseline']} | {r['current']} | {r['change']:+.1%}{mark} |")
+
+    regressions = [r for r in rows if r["regressed"]]
+    if regressions:
+        print(f"회귀 {len(regressions)}건 (허용 {args.tolerance:.0%})")
+        sys.exit(1)
+    print("회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
-import numpy as np
+# Android용 mean_embeddings.json 내보내기
+# 서버와 같은 평균 임베딩 저장소(.emb)에서 만든다. (.emb 생성: scripts/export_embedding_store.py build)
 import json
+from app.config import EMBEDDING_STORE_PATH
+from app.utils.embedding_store import EmbeddingStore
 
-mean_embeddings = np.load("E:/ai-animal-face/backend/app/models/mean_embeddings.npy", allow_pickle=True).item()
-serializable = {k: v.tolist() for k, v in mean_embeddings.items()}
+store = EmbeddingStore.open(EMBEDDING_STORE_PATH)
 with open("mean_embeddings.json", "w") as f:
-    json.dump(serializable, f)
+    json.dump(store.as_dict(), f)
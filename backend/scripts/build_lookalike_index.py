@@ -0,0 +1,207 @@
+# 닮은 얼굴 검색 인덱스 생성 (참조 얼굴 이미지 10만~100만 장 → 임베딩 → memmap 벡터 저장소 + IVF-PQ)
+#   python scripts/build_lookalike_index.py build --image-dir dataset/reference_faces
+#   python scripts/build_lookalike_index.py build --image-dir dataset/reference_faces --labels dataset/reference.csv --dtype int8
+#   python scripts/build_lookalike_index.py build --embeddings refs.npy --names refs.txt    # 이미 추출한 임베딩
+#   python scripts/build_lookalike_index.py ivf --nlist 4096 --pq-m 64                       # IVF-PQ만 다시 학습
+#   python scripts/build_lookalike_index.py info
+#
+# 임베딩은 generate_mean_embeddings.py와 같은 방식으로 추출한다. (efficientnet.tflite, EMBEDDING_TENSOR_INDEX = 173,
+# 224 리사이즈 + MEAN/STD 정규화, 병렬 디코딩 + 배치 invoke) 참조 이미지는 얼굴만 잘라둔 사진이어야 한다.
+# {output}.building 폴더에 기록하면서 체크포인트를 남기고 (중단 후 다시 실행하면 이어서 처리),
+# 완성되면 서비스 폴더와 교체한다. 실행 중인 서버는 재시작해야 새 인덱스를 연다.
+import os
+import sys
+import time
+import shutil
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config import LOOKALIKE_INDEX_DIR  # noqa: E402
+from app.utils.embedding_store import model_file_hash  # noqa: E402
+from app.utils.model_registry import sidecar_version  # noqa: E402
+from app.utils.lookalike_index import (  # noqa: E402
+    DTYPES, HEADER_FILE, IVF_FILES, LookalikeIndex, LookalikeIndexWriter, build_ivfpq, publish_index, read_json,
+)
+
+TFLITE_MODEL_PATH = "app/models/efficientnet.tflite"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+BATCH_SIZE = 32          # 한 번에 invoke할 이미지 수
+CHECKPOINT_EVERY = 50    # N배치마다 체크포인트 저장
+LOG_EVERY = 20           # N배치마다 처리 속도 출력
+
+
+# 참조 이미지 목록: labels CSV의 image 열 또는 폴더 안 이미지 파일 (정렬)
+def list_images(image_dir, labels_path=None):
+    if labels_path:
+        import pandas as pd
+        return [str(name) for name in pd.read_csv(labels_path)["image"]]
+    return sorted(name for name in os.listdir(image_dir) if name.lower().endswith(IMAGE_EXTENSIONS))
+
+
+# 빌드 폴더 준비 (체크포인트가 있으면 이어쓰기 writer, 없으면 None → 첫 배치에서 생성)
+def open_build_dir(build_dir, fresh):
+    if fresh and os.path.exists(build_dir):
+        shutil.rmtree(build_dir)
+    writer = LookalikeIndexWriter.resume(build_dir)
+    if writer is None and os.path.exists(build_dir):
+        shutil.rmtree(build_dir)  # 체크포인트 없이 남은 폴더 (이전 실패)
+    return writer
+
+
+# 이미지 → 임베딩 → writer (generate_mean_embeddings.py와 같은 디코딩 / 정규화 / 추출)
+def embed_images(args, build_dir):
+    from concurrent.futures import ProcessPoolExecutor
+    from generate_mean_embeddings import EmbeddingExtractor, load_image, normalize_batch
+
+    names = list_images(args.image_dir, args.labels)
+    total = len(names)
+    writer = open_build_dir(build_dir, args.fresh)
+    if writer is not None:
+        if writer.capacity != total:
+            raise ValueError("체크포인트의 이미지 수가 현재 목록과 다릅니다. --fresh로 다시 시작하세요.")
+        print(f"체크포인트에서 이어하기: {writer.next_row}/{total}")
+    start_row = writer.next_row if writer is not None else 0
+
+    extractor = EmbeddingExtractor(args.model, args.batch_size)
+    started = time.perf_counter()
+    processed = skipped = batch_no = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for batch_start in range(start_row, total, args.batch_size):
+            rows = range(batch_start, min(batch_start + args.batch_size, total))
+            paths = [os.path.join(args.image_dir, names[i]) for i in rows]
+
+            # 1. 병렬 디코딩
+            images = list(pool.map(load_image, paths, chunksize=4))
+            ok = [i for i, img in zip(rows, images) if img is not None]
+            skipped += len(rows) - len(ok)
+
+            # 2. 배치 추론 → 벡터 저장소에 바로 기록 (전체 임베딩을 메모리에 모으지 않음)
+            if ok:
+                embeddings = extractor(normalize_batch([img for img in images if img is not None]))
+                if writer is None:
+                    writer = LookalikeIndexWriter(build_dir, total, embeddings.shape[1], args.dtype)
+                writer.add([names[i] for i in ok], embeddings)
+                processed += len(ok)
+
+            batch_no += 1
+            next_row = rows[-1] + 1
+            if batch_no % LOG_EVERY == 0:
+                elapsed = time.perf_counter() - started
+                print(f"[{next_row}/{total}] {processed / elapsed:.1f} images/sec (건너뜀 {skipped})")
+
+            # 3. 체크포인트
+            if writer is not None and batch_no % args.checkpoint_every == 0:
+                writer.checkpoint(next_row)
+
+    if writer is None:
+        raise ValueError("처리된 이미지가 없습니다.")
+    skipped = writer.capacity - writer.count  # 이어하기 전에 건너뛴 이미지 포함
+    print(f"임베딩 추출 완료: {processed}장 / 건너뜀 {skipped}장, {time.perf_counter() - started:.1f}s")
+    return writer, {"source": os.path.abspath(args.image_dir), "skipped": skipped}
+
+
+# 이미 추출한 임베딩 (.npy (N, D) + 이름 텍스트 파일, 한 줄에 하나) → writer
+def load_embeddings(args, build_dir):
+    embeddings = np.load(args.embeddings, mmap_mode="r")
+    if embeddings.ndim != 2:
+        raise ValueError(f"임베딩 파일은 (N, D) 행렬이어야 합니다: {embeddings.shape}")
+    if args.names:
+        with open(args.names, encoding="utf-8") as f:
+            names = [line.rstrip("\n") for line in f]
+        if len(names) != len(embeddings):
+            raise ValueError(f"이름 수({len(names)})가 임베딩 수({len(embeddings)})와 다릅니다.")
+    else:
+        names = [str(i) for i in range(len(embeddings))]
+
+    open_build_dir(build_dir, fresh=True)
+    writer = LookalikeIndexWriter(build_dir, len(embeddings), embeddings.shape[1], args.dtype)
+    for start in range(0, len(embeddings), 65536):
+        writer.add(names[start:start + 65536], embeddings[start:start + 65536])
+    return writer, {"source": os.path.abspath(args.embeddings), "skipped": 0}
+
+
+def build(args):
+    build_dir = args.output + ".building"
+    writer, extra = load_embeddings(args, build_dir) if args.embeddings else embed_images(args, build_dir)
+    model_hash = model_file_hash(args.model) if os.path.exists(args.model) else ""
+    model_version = args.model_version or sidecar_version(args.model)
+    header = writer.finish(model_hash=model_hash, model_version=model_version, extra=extra)
+    print(f"벡터 저장소 완료: {header['count']}개, {header['dim']}차원, {header['dtype']}")
+    if not model_hash:
+        print(f"모델 파일이 없어 model_hash를 비워둠: {args.model}")
+
+    if not args.no_ivf:
+        header = build_ivfpq(build_dir, args.nlist, args.pq_m, args.train_size, args.iters, args.seed, verbose=True)
+    publish_index(build_dir, args.output)
+    print(f"저장 완료: {args.output}")
+    print_header(header)
+
+
+# IVF-PQ만 다시 학습 (서버가 열고 있는 파일을 덮어쓰지 않도록 복사본에서 학습 후 교체)
+def retrain_ivf(args):
+    build_dir = args.index + ".building"
+    if os.path.exists(build_dir):
+        shutil.rmtree(build_dir)
+    shutil.copytree(args.index, build_dir, ignore=shutil.ignore_patterns(*IVF_FILES))
+    header = build_ivfpq(build_dir, args.nlist, args.pq_m, args.train_size, args.iters, args.seed, verbose=True)
+    publish_index(build_dir, args.index)
+    print(f"IVF-PQ 교체 완료: {args.index}")
+    print_header(header)
+
+
+def print_header(header):
+    for key, value in header.items():
+        print(f"{key}: {value}")
+
+
+def info(args):
+    print_header(read_json(os.path.join(args.index, HEADER_FILE)))
+    print(f"bytes: {LookalikeIndex.open(args.index).stats()['bytes']}")
+
+
+def add_ivf_args(p):
+    p.add_argument("--nlist", type=int, default=None, help="IVF 리스트 수 (기본: 4·√N 근처 2의 거듭제곱)")
+    p.add_argument("--pq-m", type=int, default=64, help="PQ 부분 공간 수 = 벡터당 코드 바이트 (차원의 약수)")
+    p.add_argument("--train-size", type=int, default=100_000, help="k-means 학습 샘플 수")
+    p.add_argument("--iters", type=int, default=20, help="k-means 반복 횟수")
+    p.add_argument("--seed", type=int, default=0)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="닮은 얼굴 검색 인덱스 생성 (memmap 벡터 저장소 + IVF-PQ)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="참조 이미지 / 임베딩 → 인덱스")
+    p.add_argument("--image-dir", default="dataset/reference_faces")
+    p.add_argument("--labels", default=None, help="image 열이 있는 CSV (없으면 폴더의 이미지 전체)")
+    p.add_argument("--embeddings", default=None, help="이미 추출한 (N, D) .npy (주면 이미지 대신 사용)")
+    p.add_argument("--names", default=None, help="--embeddings의 행별 이름 텍스트 파일")
+    p.add_argument("--output", default=LOOKALIKE_INDEX_DIR)
+    p.add_argument("--dtype", choices=DTYPES, default="float16")
+    p.add_argument("--model", default=TFLITE_MODEL_PATH)
+    p.add_argument("--model-version", default=None, help="기본값: --model 사이드카 JSON의 version (efficientnet.json)")
+    p.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    p.add_argument("--workers", type=int, default=os.cpu_count())
+    p.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY)
+    p.add_argument("--fresh", action="store_true", help="체크포인트를 무시하고 처음부터 시작")
+    p.add_argument("--no-ivf", action="store_true", help="IVF-PQ 없이 exact 검색용 저장소만 생성")
+    add_ivf_args(p)
+    p.set_defaults(func=build)
+
+    p = sub.add_parser("ivf", help="기존 인덱스의 IVF-PQ 다시 학습")
+    p.add_argument("--index", default=LOOKALIKE_INDEX_DIR)
+    add_ivf_args(p)
+    p.set_defaults(func=retrain_ivf)
+
+    p = sub.add_parser("info", help="인덱스 헤더 출력")
+    p.add_argument("--index", default=LOOKALIKE_INDEX_DIR)
+    p.set_defaults(func=info)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.func(args)
@@ -0,0 +1,81 @@
+# 평균 임베딩 저장소(.emb) 변환/내보내기
+#   python scripts/export_embedding_store.py build  --input app/models/mean_embeddings.npy
+#   python scripts/export_embedding_store.py android --output ../android/app/src/assets/mean_embeddings.json
+#   python scripts/export_embedding_store.py info
+# 서버(.emb)와 Android(mean_embeddings.json)가 같은 저장소에서 만들어지도록 한다.
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config import EMBEDDING_STORE_PATH  # noqa: E402
+from app.utils.embedding_store import EmbeddingStore, model_file_hash, write_embedding_store  # noqa: E402
+from app.utils.model_registry import sidecar_version  # noqa: E402
+
+TFLITE_MODEL_PATH = "app/models/efficientnet.tflite"
+ANDROID_JSON_PATH = "../android/app/src/assets/mean_embeddings.json"
+
+
+# 기존 npy(dict pickle) / npz(labels + embeddings) 로드
+def load_mean_embeddings(path):
+    if path.endswith(".npz"):
+        with np.load(path, allow_pickle=False) as data:
+            return [str(label) for label in data["labels"]], data["embeddings"]
+    mean_embeddings = np.load(path, allow_pickle=True).item()
+    labels = list(mean_embeddings.keys())
+    return labels, np.stack([mean_embeddings[label] for label in labels])
+
+
+def build(args):
+    labels, matrix = load_mean_embeddings(args.input)
+    model_hash = model_file_hash(args.model) if os.path.exists(args.model) else ""
+    model_version = args.model_version or sidecar_version(args.model)
+    write_embedding_store(args.output, labels, matrix, model_hash=model_hash, model_version=model_version)
+    print(f"저장 완료: {args.output} ({len(labels)}개 클래스, {matrix.shape[1]}차원)")
+    if not model_hash:
+        print(f"모델 파일이 없어 model_hash를 비워둠: {args.model}")
+
+
+def export_android(args):
+    store = EmbeddingStore.open(args.store)
+    with open(args.output, "w") as f:
+        json.dump(store.as_dict(), f)
+    print(f"Android 임베딩 저장 완료: {args.output} ({len(store.labels)}개 클래스)")
+
+
+def info(args):
+    store = EmbeddingStore.open(args.store)
+    header = dict(store.header)
+    header["labels"] = ", ".join(header["labels"])
+    for key, value in header.items():
+        print(f"{key}: {value}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="평균 임베딩 저장소(.emb) 생성 및 내보내기")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("build", help="npy/npz → .emb")
+    p.add_argument("--input", default="app/models/mean_embeddings.npy")
+    p.add_argument("--output", default=EMBEDDING_STORE_PATH)
+    p.add_argument("--model", default=TFLITE_MODEL_PATH, help="model_hash 계산용 모델 파일")
+    p.add_argument("--model-version", default=None, help="기본값: --model 사이드카 JSON의 version (efficientnet.json)")
+    p.set_defaults(func=build)
+
+    p = sub.add_parser("android", help=".emb → Android mean_embeddings.json")
+    p.add_argument("--store", default=EMBEDDING_STORE_PATH)
+    p.add_argument("--output", default=ANDROID_JSON_PATH)
+    p.set_defaults(func=export_android)
+
+    p = sub.add_parser("info", help=".emb 헤더 출력")
+    p.add_argument("--store", default=EMBEDDING_STORE_PATH)
+    p.set_defaults(func=info)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.func(args)
@@ -1,80 +1,179 @@
 import os
+import sys
+import time
+import argparse
 import numpy as np
 import pandas as pd
 from PIL import Image
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import tensorflow as tf
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config import EMBEDDING_STORE_PATH  # noqa: E402
+from app.utils.embedding_store import model_file_hash, write_embedding_store  # noqa: E402
+from app.utils.model_registry import sidecar_version  # noqa: E402
+
 # ==== 설정값 ====
 TFLITE_MODEL_PATH = "app/models/efficientnet.tflite"
 IMAGE_DIR = "dataset/dataset_MultiLabel_cropped"
 LABEL_CSV_PATH = "dataset/labels.csv"
-OUTPUT_PATH = "app/models/mean_embeddings.npy"
+OUTPUT_PATH = EMBEDDING_STORE_PATH
 
 MEAN = 0.498
 STD = 0.25
 TARGET_SIZE = (224, 224)
 EMBEDDING_TENSOR_INDEX = 173  # 반드시 모델에서 확인한 값 사용
 
-# ==== 이미지 전처리 함수 ====
-def preprocess_image(img_path):
-    img = Image.open(img_path).convert("RGB").resize(TARGET_SIZE)
-    img = np.array(img) / 255.0
-    img = (img - MEAN) / STD
-    return img[np.newaxis, ...].astype(np.float32)
+BATCH_SIZE = 32          # 한 번에 invoke할 이미지 수
+CHECKPOINT_EVERY = 20    # N배치마다 체크포인트 저장
+LOG_EVERY = 5            # N배치마다 처리 속도 출력
+
+# ==== 이미지 디코딩 (프로세스 풀 워커에서 실행) ====
+def load_image(img_path):
+    """uint8 (224, 224, 3) 반환, 실패 시 None (프로세스 간 전송량을 줄이기 위해 정규화는 메인에서)"""
+    try:
+        with Image.open(img_path) as img:
+            return np.asarray(img.convert("RGB").resize(TARGET_SIZE), dtype=np.uint8)
+    except Exception as e:
+        print(f"Error processing {img_path}: {e}")
+        return None
+
+# ==== 배치 정규화 ====
+def normalize_batch(images):
+    batch = np.stack(images).astype(np.float32) / 255.0
+    return (batch - MEAN) / STD
+
+# ==== 배치 임베딩 추출 ====
+class EmbeddingExtractor:
+    def __init__(self, model_path, batch_size):
+        self.interpreter = tf.lite.Interpreter(model_path=model_path)
+        self.input_idx = self.interpreter.get_input_details()[0]["index"]
+        self.batch_size = batch_size
+        self.interpreter.resize_tensor_input(self.input_idx, [batch_size, *TARGET_SIZE, 3])
+        self.interpreter.allocate_tensors()
+
+    def __call__(self, batch):
+        n = len(batch)
+        # 마지막 배치는 0으로 패딩해서 입력 크기 유지
+        if n < self.batch_size:
+            padding = np.zeros((self.batch_size - n,) + batch.shape[1:], dtype=batch.dtype)
+            batch = np.concatenate([batch, padding], axis=0)
+        self.interpreter.set_tensor(self.input_idx, batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(EMBEDDING_TENSOR_INDEX).reshape(self.batch_size, -1)[:n]
 
-# ==== 임베딩 추출 함수 ====
-def extract_embedding(interpreter, img):
-    input_idx = interpreter.get_input_details()[0]["index"]
-    interpreter.set_tensor(input_idx, img)
-    interpreter.invoke()
-    return interpreter.get_tensor(EMBEDDING_TENSOR_INDEX).reshape(-1)
+# ==== 체크포인트 ====
+def save_checkpoint(path, next_row, sums, counts, class_names, skipped):
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, next_row=next_row, sums=sums, counts=counts,
+             class_names=np.array(class_names), skipped=skipped)
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path, class_names):
+    with np.load(path, allow_pickle=False) as ckpt:
+        if list(ckpt["class_names"]) != list(class_names):
+            raise ValueError("체크포인트의 클래스 목록이 labels.csv와 다릅니다. --fresh로 다시 시작하세요.")
+        return int(ckpt["next_row"]), ckpt["sums"], ckpt["counts"], int(ckpt["skipped"])
+
+# ==== 결과 저장 (서버가 memmap으로 여는 .emb 저장소, Android JSON도 여기서 내보냄) ====
+def save_mean_embeddings(path, class_names, sums, counts, model_path, model_version):
+    valid = counts > 0
+    labels = [c for c, v in zip(class_names, valid) if v]
+    embeddings = (sums[valid] / counts[valid, None]).astype(np.float32)
+    write_embedding_store(
+        path, labels, embeddings,
+        model_hash=model_file_hash(model_path),
+        model_version=model_version,
+        extra={"counts": counts[valid].tolist()},
+    )
+    return labels, embeddings
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="클래스별 평균 임베딩 생성 (병렬 디코딩 + 배치 추론 + 이어하기)")
+    parser.add_argument("--model", default=TFLITE_MODEL_PATH)
+    parser.add_argument("--image-dir", default=IMAGE_DIR)
+    parser.add_argument("--labels", default=LABEL_CSV_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--model-version", default=None, help="기본값: --model 사이드카 JSON의 version (efficientnet.json)")
+    parser.add_argument("--checkpoint", default=None, help="기본값: {output}.ckpt.npz")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY)
+    parser.add_argument("--fresh", action="store_true", help="체크포인트를 무시하고 처음부터 시작")
+    return parser.parse_args()
 
 # ==== 메인 함수 ====
 def main():
+    args = parse_args()
+    checkpoint_path = args.checkpoint or args.output + ".ckpt.npz"
     print("평균 임베딩 생성 시작")
 
+    # 라벨 CSV 로드
+    df = pd.read_csv(args.labels)
+    class_names = list(df.columns[1:])  # 첫 번째 열은 'image'
+    image_names = df["image"].to_numpy()
+    label_matrix = (df[class_names].to_numpy() == 1).astype(np.float64)  # (N, C)
+    total = len(df)
+
     # 모델 로드
-    interpreter = tf.lite.Interpreter(model_path=TFLITE_MODEL_PATH)
-    interpreter.allocate_tensors()
+    extractor = EmbeddingExtractor(args.model, args.batch_size)
 
-    # 라벨 CSV 로드
-    df = pd.read_csv(LABEL_CSV_PATH)
-    class_names = df.columns[1:]  # 첫 번째 열은 'image'
-
-    class_embeddings = defaultdict(list)
-
-    for i, row in df.iterrows():
-        img_path = os.path.join(IMAGE_DIR, row['image'])
-        if not os.path.exists(img_path):
-            print(f"Not found: {img_path}")
-            continue
-
-        try:
-            img = preprocess_image(img_path)
-            emb = extract_embedding(interpreter, img)
-        except Exception as e:
-            print(f"Error processing {img_path}: {e}")
-            continue
-
-        for cls in class_names:
-            if row[cls] == 1:
-                class_embeddings[cls].append(emb)
-
-        if i % 50 == 0:
-            print(f"[{i}/{len(df)}]  {row['image']} 처리 완료")
-
-    # 평균 벡터 계산
-    mean_embeddings = {
-        cls: np.mean(vectors, axis=0)
-        for cls, vectors in class_embeddings.items()
-        if len(vectors) > 0
-    }
-
-    # 저장
-    np.save(OUTPUT_PATH, mean_embeddings)
-    print(f"저장 완료: {OUTPUT_PATH}")
-    print(f"총 클래스: {len(mean_embeddings)}개")
+    # 이어하기
+    sums = counts = None
+    start_row, skipped = 0, 0
+    if os.path.exists(checkpoint_path) and not args.fresh:
+        start_row, sums, counts, skipped = load_checkpoint(checkpoint_path, class_names)
+        print(f"체크포인트에서 이어하기: {start_row}/{total}")
+
+    started = time.perf_counter()
+    processed = 0
+    batch_no = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for batch_start in range(start_row, total, args.batch_size):
+            rows = range(batch_start, min(batch_start + args.batch_size, total))
+            paths = [os.path.join(args.image_dir, image_names[i]) for i in rows]
+
+            # 1. 병렬 디코딩
+            images = list(pool.map(load_image, paths, chunksize=4))
+            ok = [i for i, img in zip(rows, images) if img is not None]
+            skipped += len(rows) - len(ok)
+
+            # 2. 배치 추론 + 클래스별 누적 합 (벡터를 모아두지 않음)
+            if ok:
+                embeddings = extractor(normalize_batch([img for img in images if img is not None]))
+                if sums is None:
+                    sums = np.zeros((len(class_names), embeddings.shape[1]), dtype=np.float64)
+                    counts = np.zeros(len(class_names), dtype=np.int64)
+                batch_labels = label_matrix[ok]         # (B, C)
+                sums += batch_labels.T @ embeddings     # (C, D)
+                counts += batch_labels.sum(axis=0).astype(np.int64)
+                processed += len(ok)
+
+            batch_no += 1
+            next_row = rows[-1] + 1
+
+            if batch_no % LOG_EVERY == 0:
+                elapsed = time.perf_counter() - started
+                print(f"[{next_row}/{total}] {processed / elapsed:.1f} images/sec (건너뜀 {skipped})")
+
+            # 3. 체크포인트
+            if sums is not None and batch_no % args.checkpoint_every == 0:
+                save_checkpoint(checkpoint_path, next_row, sums, counts, class_names, skipped)
+
+    if sums is None:
+        print("처리된 이미지가 없습니다.")
+        sys.exit(1)
+
+    # 평균 벡터 계산 및 저장
+    labels, embeddings = save_mean_embeddings(args.output, class_names, sums, counts, args.model, args.model_version or sidecar_version(args.model))
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    elapsed = time.perf_counter() - started
+    print(f"저장 완료: {args.output}")
+    print(f"총 클래스: {len(labels)}개, 임베딩 차원: {embeddings.shape[1]}")
+    print(f"처리 {processed}장 / 건너뜀 {skipped}장, 평균 {processed / max(elapsed, 1e-9):.1f} images/sec")
 
 if __name__ == "__main__":
     main()
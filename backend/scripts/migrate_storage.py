@@ -0,0 +1,72 @@
+# 평평한 카드 / 결과 폴더 → 해시 prefix 샤드 폴더 이전 (한 번만 실행, 다시 실행해도 안전)
+#   python scripts/migrate_storage.py --dry-run      # 옮길 파일 수 / 크기만 출력
+#   python scripts/migrate_storage.py                # 이전 + 인덱스 등록 (생성 시각 = 파일 수정 시각)
+#   python scripts/migrate_storage.py --gc           # 이전 후 TTL / 용량 상한 GC 한 번 실행
+#
+# 대상
+#   cards        : IMAGE_SAVE_DIR/{image_id}_app.{ext}, IMAGE_SAVE_DIR/{card_key}.{ext}
+#   results      : RESULT_DIR/{image_id}.json (FileResultStore / SegmentResultStore의 이전 결과)
+#   result_cache : RESULT_DIR/cache/{key}.json
+# 서버가 실행 중이어도 된다. 이전 중인 파일은 샤드 폴더 → 평평한 폴더 순서로 조회되므로 share_card_url은 계속 열린다.
+import os
+import re
+import sys
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.response_format import card_files  # noqa: E402
+from app.utils.result_cache import result_cache_files  # noqa: E402
+from app.utils.result_store import FileResultStore  # noqa: E402
+from app.utils.storage import storage_gc  # noqa: E402
+
+# 저장소별 이전 대상 파일 이름
+PATTERNS = {
+    "cards": re.compile(r"^[0-9a-f]{32}(_app)?\.(png|webp|jpg)$"),
+    "results": re.compile(r"^[0-9a-f]{32}\.json$"),
+    "result_cache": re.compile(r"^[0-9a-f]{40}\.json$"),
+}
+
+
+def migrate(name: str, store, dry_run: bool) -> dict:
+    pattern = PATTERNS[name]
+    moved = total_bytes = 0
+    if not os.path.isdir(store.root):
+        return {"files": 0, "bytes": 0}
+    for entry in os.scandir(store.root):
+        if not entry.is_file() or not pattern.match(entry.name):
+            continue
+        if dry_run:
+            size = entry.stat().st_size
+        else:
+            size = store.adopt(entry.name, entry.path)
+        moved += 1
+        total_bytes += size
+    return {"files": moved, "bytes": total_bytes}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="평평한 카드 / 결과 폴더를 샤드 폴더로 이전")
+    parser.add_argument("--dry-run", action="store_true", help="옮기지 않고 대상만 출력")
+    parser.add_argument("--gc", action="store_true", help="이전 후 GC 한 번 실행")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    stores = {"cards": card_files, "results": FileResultStore().files}
+    if result_cache_files is not None:
+        stores["result_cache"] = result_cache_files
+
+    for name, store in stores.items():
+        result = migrate(name, store, args.dry_run)
+        verb = "이전 대상" if args.dry_run else "이전 완료"
+        print(f"[{name}] {store.root}: {verb} {result['files']}개 ({result['bytes'] / (1 << 20):.1f} MB)")
+
+    if args.gc and not args.dry_run:
+        for name, result in storage_gc.run_once().items():
+            print(f"[{name}] GC: {result}")
+
+
+if __name__ == "__main__":
+    main()
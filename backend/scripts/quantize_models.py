@@ -0,0 +1,256 @@
+# 추론 정밀도별 TFLite 모델 생성 + 정확도/지연 시간 리포트
+#   python scripts/quantize_models.py --source keras_model.h5 --output app/models/model_unquant.tflite
+#   python scripts/quantize_models.py --source efficientnet_saved_model --output app/models/efficientnet.tflite
+#
+# 모드 (app/utils/model_registry.PRECISIONS)
+#   float32      : 기준 모델 (--output 파일이 있으면 그대로 사용)
+#   fp16         : 가중치 float16
+#   int8-dynamic : 가중치 int8 (dynamic range)
+#   int8         : full-integer (labels.csv에서 뽑은 calibration 이미지 사용, 입출력은 float 유지)
+# 각 모드는 {모델 이름}.{mode}.tflite + 사이드카 JSON으로 저장되고, config의 *_MODEL_PRECISION으로 선택한다.
+# 리포트: float32 대비 top-1 일치율, 점수 분포 변화, 이미지당 지연 시간(XNNPACK on/off), 모델 크기, 메모리 증가량
+import os
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from PIL import Image
+import tensorflow as tf
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.config import EMBEDDING_STORE_PATH  # noqa: E402
+from app.utils.embedding_scorer import EmbeddingScorer  # noqa: E402
+from app.utils.embedding_store import EmbeddingStore  # noqa: E402
+from app.utils.interpreter_pool import PooledInterpreter  # noqa: E402
+from app.utils.model_registry import PRECISIONS, load_metadata, model_variant_path, sidecar_path  # noqa: E402
+
+# ==== 설정값 ====
+IMAGE_DIR = "dataset/dataset_MultiLabel_cropped"
+LABEL_CSV_PATH = "dataset/labels.csv"
+CALIB_SIZE = 200        # int8 calibration 이미지 수
+EVAL_SIZE = 200         # 비교용 이미지 수 (calibration과 겹치지 않음)
+LATENCY_RUNS = 50       # 지연 시간 측정 invoke 수
+
+
+# ==== 이미지 로드 (사이드카의 입력 크기 / 정규화 사용) ====
+def load_image(path, metadata):
+    height, width, _ = metadata["input_shape"]
+    with Image.open(path) as img:
+        x = np.asarray(img.convert("RGB").resize((width, height)), dtype=np.float32) / 255.0
+    normalization = metadata["normalization"]
+    if isinstance(normalization, dict):
+        x = (x - np.array(normalization["mean"], dtype=np.float32)) / np.array(normalization["std"], dtype=np.float32)
+    return x[None]
+
+
+def sample_images(args, metadata):
+    df = pd.read_csv(args.labels)
+    paths = [os.path.join(args.image_dir, name) for name in df["image"]]
+    rng = np.random.default_rng(args.seed)
+    rng.shuffle(paths)
+    calib, evaluation = [], []
+    for path in paths:
+        target = calib if len(calib) < args.calib_size else evaluation
+        if len(evaluation) >= args.eval_size:
+            break
+        try:
+            target.append(load_image(path, metadata))
+        except Exception as e:
+            print(f"Error processing {path}: {e}")
+    return calib, evaluation
+
+
+# ==== 변환 ====
+def make_converter(source):
+    if os.path.isdir(source):
+        return tf.lite.TFLiteConverter.from_saved_model(source)
+    return tf.lite.TFLiteConverter.from_keras_model(tf.keras.models.load_model(source, compile=False))
+
+
+def convert(source, mode, calib):
+    converter = make_converter(source)
+    if mode == "fp16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8-dynamic":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif mode == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([x] for x in calib)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # 서버 코드가 그대로 쓸 수 있도록 입출력은 float 유지
+    return converter.convert()
+
+
+# 기준 모델의 임베딩 텐서를 이름으로 찾아 변환된 모델의 인덱스로 매핑
+def remap_tensor_index(reference_path, variant_path, index):
+    if index is None:
+        return None
+    names = {d["index"]: d["name"] for d in tf.lite.Interpreter(model_path=reference_path).get_tensor_details()}
+    target = names.get(index)
+    for d in tf.lite.Interpreter(model_path=variant_path).get_tensor_details():
+        if d["name"] == target:
+            return d["index"]
+    print(f"⚠️ 임베딩 텐서({target})를 {variant_path}에서 찾지 못했습니다. 사이드카의 embedding_index를 직접 확인하세요.")
+    return None
+
+
+def write_variant(args, mode, metadata, model_bytes):
+    path = model_variant_path(args.output, mode)
+    with open(path, "wb") as f:
+        f.write(model_bytes)
+
+    sidecar = dict(metadata)
+    base_version = metadata.get("version") or os.path.splitext(os.path.basename(args.output))[0]
+    sidecar["version"] = base_version if mode == "float32" else f"{base_version}-{mode}"
+    sidecar["precision"] = mode
+    if mode != "float32":
+        sidecar["embedding_index"] = remap_tensor_index(args.output, path, metadata.get("embedding_index"))
+    with open(sidecar_path(path), "w", encoding="utf-8") as f:
+        json.dump(sidecar, f, ensure_ascii=False, indent=2)
+    return path, sidecar
+
+
+# ==== 평가 ====
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1 << 20)
+    except (OSError, ValueError):
+        return None
+
+
+def run_outputs(path, tensor_index, images, num_threads, use_xnnpack, latency_runs):
+    rss_before = current_rss_mb()
+    interpreter = PooledInterpreter(0, path, num_threads, use_xnnpack)
+    if tensor_index is None:
+        tensor_index = interpreter.interpreter.get_output_details()[0]["index"]
+    outputs = np.concatenate([interpreter.run(x, tensor_index) for x in images], axis=0)
+    rss_after = current_rss_mb()
+
+    if latency_runs <= 0:
+        return outputs, {}
+
+    latencies = []
+    for i in range(latency_runs):
+        x = images[i % len(images)]
+        started = time.perf_counter()
+        interpreter.run(x, tensor_index)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return outputs, {
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3),
+        "latency_ms_p95": round(float(np.percentile(latencies, 95)), 3),
+        "rss_increase_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+    }
+
+
+# 분류 모델은 argmax, 임베딩 모델은 평균 임베딩과의 최고 유사도 클래스
+def top1(outputs, scorer):
+    if scorer is None:
+        return outputs.argmax(axis=1)
+    return scorer.similarities(outputs).argmax(axis=1)
+
+
+def compare(reference, outputs, scorer):
+    diff = np.abs(outputs - reference)
+    result = {
+        "top1_agreement": round(float((top1(reference, scorer) == top1(outputs, scorer)).mean()), 4),
+        "mean_abs_diff": round(float(diff.mean()), 6),
+        "max_abs_diff": round(float(diff.max()), 6),
+        "score_mean": round(float(outputs.mean()), 6),
+        "score_std": round(float(outputs.std()), 6),
+    }
+    if scorer is not None:
+        cos = (outputs * reference).sum(axis=1) / (
+            np.linalg.norm(outputs, axis=1) * np.linalg.norm(reference, axis=1) + 1e-12
+        )
+        result["embedding_cosine_mean"] = round(float(cos.mean()), 6)
+        result["embedding_cosine_min"] = round(float(cos.min()), 6)
+    else:
+        result["top1_score_shift"] = round(float((outputs.max(axis=1) - reference.max(axis=1)).mean()), 6)
+    return result
+
+
+def print_report(rows):
+    print("| mode | xnnpack | size (MB) | top-1 agreement | mean abs diff | p50 (ms) | p95 (ms) | RSS +MB |")
+    print("|---|---|---|---|---|---|---|---|")
+    for r in rows:
+        print(f"| {r['mode']} | {r['xnnpack']} | {r['size_mb']} | {r['top1_agreement']} | {r['mean_abs_diff']} | "
+              f"{r['latency_ms_p50']} | {r['latency_ms_p95']} | {r['rss_increase_mb']} |")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="정밀도별 TFLite 모델 생성 및 float32 대비 비교 리포트")
+    parser.add_argument("--source", default=None, help="변환 원본 (SavedModel 폴더 또는 Keras .h5/.keras)")
+    parser.add_argument("--output", required=True, help="기준(float32) .tflite 경로, 나머지는 {이름}.{mode}.tflite")
+    parser.add_argument("--modes", default=",".join(PRECISIONS))
+    parser.add_argument("--labels", default=LABEL_CSV_PATH)
+    parser.add_argument("--image-dir", default=IMAGE_DIR)
+    parser.add_argument("--calib-size", type=int, default=CALIB_SIZE)
+    parser.add_argument("--eval-size", type=int, default=EVAL_SIZE)
+    parser.add_argument("--latency-runs", type=int, default=LATENCY_RUNS)
+    parser.add_argument("--num-threads", type=int, default=1)
+    parser.add_argument("--embedding-store", default=EMBEDDING_STORE_PATH, help="임베딩 모델 top-1 비교용 .emb")
+    parser.add_argument("--report", default=None, help="기본값: {output 이름}.quantization_report.json")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    for mode in modes:
+        if mode not in PRECISIONS:
+            raise SystemExit(f"지원하지 않는 모드입니다: {mode}")
+    report_path = args.report or os.path.splitext(args.output)[0] + ".quantization_report.json"
+
+    metadata = load_metadata(args.output)
+    calib, evaluation = sample_images(args, metadata)
+    if not evaluation:
+        raise SystemExit("비교할 이미지가 없습니다.")
+    print(f"calibration {len(calib)}장, 비교 {len(evaluation)}장")
+
+    # 1. 모델 생성 (float32 기준 모델은 이미 있으면 그대로 사용)
+    variants = {}
+    for mode in ["float32"] + [m for m in modes if m != "float32"]:
+        path = model_variant_path(args.output, mode)
+        if mode == "float32" and os.path.exists(path):
+            variants[mode] = (path, metadata)
+            continue
+        if args.source is None:
+            raise SystemExit(f"{mode} 모델을 만들려면 --source(SavedModel 또는 Keras 모델)가 필요합니다.")
+        started = time.perf_counter()
+        variants[mode] = write_variant(args, mode, metadata, convert(args.source, mode, calib))
+        print(f"{mode} 생성 완료: {variants[mode][0]} ({time.perf_counter() - started:.1f}s)")
+
+    # 2. float32 대비 비교 (XNNPACK on/off)
+    scorer = None
+    if metadata.get("embedding_index") is not None and os.path.exists(args.embedding_store):
+        scorer = EmbeddingScorer.from_store(EmbeddingStore.open(args.embedding_store))
+
+    reference, _ = run_outputs(variants["float32"][0], metadata.get("embedding_index"), evaluation, args.num_threads, True, 0)
+    rows = []
+    for mode in modes:
+        path, sidecar = variants[mode]
+        for use_xnnpack in (True, False):
+            outputs, timing = run_outputs(
+                path, sidecar.get("embedding_index"), evaluation, args.num_threads, use_xnnpack, args.latency_runs
+            )
+            row = {"mode": mode, "xnnpack": use_xnnpack, "path": path,
+                   "size_mb": round(os.path.getsize(path) / (1 << 20), 2)}
+            row.update(compare(reference, outputs, scorer))
+            row.update(timing)
+            rows.append(row)
+
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump({"model": args.output, "eval_images": len(evaluation), "calib_images": len(calib), "results": rows},
+                  f, ensure_ascii=False, indent=2)
+    print_report(rows)
+    print(f"리포트 저장: {report_path}")
+
+
+if __name__ == "__main__":
+    main()
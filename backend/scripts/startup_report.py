@@ -0,0 +1,141 @@
+# 서버 콜드 스타트 리포트 (import 시간 / RSS / 워밍업 단계별 시간)
+#   python scripts/startup_report.py
+#   python scripts/startup_report.py --output startup_report.json
+#   python scripts/startup_report.py --baseline startup_report.json   # 기준보다 느려지거나 무거워지면 exit 1
+#
+# 깨끗한 하위 프로세스에서 측정한다.
+#   1. python -X importtime -c "import app.main" → 모듈별 누적 import 시간 상위 N개
+#   2. import app.main 직후 RSS + 이미 로드된 무거운 모듈 (tensorflow, mediapipe 등은 여기 없어야 함)
+#   3. 워밍업(app/utils/warmup.py의 WARMUP_STEPS) 단계별 시간 / RSS 증가량 + 워밍업 후 RSS
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# import 시점에 로드되면 안 되는 모듈 (워밍업 또는 선택된 백엔드에서만 로드)
+HEAVY_MODULES = ["tensorflow", "tflite_runtime", "ai_edge_litert", "mediapipe", "torch", "torchvision", "matplotlib", "sklearn"]
+
+# 하위 프로세스에서 실행할 측정 코드
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+import_sec = time.perf_counter() - started
+from app.utils.warmup import WARMUP_STEPS, WarmupState, current_rss_mb
+heavy = [m for m in {heavy!r} if m in sys.modules]
+rss_import = current_rss_mb()
+state = WarmupState()
+if {warmup!r}:
+    state.run(WARMUP_STEPS)
+print(json.dumps({{
+    "import_sec": round(import_sec, 3),
+    "rss_after_import_mb": round(rss_import or 0.0, 1),
+    "heavy_modules_at_import": heavy,
+    "warmup": state.status(),
+}}))
+"""
+
+# 기준 대비 비교할 항목 (값이 클수록 나쁨)
+COMPARE_KEYS = ["import_sec", "rss_after_import_mb", "warmup_sec", "rss_after_warmup_mb"]
+
+
+def run_probe(warmup: bool) -> dict:
+    code = PROBE.format(heavy=HEAVY_MODULES, warmup=warmup)
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+# -X importtime 출력 (stderr): "import time: self [us] | cumulative | imported package"
+def import_times(top: int) -> list:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def build_report(args) -> dict:
+    probe = run_probe(warmup=not args.skip_warmup)
+    warmup = probe.pop("warmup")
+    report = dict(probe)
+    report["warmup_sec"] = warmup["warmup_sec"]
+    report["warmup_error"] = warmup["error"]
+    report["warmup_steps"] = warmup["steps"]
+    report["rss_after_warmup_mb"] = warmup["rss_mb"] if not args.skip_warmup else None
+    report["top_imports"] = import_times(args.top)
+    return report
+
+
+# 기준 리포트보다 tolerance 이상 커진 항목 목록
+def find_regressions(report: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for key in COMPARE_KEYS:
+        before, after = baseline.get(key), report.get(key)
+        if before is None or after is None:
+            continue
+        if after > before * (1 + tolerance):
+            regressions.append({"metric": key, "baseline": before, "current": after})
+    new_heavy = sorted(set(report["heavy_modules_at_import"]) - set(baseline.get("heavy_modules_at_import", [])))
+    if new_heavy:
+        regressions.append({"metric": "heavy_modules_at_import", "baseline": baseline.get("heavy_modules_at_import", []), "current": report["heavy_modules_at_import"]})
+    return regressions
+
+
+def print_report(report: dict):
+    print(f"import app.main: {report['import_sec']:.3f}s, RSS {report['rss_after_import_mb']} MB")
+    print(f"import 시점에 로드된 무거운 모듈: {report['heavy_modules_at_import'] or '없음'}")
+    if report["warmup_error"]:
+        print(f"⚠️ 워밍업 실패: {report['warmup_error']}")
+    for step in report["warmup_steps"]:
+        print(f"  워밍업 {step['name']}: {step['ms']} ms, RSS +{step['rss_increase_mb']} MB")
+    if report["warmup_sec"] is not None:
+        print(f"워밍업 합계: {report['warmup_sec']}s, RSS {report['rss_after_warmup_mb']} MB")
+    print("| module | cumulative (ms) | self (ms) |")
+    print("|---|---|---|")
+    for row in report["top_imports"]:
+        print(f"| {row['module']} | {row['cumulative_ms']:.1f} | {row['self_ms']:.1f} |")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="서버 import 시간 / RSS / 워밍업 리포트")
+    parser.add_argument("--output", default=None, help="리포트 JSON 저장 경로")
+    parser.add_argument("--baseline", default=None, help="비교할 기준 리포트 JSON (회귀가 있으면 exit 1)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="기준 대비 허용 증가율 (기본 20%%)")
+    parser.add_argument("--top", type=int, default=15, help="누적 import 시간 상위 모듈 수")
+    parser.add_argument("--skip-warmup", action="store_true", help="import만 측정")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    report = build_report(args)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"리포트 저장: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(report, baseline, args.tolerance)
+        for r in regressions:
+            print(f"❌ 회귀: {r['metric']} {r['baseline']} → {r['current']}")
+        if regressions:
+            sys.exit(1)
+        print("기준 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# EmbeddingScorer(벡터화 버전)가 기존 dict + sorted() 구현과 같은 결과를 내는지 확인 (특히 동점 처리)
+#   python -m pytest tests
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.embedding_scorer import (  # noqa: E402
+    EmbeddingScorer, female_preference, filter_forbidden_pairs, male_preference,
+)
+
+# mean_embeddings.npy의 클래스 순서 (기존 구현에서 동점일 때 dict 순서가 결과를 정함)
+LABELS = ["dinosaur", "squirrel", "snake", "cat", "deer", "tiger", "wolf", "dog", "turtle", "rabbit", "bear"]
+
+
+# === 기존 구현 (dict + sorted()) ===
+
+def baseline_gender_filter(sim_dict, gender):
+    if gender == "male":
+        sim_dict = {k: v for k, v in sim_dict.items() if k not in female_preference}
+    elif gender == "female":
+        sim_dict = {k: v for k, v in sim_dict.items() if k not in male_preference}
+    return sim_dict
+
+
+def baseline_adjust_similarity(similarity_dict, max_percent=0.7, boost_delta=0.05):
+    if not similarity_dict:
+        return similarity_dict
+    max_value = max(similarity_dict.values())
+    if max_value > max_percent:
+        scale = max_percent / max_value
+        similarity_dict = {k: round(v * scale, 4) for k, v in similarity_dict.items()}
+    sorted_items = sorted(similarity_dict.items(), key=lambda x: x[1], reverse=True)
+    if len(sorted_items) >= 2:
+        top1_key, top1_val = sorted_items[0]
+        top2_key, top2_val = sorted_items[1]
+        if abs(top1_val - top2_val) < 0.03:
+            similarity_dict[top1_key] = min(top1_val + boost_delta, 1.0)
+            similarity_dict[top2_key] = max(top2_val - boost_delta, 0.0)
+    return similarity_dict
+
+
+def baseline_score(sim_row, gender):
+    sims = {label: sim_row[i] for i, label in enumerate(LABELS)}
+    sims = baseline_gender_filter(sims, gender)
+    sims = baseline_adjust_similarity(sims, max_percent=0.7)
+    top_k = sorted(sims.items(), key=lambda x: x[1], reverse=True)[:5]
+    filtered_animals = filter_forbidden_pairs([x[0] for x in top_k])
+    return [{"animal": animal, "score": round(float(sims.get(animal, 0)), 4)} for animal in filtered_animals]
+
+
+# ===============================
+
+@pytest.fixture
+def scorer():
+    # 클래스별 one-hot 평균 임베딩 → 임베딩 벡터의 각 성분이 그대로 해당 클래스 유사도 (정규화 후)
+    return EmbeddingScorer(LABELS, np.eye(len(LABELS), dtype=np.float32))
+
+
+def assert_same_as_baseline(scorer, embeddings, genders):
+    sims = scorer.similarities(embeddings).astype(np.float64)
+    expected = [baseline_score(row, gender) for row, gender in zip(sims, genders)]
+    assert scorer.score(embeddings, genders) == expected
+
+
+def test_tie_at_kth_position_keeps_class_order(scorer):
+    # turtle 0.7, dinosaur / squirrel 0.6998 동점 → 기존 구현은 dict 순서상 앞선 dinosaur를 2위로 선택
+    embedding = np.full(len(LABELS), 0.1, dtype=np.float32)
+    embedding[LABELS.index("turtle")] = 0.7
+    embedding[LABELS.index("dinosaur")] = 0.6998
+    embedding[LABELS.index("squirrel")] = 0.6998
+    top2 = EmbeddingScorer.top_indices(scorer.similarities(embedding[None, :]), 2)
+    assert [LABELS[i] for i in top2[0]] == ["turtle", "dinosaur"]
+    assert_same_as_baseline(scorer, embedding[None, :], [None])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_baseline_on_near_ties(scorer, seed):
+    # 몇 개 안 되는 값에서 뽑아 동점 / 근소한 차이가 자주 생기도록 구성
+    rng = np.random.default_rng(seed)
+    levels = np.array([0.2, 0.5, 0.69, 0.6998, 0.7, 0.71], dtype=np.float32)
+    embeddings = rng.choice(levels, size=(64, len(LABELS)))
+    genders = list(rng.choice(np.array(["male", "female", None], dtype=object), size=len(embeddings)))
+    assert_same_as_baseline(scorer, embeddings, genders)